@@ -3,6 +3,10 @@ Allow HTMXAutoComplete to be imported from the module directly
 """
 
 from .core import Autocomplete, register
-from .shortcuts import ModelAutocomplete
-from .views import urls
+from .shortcuts import (
+    IndexedAutocomplete,
+    MmapIndexedAutocomplete,
+    ModelAutocomplete,
+)
+from .views import async_urls, urls
 from .widgets import AutocompleteWidget
@@ -12,3 +12,6 @@ class AutocompleteConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "autocomplete"
+
+    def ready(self):
+        from . import checks, strings  # noqa: F401
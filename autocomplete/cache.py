@@ -0,0 +1,196 @@
+"""
+Shared search result cache, built on Django's cache framework
+
+Cached pages are keyed by the autocomplete's current "generation",
+invalidating an autocomplete bumps its generation so older entries are
+never read again and simply expire.
+
+With refine_searches, complete result sets (those that fit in one page)
+are also kept per search, so that longer searches extending them are
+answered by filtering in memory rather than querying again.
+"""
+
+import hashlib
+import json
+import time
+
+from django.core.cache import caches
+
+from . import core
+
+
+def get_cache(ac_class):
+    return caches[ac_class.cache_alias]
+
+
+def _generation_key(ac_class):
+    return f"autocomplete:generation:{ac_class.route_name}"
+
+
+def get_generation(ac_class):
+    cache = get_cache(ac_class)
+    key = _generation_key(ac_class)
+
+    generation = cache.get(key)
+    if generation is None:
+        # start from the clock so that an evicted generation is never reused
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+
+    return generation
+
+
+def bump_generation(ac_class):
+    cache = get_cache(ac_class)
+    key = _generation_key(ac_class)
+
+    try:
+        cache.incr(key)
+    except ValueError:
+        # key is missing (never set, or evicted)
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def get_search_cache_key(
+    ac_class, search, context, page_size, kind="results", generation=None
+):
+    client_kwargs = context.client_kwargs or {}
+
+    if hasattr(client_kwargs, "getlist"):
+        relevant_kwargs = {
+            k: client_kwargs.getlist(k) for k in ac_class.cache_client_kwargs
+        }
+    else:
+        relevant_kwargs = {
+            k: client_kwargs.get(k) for k in ac_class.cache_client_kwargs
+        }
+
+    params = [
+        ac_class.normalize_search(search),
+        sorted(str(k) for k in context.selected_keys),
+        relevant_kwargs,
+        page_size,
+    ]
+    digest = hashlib.sha1(
+        json.dumps(params, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+    if generation is None:
+        generation = get_generation(ac_class)
+
+    return f"autocomplete:{kind}:{ac_class.route_name}:{generation}:{digest}"
+
+
+def get_cached_search_page(ac_class, search, context, page_size):
+    cache = get_cache(ac_class)
+    # read once, every key of the search is built from it
+    generation = get_generation(ac_class)
+    key = get_search_cache_key(
+        ac_class, search, context, page_size, generation=generation
+    )
+
+    page = cache.get(key)
+    if page is not None:
+        return page
+
+    if ac_class.refine_searches:
+        page = refine_search_page(
+            ac_class, search, context, page_size, generation=generation
+        )
+
+    if page is None:
+        page = ac_class.fetch_search_page(search, context, page_size)
+
+        if ac_class.refine_searches and not page.has_more:
+            texts = [
+                [ac_class.normalize_search(t) for t in item_texts]
+                for item_texts in ac_class.get_refinement_texts(
+                    page.items, context
+                )
+            ]
+            store_complete_results(
+                ac_class,
+                search,
+                context,
+                page_size,
+                page.items,
+                texts,
+                generation=generation,
+            )
+
+    cache.set(key, page, timeout=ac_class.cache_timeout)
+
+    return page
+
+
+def store_complete_results(
+    ac_class, search, context, page_size, items, texts, generation=None
+):
+    """
+    texts holds the normalized searchable texts of each item
+    """
+    key = get_search_cache_key(
+        ac_class,
+        search,
+        context,
+        page_size,
+        kind="complete",
+        generation=generation,
+    )
+    get_cache(ac_class).set(
+        key, (items, texts), timeout=ac_class.cache_timeout
+    )
+
+
+def refine_search_page(ac_class, search, context, page_size, generation=None):
+    """
+    Answers the search by filtering the complete results
+    of a shorter search that it extends
+
+    Returns None when no such results are cached
+    """
+    if generation is None:
+        generation = get_generation(ac_class)
+
+    # searches shorter than the minimum length never ran
+    lengths_by_key = {
+        get_search_cache_key(
+            ac_class,
+            search[:length],
+            context,
+            page_size,
+            kind="complete",
+            generation=generation,
+        ): length
+        for length in range(ac_class.minimum_search_length, len(search))
+    }
+    found = get_cache(ac_class).get_many(list(lengths_by_key))
+    if not found:
+        return None
+
+    longest_key = max(found, key=lengths_by_key.get)
+    items, texts = found[longest_key]
+
+    # same semantics as icontains
+    normalized = ac_class.normalize_search(search)
+    matches = [
+        (item, item_texts)
+        for item, item_texts in zip(items, texts)
+        if any(normalized in t for t in item_texts)
+    ]
+    refined_items = [item for item, _ in matches]
+
+    # the refined set is complete too, longer searches can start from it
+    store_complete_results(
+        ac_class,
+        search,
+        context,
+        page_size,
+        refined_items,
+        [item_texts for _, item_texts in matches],
+        generation=generation,
+    )
+
+    return core.SearchPage(
+        items=refined_items, has_more=False, total=len(refined_items)
+    )
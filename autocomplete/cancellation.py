@@ -0,0 +1,189 @@
+"""
+Cancels searches superseded by a newer search of the same component
+
+The browser numbers each component's item requests (search_seq), along
+with a random per-page client id (search_client). The latest number of
+each (session, client, component) is kept in the cache, so any worker can
+answer an older request without searching.
+
+Within a process, starting a search also interrupts the older search of
+the component that is still running: its database query is cancelled
+(PostgreSQL and SQLite) or, on the async views, its task is.
+"""
+
+import hashlib
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable
+
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, router
+
+# how long the latest sequence number of a component is remembered
+SEQUENCE_TIMEOUT = 600
+
+
+class SearchSuperseded(Exception):
+    pass
+
+
+@dataclass
+class InFlightSearch:
+    key: str
+    seq: int
+    # interrupts the search's current work, set while it can be interrupted
+    cancel: Callable | None = None
+    superseded: bool = False
+
+
+_in_flight = {}
+_lock = threading.Lock()
+
+
+def get_sequence(request):
+    try:
+        return int(request.GET["search_seq"])
+    except (KeyError, ValueError):
+        return None
+
+
+def get_search_key(ac_class, request, component_id):
+    session = getattr(request, "session", None)
+    session_key = getattr(session, "session_key", None) or ""
+    client = request.GET.get("search_client", "")
+
+    digest = hashlib.sha1(
+        "\0".join([session_key, client, component_id]).encode("utf-8")
+    ).hexdigest()
+
+    return f"autocomplete:seq:{ac_class.route_name}:{digest}"
+
+
+def start_search(ac_class, key, seq):
+    """
+    Records the search as its component's latest and interrupts the
+    previous one, returns None if a newer search was already started
+    """
+    cache = caches[ac_class.cache_alias]
+
+    latest = cache.get(key)
+    if latest is not None and latest > seq:
+        return None
+    cache.set(key, seq, timeout=SEQUENCE_TIMEOUT)
+
+    with _lock:
+        previous = _in_flight.get(key)
+        if previous is not None and previous.seq > seq:
+            return None
+
+        search = InFlightSearch(key=key, seq=seq)
+        _in_flight[key] = search
+
+        if previous is not None:
+            previous.superseded = True
+            if previous.cancel is not None:
+                previous.cancel()
+
+    return search
+
+
+def is_superseded(ac_class, search):
+    if search.superseded:
+        return True
+
+    latest = caches[ac_class.cache_alias].get(search.key)
+    return latest is not None and latest > search.seq
+
+
+def finish_search(search):
+    with _lock:
+        search.cancel = None
+        if _in_flight.get(search.key) is search:
+            del _in_flight[search.key]
+
+
+def set_cancel(search, cancel):
+    """
+    cancel is called, under the lock, if a newer search starts
+    """
+    with _lock:
+        if search.superseded:
+            raise SearchSuperseded()
+        search.cancel = cancel
+
+
+def clear_cancel(search):
+    with _lock:
+        search.cancel = None
+
+
+def searches_database(ac_class):
+    """
+    Whether the autocomplete's searches go through database queries
+    """
+    from .shortcuts import IndexedAutocomplete, MmapIndexedAutocomplete
+
+    if getattr(ac_class, "model", None) is None:
+        # Autocomplete subclasses search however they like
+        return False
+    if issubclass(ac_class, (IndexedAutocomplete, MmapIndexedAutocomplete)):
+        # searched in memory, not through queries
+        return False
+    return True
+
+
+def get_database_alias(ac_class):
+    model = getattr(ac_class, "model", None)
+    if model is None:
+        return DEFAULT_DB_ALIAS
+    return router.db_for_read(model)
+
+
+def get_connection_cancel(connection):
+    """
+    Returns a function interrupting the connection's current query from
+    another thread, or None if the backend can't
+    """
+    raw_connection = connection.connection
+    if connection.vendor == "postgresql":
+        # sends a cancel request for the backend's current query
+        return raw_connection.cancel
+    if connection.vendor == "sqlite":
+        return raw_connection.interrupt
+    return None
+
+
+def get_query_cancel(using):
+    """
+    Returns a function interrupting the current query of the thread's
+    connection to the using database, or None if it can't be interrupted
+    """
+    connection = connections[using]
+    connection.ensure_connection()
+    return get_connection_cancel(connection)
+
+
+@contextmanager
+def cancellable_queries(search, using):
+    """
+    Lets a newer search interrupt the queries run in the block,
+    which then raises SearchSuperseded
+
+    using is None for searches that don't query the database,
+    which have no query to interrupt
+    """
+    cancel = None
+    if using is not None:
+        cancel = get_query_cancel(using)
+    if cancel is not None:
+        set_cancel(search, cancel)
+
+    try:
+        yield
+    except DatabaseError as e:
+        if search.superseded:
+            raise SearchSuperseded() from e
+        raise
+    finally:
+        clear_cancel(search)
@@ -0,0 +1,257 @@
+"""
+System checks for registered autocompletes
+"""
+
+from django.core import checks
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.db.models.functions import Lower, Upper
+
+# the expression an index is on, and how it's searched: equality, prefix
+# (LIKE 'abc%') or substring (LIKE '%abc%') matches
+PLAIN = "plain"
+UPPER = "upper"
+LOWER = "lower"
+EQUAL = "equal"
+PATTERN = "pattern"
+TRIGRAM = "trigram"
+
+# index needed by each base lookup, Django compares UPPER(attr) for the
+# case-insensitive ones
+BASE_LOOKUP_INDEXES = {
+    "exact": EQUAL,
+    "startswith": PATTERN,
+    "iexact": EQUAL,
+    "istartswith": PATTERN,
+    "contains": TRIGRAM,
+    "icontains": TRIGRAM,
+}
+UPPER_LOOKUPS = {"iexact", "istartswith", "icontains"}
+
+# on PostgreSQL, B-tree indexes only support LIKE 'abc%' with one of these
+# operator classes (unless the database uses the C collation), which is why
+# Django adds a "_like" index to db_index text columns
+PATTERN_OPCLASSES = {
+    "text_pattern_ops",
+    "varchar_pattern_ops",
+    "bpchar_pattern_ops",
+}
+
+
+@checks.register(checks.Tags.models)
+def check_search_lookups(app_configs=None, **kwargs):
+    """
+    autocomplete.W001: a lookup declared in search_attrs
+    has no index to support it
+    """
+    from .core import _ac_registry
+    from .shortcuts import ModelAutocomplete
+
+    warnings = []
+
+    for ac_class in _ac_registry.values():
+        if not issubclass(ac_class, ModelAutocomplete) or not ac_class.model:
+            continue
+
+        model = ac_class.get_model()
+        if (
+            app_configs is not None
+            and model._meta.app_config not in app_configs
+        ):
+            continue
+
+        warnings.extend(check_ac_class(ac_class))
+
+    return warnings
+
+
+def check_ac_class(ac_class):
+    from .shortcuts import (
+        LOWER_PREFIX,
+        NORMALIZED_PREFIX,
+        UNACCENT_PREFIX,
+        parse_lookup,
+    )
+
+    model = ac_class.get_model()
+    warnings = []
+
+    # attributes given without a lookup use icontains, which no B-tree
+    # index supports either, only declared lookups are checked
+    declared = [e for e in ac_class.search_attrs if not isinstance(e, str)]
+
+    for attr, lookup in declared:
+        prefix, base = parse_lookup(lookup)
+
+        if prefix == UNACCENT_PREFIX:
+            warnings.append(
+                checks.Warning(
+                    f"{ac_class.__name__} searches '{attr}' with "
+                    f"'{lookup}', which can't use an index.",
+                    hint=(
+                        "unaccent() can't be indexed, use a "
+                        "normalized_* lookup on a normalized_fields "
+                        "column instead."
+                    ),
+                    obj=ac_class,
+                    id="autocomplete.W001",
+                )
+            )
+            continue
+
+        path = attr
+        if prefix == NORMALIZED_PREFIX:
+            path = ac_class.normalized_fields.get(attr, attr)
+
+        field = resolve_field(model, path)
+        if field is None:
+            continue
+
+        if prefix == LOWER_PREFIX:
+            expression = LOWER
+        elif base in UPPER_LOOKUPS:
+            expression = UPPER
+        else:
+            expression = PLAIN
+        needed = (expression, BASE_LOOKUP_INDEXES[base])
+
+        if needed not in get_index_kinds(field):
+            warnings.append(
+                checks.Warning(
+                    f"{ac_class.__name__} searches '{attr}' with "
+                    f"'{lookup}', but {field.model.__name__}."
+                    f"{field.name} has no supporting index.",
+                    hint=get_index_hint(field, needed),
+                    obj=ac_class,
+                    id="autocomplete.W001",
+                )
+            )
+
+    return warnings
+
+
+def resolve_field(model, path):
+    """
+    Follows a search_attrs path to its field, None if it doesn't resolve
+    """
+    *relations, name = path.split("__")
+    try:
+        for part in relations:
+            model = model._meta.get_field(part).related_model
+            if model is None:
+                return None
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def get_index_kinds(field):
+    """
+    Returns the (expression, search) kinds of the indexes leading with the
+    field, as far as the model's state tells (indexes only created by
+    migrations aren't seen)
+    """
+    opts = field.model._meta
+    kinds = set()
+
+    if field.db_index or field.unique or field.primary_key:
+        kinds.add((PLAIN, EQUAL))
+        if isinstance(field, (models.CharField, models.TextField)):
+            # along with the "_like" index Django creates on PostgreSQL
+            kinds.add((PLAIN, PATTERN))
+
+    for fields in opts.unique_together:
+        if fields and fields[0] == field.name:
+            kinds.add((PLAIN, EQUAL))
+
+    for index in [*opts.indexes, *opts.constraints]:
+        opclasses = getattr(index, "opclasses", None) or [None]
+
+        if getattr(index, "fields", None):
+            if index.fields[0].lstrip("-") == field.name:
+                kinds.update(get_searches(index, PLAIN, opclasses[0]))
+            continue
+
+        expressions = getattr(index, "expressions", None)
+        if expressions:
+            expression, opclass = get_expression_kind(expressions[0], field)
+            if expression is not None:
+                kinds.update(get_searches(index, expression, opclass))
+
+    return kinds
+
+
+def get_searches(index, expression, opclass):
+    if is_gin_index(index):
+        return {(expression, TRIGRAM)}
+    if opclass in PATTERN_OPCLASSES:
+        return {(expression, EQUAL), (expression, PATTERN)}
+    return {(expression, EQUAL)}
+
+
+def is_gin_index(index):
+    # without importing django.contrib.postgres, which needs psycopg
+    return getattr(index, "suffix", None) == "gin"
+
+
+def get_expression_kind(expression, field):
+    """
+    Returns the kind of the indexed expression, None if it isn't one of the
+    field's, and its operator class
+    """
+    opclass = None
+
+    # unwrap OpClass, OrderBy and the like
+    while not isinstance(expression, (models.F, Upper, Lower)):
+        if type(expression).__name__ == "OpClass":
+            opclass = expression.extra.get("name")
+        sources = expression.get_source_expressions()
+        if len(sources) != 1:
+            return None, None
+        expression = sources[0]
+
+    if isinstance(expression, models.F):
+        if expression.name == field.name:
+            return PLAIN, opclass
+        return None, None
+
+    sources = expression.get_source_expressions()
+    if (
+        len(sources) == 1
+        and isinstance(sources[0], models.F)
+        and sources[0].name == field.name
+    ):
+        return (UPPER if isinstance(expression, Upper) else LOWER), opclass
+
+    return None, None
+
+
+def get_index_hint(field, needed):
+    name = field.name
+    expression, search = needed
+
+    if expression == PLAIN:
+        indexed = f'"{name}"'
+    elif expression == UPPER:
+        indexed = f'Upper("{name}")'
+    else:
+        indexed = f'Lower("{name}")'
+
+    if search == TRIGRAM:
+        return (
+            f"No B-tree index helps a contains lookup, add "
+            f'GinIndex(OpClass({indexed}, name="gin_trgm_ops"), ...) '
+            "to Meta.indexes, or use a prefix lookup."
+        )
+
+    if expression == PLAIN:
+        # on PostgreSQL, db_index also creates the pattern index
+        return f"Add db_index=True to {name}."
+
+    if search == PATTERN:
+        return (
+            f'Add models.Index(OpClass({indexed}, name="text_pattern_ops"), '
+            "...) to Meta.indexes, prefix matches can't use a plain index "
+            "on PostgreSQL."
+        )
+    return f"Add models.Index({indexed}, ...) to Meta.indexes."
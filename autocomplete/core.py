@@ -1,10 +1,36 @@
-from dataclasses import dataclass
+import itertools
+from dataclasses import dataclass, field
 
 from django.conf import settings
+from django.core import signing
 from django.core.exceptions import PermissionDenied
 from django.http import HttpRequest
 from django.utils.translation import gettext_lazy as _
 
+from asgiref.sync import sync_to_async
+
+from . import cache as search_cache
+from . import throttle
+
+# How ItemsView learns the total number of results, see count_strategy
+COUNT_EXACT = "exact"
+# count up to count_cap results, reports "count_cap+"
+COUNT_CAPPED = "capped"
+# query planner estimate, where supported
+COUNT_ESTIMATE = "estimate"
+# COUNT(*) OVER() in the same query as the page, where supported
+COUNT_WINDOW = "window"
+# don't count, only report that more results are available
+COUNT_NONE = "none"
+
+COUNT_STRATEGIES = {
+    COUNT_EXACT,
+    COUNT_CAPPED,
+    COUNT_ESTIMATE,
+    COUNT_WINDOW,
+    COUNT_NONE,
+}
+
 # This is the registry of registered autocomplete classes,
 # i.e. the ones who respond to requests
 _ac_registry = {}
@@ -39,6 +65,8 @@ def register(ac_class: type, route_name: str = None):
 
     _ac_registry[route_name] = ac_class
 
+    ac_class.on_register()
+
     return ac_class
 
 
@@ -48,10 +76,69 @@ class Autocomplete:
     narrow_search_text = _(
         "Showing %(page_size)s of %(total)s items. Narrow your search for more results."
     )
+    narrow_search_capped_text = _(
+        "Showing %(page_size)s of %(total)s+ items. Narrow your search for more results."
+    )
+    narrow_search_estimated_text = _(
+        "Showing %(page_size)s of about %(total)s items. Narrow your search for more results."
+    )
+    more_results_available_text = _(
+        "Showing the first %(page_size)s items. Narrow your search for more results."
+    )
+    loading_more_text = _("Loading more results…")
+    search_too_broad_text = _(
+        "Too many possible results. Keep typing to narrow your search."
+    )
     type_at_least_n_characters = _("Type at least %(n)s characters")
     minimum_search_length = 3
     max_results = 100
     component_prefix = ""
+    count_strategy = COUNT_EXACT
+    count_cap = 1000
+    # search result caching is opt-in, set a timeout in seconds to enable it
+    cache_timeout = 0
+    cache_alias = "default"
+    # names of client_kwargs that affect search results, part of the cache key
+    cache_client_kwargs = []
+    # answer longer searches from the cached results of shorter ones,
+    # requires cache_timeout
+    refine_searches = False
+    # load the next page of results when the end of the list is scrolled to,
+    # for search results that support cursors (see QuerysetMappedIterable)
+    load_more_results = False
+    # on the sync views, look up the selected items while searching, in a
+    # pool thread with its own database connection (see run_concurrently)
+    concurrent_queries = False
+    # answer item requests superseded by a newer search of the same
+    # component with an empty response, interrupting their queries
+    cancel_superseded_searches = False
+    # time budget of a search in milliseconds, searches running over it
+    # ask the user to keep typing instead (see timeouts.py)
+    search_timeout_ms = None
+    # "N/s", "N/m", "N/h" or "N/d", requests allowed per user (or IP address
+    # when logged out), defaults to the AUTOCOMPLETE_THROTTLE_RATE setting,
+    # False disables it (see throttle.py)
+    throttle_rate = None
+    # send an ETag with item responses, built from the data version (see
+    # invalidate_cache) and the request, and answer repeated requests
+    # with 304 Not Modified without searching
+    etag_responses = False
+    # patch_cache_control() arguments for item responses,
+    # e.g. {"private": True, "max_age": 60}
+    cache_control = {}
+    # number of item responses the widget keeps per component, to show
+    # them again without a request when a search is repeated, opt-in as
+    # they're kept for the life of the page
+    client_cache_size = 0
+    # option sets of at most this many items are sent to the widget once,
+    # which then searches them itself (see get_local_items), 0 disables
+    local_threshold = 0
+    # number of rendered item rows kept in memory, least recently used
+    # ones are dropped, 0 disables (see rendering.py)
+    fragment_cache_size = 0
+    # cache alias sharing the rendered rows between processes, on top of
+    # the in-memory rows, requires fragment_cache_size
+    fragment_cache_alias = None
 
     @classmethod
     def auth_check(cls, request):
@@ -77,6 +164,15 @@ class Autocomplete:
                 "You must implement a get_items_from_keys method."
             )
 
+        if cls.refine_searches and not cls.cache_timeout:
+            raise ValueError("refine_searches requires a cache_timeout.")
+
+        if cls.count_strategy not in COUNT_STRATEGIES:
+            raise ValueError(f"Invalid count_strategy '{cls.count_strategy}'.")
+
+        if cls.throttle_rate:
+            throttle.parse_rate(cls.throttle_rate)
+
     @classmethod
     def map_search_results(cls, items_iterable, selected_keys=None):
         """
@@ -97,11 +193,264 @@ class Autocomplete:
             for i in items_iterable
         ]
 
+    @classmethod
+    def on_register(cls):
+        """
+        Called once the class is registered and has its route_name
+        """
+        pass
+
+    @classmethod
+    def normalize_search(cls, search):
+        """
+        Searches that normalize to the same string share cached results
+
+        The default suits case-insensitive searches, like ModelAutocomplete's
+        """
+        return search.lower()
+
+    @classmethod
+    def get_refinement_texts(cls, items, context):
+        """
+        Returns, for each item, the list of texts the search is matched against
+
+        With refine_searches, a search that extends a shorter one is answered
+        by keeping the shorter one's results whose texts contain the search.
+        The default is only correct if search_items does a
+        case-insensitive "contains" match on labels
+        """
+        return [[str(i["label"])] for i in items]
+
+    @classmethod
+    def get_local_items(cls, context):
+        """
+        For local_threshold, returns (items, texts) with every item and the
+        texts searches are matched against, as in get_refinement_texts,
+        or None if there are more than local_threshold items
+
+        The widget searches the texts with a case-insensitive "contains"
+        match. The default can't list every item, it always returns None
+        """
+        return None
+
+    @classmethod
+    def invalidate_cache(cls):
+        """
+        Call this when the data behind the autocomplete changes,
+        so that cached results are no longer served
+        """
+        search_cache.bump_generation(cls)
+
+    @classmethod
+    def get_search_page(cls, search, context, page_size):
+        """
+        Returns the SearchPage for the search,
+        from the cache when cache_timeout is set
+        """
+        if cls.cache_timeout:
+            return search_cache.get_cached_search_page(
+                cls, search, context, page_size
+            )
+
+        return cls.fetch_search_page(search, context, page_size)
+
+    @classmethod
+    async def aget_search_page(cls, search, context, page_size):
+        """
+        Async counterpart of get_search_page
+        """
+        if cls.cache_timeout:
+            # the cache is only used synchronously
+            return await sync_to_async(cls.get_search_page)(
+                search, context, page_size
+            )
+
+        return await cls.afetch_search_page(search, context, page_size)
+
+    @classmethod
+    async def asearch_items(cls, search, context):
+        """
+        Async counterpart of search_items, used by the async views
+
+        Results with an aslice(start, stop) coroutine method are fetched
+        with it, others are fetched in a thread. The default runs
+        search_items in a thread, override it along with search_items
+        """
+        return await sync_to_async(cls.search_items)(search, context)
+
+    @classmethod
+    async def aget_items_from_keys(cls, keys, context):
+        """
+        Async counterpart of get_items_from_keys, used by the async views
+
+        The default runs get_items_from_keys in a thread
+        """
+        return await sync_to_async(cls.get_items_from_keys)(keys, context)
+
+    @classmethod
+    async def aget_total_results(cls, search_results, context):
+        """
+        Async counterpart of get_total_results
+
+        The default runs get_total_results in a thread
+        """
+        return await sync_to_async(cls.get_total_results)(
+            search_results, context
+        )
+
+    @classmethod
+    def fetch_search_page(cls, search, context, page_size, position=None):
+        """
+        Fetches at most page_size results for the search,
+        plus one extra to know whether there are more
+
+        search_items should leave out context.selected_keys,
+        any selected item it still returns is dropped here
+
+        position continues the search after a previous page,
+        see get_next_cursor
+        """
+        search_results = cls.search_items(search, context)
+        if position is not None:
+            search_results = search_results.after(position)
+
+        fetched = take_first(search_results, page_size + 1)
+
+        # only the first page reports a total
+        total_results = None
+        if len(fetched) > page_size and position is None:
+            total_results = cls.get_total_results(search_results, context)
+
+        return cls.make_search_page(
+            search, context, page_size, search_results, fetched, total_results
+        )
+
+    @classmethod
+    async def afetch_search_page(
+        cls, search, context, page_size, position=None
+    ):
+        """
+        Async counterpart of fetch_search_page
+        """
+        search_results = await cls.asearch_items(search, context)
+        if position is not None:
+            search_results = search_results.after(position)
+
+        fetched = await atake_first(search_results, page_size + 1)
+
+        total_results = None
+        if len(fetched) > page_size and position is None:
+            total_results = await cls.aget_total_results(
+                search_results, context
+            )
+
+        return cls.make_search_page(
+            search, context, page_size, search_results, fetched, total_results
+        )
+
+    @classmethod
+    def make_search_page(
+        cls, search, context, page_size, search_results, fetched, total_results
+    ):
+        """
+        fetched holds up to page_size + 1 search results,
+        total_results is the (total, total_kind) of get_total_results
+        or None if it wasn't needed
+        """
+        selected_keys = {str(k) for k in context.selected_keys}
+        items = [i for i in fetched if str(i["key"]) not in selected_keys]
+
+        if len(fetched) <= page_size:
+            return SearchPage(items=items, has_more=False, total=len(items))
+
+        total, total_kind = total_results or (None, COUNT_NONE)
+        if total is not None:
+            # selected items that were returned should not be counted
+            total -= len(fetched) - len(items)
+
+        items = items[:page_size]
+
+        return SearchPage(
+            items=items,
+            has_more=True,
+            total=total,
+            total_kind=total_kind,
+            next_cursor=cls.get_next_cursor(search, search_results, items),
+        )
+
+    @classmethod
+    def get_next_cursor(cls, search, search_results, items):
+        """
+        Returns a signed cursor to the results after items, or None
+
+        Search results support cursors with get_position(item),
+        returning a JSON-serializable position (or None), and
+        after(position), returning the results after that position
+        """
+        if not (
+            cls.load_more_results
+            and items
+            and hasattr(search_results, "get_position")
+        ):
+            return None
+
+        position = search_results.get_position(items[-1])
+        if position is None:
+            return None
+
+        return signing.dumps(
+            {"search": search, "position": position},
+            salt=f"autocomplete.cursor:{cls.route_name}",
+        )
+
+    @classmethod
+    def read_cursor(cls, cursor):
+        """
+        Returns the (search, position) of a cursor from get_next_cursor,
+        raises signing.BadSignature if it was tampered with
+        """
+        data = signing.loads(
+            cursor, salt=f"autocomplete.cursor:{cls.route_name}"
+        )
+        return data["search"], data["position"]
+
+    @classmethod
+    def get_total_results(cls, search_results, context):
+        """
+        Returns a (total, total_kind) tuple for the search results,
+        total_kind is one of the COUNT_* constants
+
+        This is only called when there are more results than max_results
+
+        The generic implementation only knows how to count exactly, with len(),
+        or to cap the count by slicing; see ModelAutocomplete for the others
+        """
+        if cls.count_strategy == COUNT_NONE:
+            return None, COUNT_NONE
+
+        if cls.count_strategy == COUNT_CAPPED and hasattr(
+            search_results, "__getitem__"
+        ):
+            total = len(take_first(search_results, cls.count_cap + 1))
+            if total > cls.count_cap:
+                return cls.count_cap, COUNT_CAPPED
+            return total, COUNT_EXACT
+
+        if hasattr(search_results, "__len__"):
+            return len(search_results), COUNT_EXACT
+
+        return None, COUNT_NONE
+
     @classmethod
     def get_custom_strings(cls):
         return {
             "no_results": cls.no_result_text,
             "more_results": cls.narrow_search_text,
+            "more_results_capped": cls.narrow_search_capped_text,
+            "more_results_estimated": cls.narrow_search_estimated_text,
+            "more_results_available": cls.more_results_available_text,
+            "loading_more": cls.loading_more_text,
+            "search_too_broad": cls.search_too_broad_text,
             "type_at_least_n_characters": cls.type_at_least_n_characters,
         }
 
@@ -138,3 +487,59 @@ class Autocomplete:
 class ContextArg:
     request: HttpRequest
     client_kwargs: dict
+    # keys already selected in the component, search results should omit them
+    selected_keys: list = field(default_factory=list)
+
+
+@dataclass
+class SearchPage:
+    items: list
+    has_more: bool
+    # None when the total is unknown
+    total: int | None
+    # one of the COUNT_* constants, describes how total was obtained
+    total_kind: str = COUNT_EXACT
+    # continues the search after items, see Autocomplete.get_next_cursor
+    next_cursor: str | None = None
+    # the search ran over search_timeout_ms, items is empty
+    timed_out: bool = False
+
+
+def take_first(iterable, n):
+    """
+    Returns a list of at most n items from the iterable
+
+    Sliceable iterables (lists, querysets, QuerysetMappedIterable) are sliced,
+    so that only n items are fetched; others are consumed lazily
+    """
+    if hasattr(iterable, "__getitem__"):
+        try:
+            return list(iterable[:n])
+        except (TypeError, KeyError):
+            pass
+
+    return list(itertools.islice(iterable, n))
+
+
+async def atake_first(iterable, n):
+    """
+    Async counterpart of take_first, for the results of asearch_items
+    """
+    if hasattr(iterable, "aslice"):
+        return await iterable.aslice(0, n)
+
+    return await sync_to_async(take_first)(iterable, n)
+
+
+def overrides_sync(cls, sync_name, async_name):
+    """
+    Whether cls overrides the sync method below the class that implements
+    its async counterpart, in which case the async one doesn't apply
+    and the sync one should run in a thread instead
+    """
+    for klass in cls.__mro__:
+        if async_name in klass.__dict__:
+            return False
+        if sync_name in klass.__dict__:
+            return True
+    return False
@@ -0,0 +1,132 @@
+"""
+Jinja2 environment extension for the autocomplete/jinja2 templates
+
+Add it to a Jinja2 engine, and render the component with that engine:
+
+    TEMPLATES = [
+        {
+            "BACKEND": "django.template.backends.jinja2.Jinja2",
+            "APP_DIRS": True,
+            "OPTIONS": {
+                "extensions": ["autocomplete.jinja.AutocompleteExtension"],
+            },
+        },
+        ...
+    ]
+
+    AUTOCOMPLETE_TEMPLATE_BACKEND = "jinja2"
+
+The extension provides the filters and functions of the autocomplete
+template tags, and Django's translations through jinja2's i18n extension.
+Requires jinja2.
+"""
+
+from functools import wraps
+
+from django.template.defaultfilters import escapejs
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils import translation
+
+from jinja2 import pass_context
+from jinja2.ext import InternationalizationExtension
+from markupsafe import Markup
+
+from .templatetags import autocomplete as tags
+
+
+def with_context(func):
+    """
+    The template tags read the template's variables with context.get,
+    which jinja2's context supports as well
+    """
+
+    @pass_context
+    @wraps(func)
+    def wrapper(context, *args, **kwargs):
+        return func(context, *args, **kwargs)
+
+    return wrapper
+
+
+def url(name, *args, **kwargs):
+    return reverse(name, args=args or None, kwargs=kwargs or None)
+
+
+@pass_context
+def use_string(context, name, strings, **values):
+    """
+    As the use_string tag, from the autocomplete/strings jinja2 templates.
+    Functions only see the template's context, loop variables the string
+    reads are passed as values
+    """
+    if name in strings:
+        return strings[name]
+
+    template = context.environment.get_template(
+        f"autocomplete/strings/{name}.html"
+    )
+    return Markup(template.render({**context.get_all(), **values}))
+
+
+@pass_context
+def autocomplete_head(context, bootstrap=False):
+    template = context.environment.get_template("autocomplete/head.html")
+    return Markup(template.render(bootstrap=bootstrap))
+
+
+@pass_context
+def autocomplete_scripts(
+    context, bootstrap=False, htmx=False, htmx_csrf=False
+):
+    template = context.environment.get_template("autocomplete/scripts.html")
+    return Markup(
+        template.render(
+            csrf_token=context.get("csrf_token", ""),
+            bootstrap=bootstrap,
+            htmx=htmx,
+            htmx_csrf=htmx_csrf,
+        )
+    )
+
+
+class AutocompleteExtension(InternationalizationExtension):
+    """
+    jinja2's i18n extension ({% trans %}) with Django's translations,
+    along with the autocomplete filters and functions
+    """
+
+    def __init__(self, environment):
+        super().__init__(environment)
+
+        environment.install_gettext_translations(translation, newstyle=True)
+
+        environment.filters.update(
+            {
+                "make_id": tags.make_id,
+                "search_highlight": tags.search_highlight,
+                "js_boolean": tags.js_boolean,
+                "escapejs": escapejs,
+            }
+        )
+        environment.globals.update(
+            {
+                "url": url,
+                "static": static,
+                "use_string": use_string,
+                "substitute_string": tags.substitute_string,
+                "value_if_truthy": tags.value_if_truthy,
+                "autocomplete_head": autocomplete_head,
+                "autocomplete_scripts": autocomplete_scripts,
+                "base_configurable_values_hx_params": with_context(
+                    tags.base_configurable_values_hx_params
+                ),
+                "base_configurable_hx_vals": with_context(
+                    tags.base_configurable_hx_vals
+                ),
+                "text_input_hx_vals": with_context(tags.text_input_hx_vals),
+                "load_more_hx_vals": with_context(tags.load_more_hx_vals),
+                "get_input_value": with_context(tags.get_input_value),
+                "get_chip_label": with_context(tags.get_chip_label),
+            }
+        )
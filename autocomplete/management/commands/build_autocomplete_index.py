@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from autocomplete.core import _ac_registry
+from autocomplete.search_index import write_index_file
+
+
+class Command(BaseCommand):
+    help = (
+        "Exports the searchable items of a registered autocomplete "
+        "to an index file, for MmapIndexedAutocomplete"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "ac_name", help="route name of the registered autocomplete"
+        )
+        parser.add_argument(
+            "--output",
+            help="where to write the index, defaults to the class' index_path",
+        )
+
+    def handle(self, *args, ac_name, output=None, **options):
+        try:
+            ac_class = _ac_registry[ac_name]
+        except KeyError as e:
+            raise CommandError(
+                f"No registered autocomplete with name {ac_name}"
+            ) from e
+
+        if not hasattr(ac_class, "get_index_items"):
+            raise CommandError(
+                f"{ac_name} must implement get_index_items to be indexed"
+            )
+
+        path = output or getattr(ac_class, "index_path", None)
+        if not path:
+            raise CommandError(f"{ac_name} has no index_path, use --output")
+
+        row_count = write_index_file(path, ac_class.get_index_items())
+
+        self.stdout.write(f"Indexed {row_count} items of {ac_name} to {path}")
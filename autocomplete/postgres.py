@@ -0,0 +1,146 @@
+"""
+PostgreSQL search modes for ModelAutocomplete
+
+- "trigram" matches search_attrs with pg_trgm's similarity operator (%),
+  as well as a case-insensitive "contains" for searches too short to be
+  similar, and orders results by similarity
+- "fulltext" matches the search's words as prefixes of the words in
+  search_attrs, and orders results by rank
+
+Both can use GIN indexes, see get_search_indexes and search_index_operations.
+Requires psycopg (or psycopg2), like the rest of django.contrib.postgres.
+"""
+
+import hashlib
+import operator
+import re
+from functools import reduce
+
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.lookups import TrigramSimilar
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramSimilarity,
+)
+from django.db import migrations
+from django.db.models import F, Q, Value
+from django.db.models.functions import Greatest, Upper
+from django.db.models.lookups import IContains
+
+from .shortcuts import SEARCH_FULLTEXT, SEARCH_TRIGRAM
+
+
+def trigram_search(queryset, search, attrs):
+    conditions = [
+        Q(TrigramSimilar(F(attr), Value(search)))
+        | Q(IContains(F(attr), search))
+        for attr in attrs
+    ]
+    similarities = [TrigramSimilarity(attr, search) for attr in attrs]
+    rank = (
+        similarities[0] if len(similarities) == 1 else Greatest(*similarities)
+    )
+
+    return (
+        queryset.filter(reduce(operator.or_, conditions))
+        .annotate(_ac_rank=rank)
+        .order_by("-_ac_rank", "pk")
+    )
+
+
+def prefix_tsquery(search):
+    """
+    Builds a raw tsquery matching every word of the search as a prefix
+
+    Only word characters are kept, so the search can't inject tsquery syntax
+    """
+    words = re.findall(r"\w+", search)
+    return " & ".join(f"{word}:*" for word in words)
+
+
+def get_search_vector(attrs, config):
+    return SearchVector(*attrs, config=config)
+
+
+def fulltext_search(queryset, search, attrs, config):
+    raw_query = prefix_tsquery(search)
+    if not raw_query:
+        return queryset.none()
+
+    vector = get_search_vector(attrs, config)
+    query = SearchQuery(raw_query, search_type="raw", config=config)
+
+    return (
+        queryset.annotate(_ac_vector=vector)
+        .filter(_ac_vector=query)
+        .annotate(_ac_rank=SearchRank(vector, query))
+        .order_by("-_ac_rank", "pk")
+    )
+
+
+def _index_name(ac_class, *parts):
+    # index names are limited to 30 characters
+    table = ac_class.get_model()._meta.db_table
+    digest = hashlib.sha1(":".join([table, *parts]).encode()).hexdigest()
+    return f"ac_{digest[:16]}_{parts[0][:4]}"
+
+
+def get_search_indexes(ac_class):
+    """
+    Returns the indexes supporting ac_class' search_mode,
+    to add to the model's Meta.indexes or to a migration
+    """
+    attrs = ac_class.get_search_attr_names()
+
+    if ac_class.search_mode == SEARCH_TRIGRAM:
+        indexes = []
+        for attr in attrs:
+            # one for the similarity operator, one for the "contains" match
+            indexes.append(
+                GinIndex(
+                    fields=[attr],
+                    opclasses=["gin_trgm_ops"],
+                    name=_index_name(ac_class, "trgm", attr),
+                )
+            )
+            indexes.append(
+                GinIndex(
+                    OpClass(Upper(attr), name="gin_trgm_ops"),
+                    name=_index_name(ac_class, "trgm_upper", attr),
+                )
+            )
+        return indexes
+
+    if ac_class.search_mode == SEARCH_FULLTEXT:
+        return [
+            GinIndex(
+                get_search_vector(attrs, ac_class.search_config),
+                name=_index_name(ac_class, "fts", *attrs),
+            )
+        ]
+
+    return []
+
+
+def search_index_operations(ac_class):
+    """
+    Returns migration operations creating the indexes for ac_class,
+    for use in a migration of the model's app
+
+        operations = search_index_operations(PersonAutocomplete)
+    """
+    model_name = ac_class.get_model()._meta.model_name
+
+    operations = []
+    if ac_class.search_mode == SEARCH_TRIGRAM:
+        operations.append(TrigramExtension())
+
+    operations.extend(
+        migrations.AddIndex(model_name=model_name, index=index)
+        for index in get_search_indexes(ac_class)
+    )
+
+    return operations
@@ -0,0 +1,233 @@
+"""
+Fast path for rendering item rows
+
+item_list.html and item_page.html include item.html once per item, going
+through the template engine for every row. ItemRenderer formats the rows
+with plain string operations instead, producing the same markup as
+item.html.
+
+It is only used while item.html isn't overridden by the project's
+templates, otherwise the templates render the rows.
+
+With fragment_cache_size, the rendered rows are kept in an LRU cache per
+autocomplete, keyed by everything the markup depends on (component id,
+key, label, selected and search), and with fragment_cache_alias in a cache
+shared by all processes as well.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template import loader
+from django.utils.html import conditional_escape, escape
+from django.utils.safestring import SafeData, mark_safe
+
+from .templatetags.autocomplete import (
+    make_id,
+    search_highlight,
+)
+
+ITEM_TEMPLATE = "autocomplete/item.html"
+
+# the packaged item.html of the Django and Jinja2 template sets
+DEFAULT_ITEM_TEMPLATES = {
+    (
+        Path(__file__).parent / directory / "autocomplete" / "item.html"
+    ).resolve()
+    for directory in ("templates", "jinja2")
+}
+
+
+def get_template_backend():
+    """
+    The alias of the template engine rendering the component,
+    the AUTOCOMPLETE_TEMPLATE_BACKEND setting
+    """
+    return getattr(settings, "AUTOCOMPLETE_TEMPLATE_BACKEND", "django")
+
+
+def uses_default_item_template():
+    """
+    Whether autocomplete/item.html resolves to a packaged template
+    """
+    template = loader.get_template(ITEM_TEMPLATE, using=get_template_backend())
+    return Path(template.origin.name).resolve() in DEFAULT_ITEM_TEMPLATES
+
+
+# part of the shared cache keys, bump it when the rows' markup changes
+ROW_VERSION = 1
+
+_row_caches = {}
+_row_caches_lock = threading.Lock()
+
+
+class RowCache:
+    """
+    Rendered rows, least recently used first
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.rows = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            row = self.rows.get(key)
+            if row is not None:
+                self.rows.move_to_end(key)
+            return row
+
+    def set(self, key, row):
+        with self.lock:
+            self.rows[key] = row
+            self.rows.move_to_end(key)
+            while len(self.rows) > self.size:
+                self.rows.popitem(last=False)
+
+
+def get_row_cache(ac_class):
+    """
+    The autocomplete's in-memory row cache, None if it doesn't cache rows
+    """
+    size = ac_class.fragment_cache_size
+    if not size:
+        return None
+
+    with _row_caches_lock:
+        row_cache = _row_caches.get(ac_class.route_name)
+        if row_cache is None or row_cache.size != size:
+            row_cache = _row_caches[ac_class.route_name] = RowCache(size)
+
+    return row_cache
+
+
+class ItemRenderer:
+    """
+    Renders rows as item.html does with toggle and swap_oob unset,
+    context is the response's template context
+    """
+
+    def __init__(self, context):
+        self.search = context.get("search", "")
+        self.component_id = context["component_id"]
+
+        ac_class = context["ac_class"]
+        self.route_name = ac_class.route_name
+        self.row_cache = get_row_cache(ac_class)
+        self.shared_cache = None
+        if self.row_cache is not None and ac_class.fragment_cache_alias:
+            self.shared_cache = caches[ac_class.fragment_cache_alias]
+
+        # the row, split around its per-item parts; the attributes shared by
+        # the rows are on the listbox
+        self.id_prefix = (
+            "\n<a\n"
+            '    role="option"\n'
+            '    tabindex="-1"\n'
+            f'    id="{escape(context["component_id"])}__item__'
+        )
+        self.label_prefix = '"\n>\n    '
+        self.suffix = (
+            "\n"
+            '    <span class="phac_aspc_form_autocomplete__item__spaceholder"'
+            ' aria-hidden="true"></span>\n'
+            "</a>\n"
+            "\n"
+            "\n"
+        )
+
+    def render(self, item):
+        key = str(item["key"])
+        if item["selected"]:
+            selected = 'selected"\n    aria-selected="true"\n'
+        else:
+            selected = '"\n    aria-selected="false"\n'
+        label = conditional_escape(
+            search_highlight(item["label"], self.search)
+        )
+
+        return "".join(
+            [
+                self.id_prefix,
+                make_id(key),
+                '"\n    class="item ',
+                selected,
+                '    href="#"\n    data-key="',
+                escape(key),
+                self.label_prefix,
+                label,
+                self.suffix,
+            ]
+        )
+
+    def get_row_key(self, item):
+        label = item["label"]
+        return (
+            self.component_id,
+            str(item["key"]),
+            str(label),
+            # a safe label isn't escaped
+            isinstance(label, SafeData),
+            bool(item["selected"]),
+            self.search,
+        )
+
+    def get_shared_key(self, row_key):
+        digest = hashlib.sha1(
+            "\0".join(str(part) for part in row_key).encode("utf-8")
+        ).hexdigest()
+        return f"autocomplete:row:{ROW_VERSION}:{self.route_name}:{digest}"
+
+    def get_rows(self, items):
+        if self.row_cache is None:
+            return [self.render(item) for item in items]
+
+        row_keys = [self.get_row_key(item) for item in items]
+        rows = [self.row_cache.get(row_key) for row_key in row_keys]
+
+        if self.shared_cache is not None:
+            shared_keys = {
+                self.get_shared_key(row_keys[i]): i
+                for i, row in enumerate(rows)
+                if row is None
+            }
+            if shared_keys:
+                found = self.shared_cache.get_many(shared_keys)
+                for shared_key, row in found.items():
+                    i = shared_keys[shared_key]
+                    rows[i] = row
+                    self.row_cache.set(row_keys[i], row)
+
+        rendered = {}
+        for i, row in enumerate(rows):
+            if row is None:
+                rows[i] = self.render(items[i])
+                self.row_cache.set(row_keys[i], rows[i])
+                rendered[row_keys[i]] = rows[i]
+
+        if self.shared_cache is not None and rendered:
+            self.shared_cache.set_many(
+                {
+                    self.get_shared_key(row_key): row
+                    for row_key, row in rendered.items()
+                }
+            )
+
+        return rows
+
+    def render_rows(self, items, indent):
+        """
+        Renders the rows as a {% for %} loop over {% include "./item.html" %}
+        does, indent is the include's
+        """
+        outdent = indent[:-4]
+        return mark_safe(
+            "".join(
+                f"\n{indent}{row}\n{outdent}" for row in self.get_rows(items)
+            )
+        )
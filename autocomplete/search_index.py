@@ -0,0 +1,542 @@
+"""
+In-memory search index used by IndexedAutocomplete
+
+Each indexed item gets a row number. Rows keep the item's key, label and
+normalized (casefolded, unaccented) searchable texts. Two structures point
+at rows,
+
+- a sorted array of (text, row), searched with bisect for prefix matches
+- trigram posting lists, arrays of rows containing each trigram,
+  used to find substring matches
+
+Removed rows are marked dead, they are skipped when searching, and reused
+by the next added items. Their posting list entries are left in place
+until most entries are stale, then the posting lists are rebuilt.
+
+The same structures can be written to a file (write_index_file) and
+searched in place through mmap (MmapSearchIndex).
+"""
+
+import bisect
+import itertools
+import mmap
+import os
+import stat
+import struct
+import sys
+import tempfile
+import threading
+import unicodedata
+from array import array
+from collections import defaultdict
+
+
+def normalize_text(text):
+    """
+    Casefolds text and strips accents, so that "Émile" matches "emile"
+    """
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    return "".join(
+        c for c in decomposed if not unicodedata.combining(c)
+    ).casefold()
+
+
+# sorted texts copied under the lock at a time by SearchIndex.search_prefix
+PREFIX_BATCH_SIZE = 100
+
+
+def trigrams(text):
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+
+        self.keys = []
+        self.labels = []
+        self.texts = []
+        self.alive = bytearray()
+        self.rows_by_key = {}
+        # dead rows, reused by the next added items
+        self.free_rows = []
+
+        self.sorted_texts = []
+        self.postings = defaultdict(lambda: array("L"))
+        self.posting_count = 0
+        # entries of removed texts, left in the postings until compacted
+        self.stale_postings = 0
+
+    def __len__(self):
+        return len(self.rows_by_key)
+
+    def add(self, key, label, texts):
+        """
+        Adds or replaces the item with this key
+        """
+        with self.lock:
+            self._remove(key)
+
+            row = self._append(key, label, texts)
+            for text in self.texts[row]:
+                bisect.insort(self.sorted_texts, (text, row))
+
+            self._compact_postings_if_stale()
+
+    def bulk_load(self, items):
+        """
+        Loads (key, label, texts) items into an empty index,
+        sorting once rather than inserting one by one
+        """
+        with self.lock:
+            for key, label, texts in items:
+                row = self._append(key, label, texts)
+                self.sorted_texts.extend(
+                    (text, row) for text in self.texts[row]
+                )
+
+            self.sorted_texts.sort()
+
+    def _append(self, key, label, texts):
+        texts = tuple({normalize_text(t) for t in texts if t is not None})
+
+        if self.free_rows:
+            # replacing an item reuses the row it just freed
+            row = self.free_rows.pop()
+            self.keys[row] = key
+            self.labels[row] = label
+            self.texts[row] = texts
+            self.alive[row] = 1
+        else:
+            row = len(self.keys)
+            self.keys.append(key)
+            self.labels.append(label)
+            self.texts.append(texts)
+            self.alive.append(1)
+        self.rows_by_key[str(key)] = row
+
+        for text in texts:
+            for trigram in trigrams(text):
+                self.postings[trigram].append(row)
+                self.posting_count += 1
+
+        return row
+
+    def remove(self, key):
+        with self.lock:
+            self._remove(key)
+            self._compact_postings_if_stale()
+
+    def _remove(self, key):
+        row = self.rows_by_key.pop(str(key), None)
+        if row is None:
+            return
+
+        self.alive[row] = 0
+        self.free_rows.append(row)
+        for text in self.texts[row]:
+            position = bisect.bisect_left(self.sorted_texts, (text, row))
+            del self.sorted_texts[position]
+            self.stale_postings += len(trigrams(text))
+
+    def _compact_postings_if_stale(self):
+        """
+        Rebuilds the postings once most of their entries are stale
+        """
+        if self.stale_postings * 2 <= self.posting_count:
+            return
+
+        postings = defaultdict(lambda: array("L"))
+        for row, texts in enumerate(self.texts):
+            if not self.alive[row]:
+                continue
+            for trigram in set().union(*map(trigrams, texts)):
+                postings[trigram].append(row)
+
+        # searches running keep reading the arrays they started with
+        self.postings = postings
+        self.posting_count = sum(len(rows) for rows in postings.values())
+        self.stale_postings = 0
+
+    def get_rows_for_keys(self, keys):
+        rows = (self.rows_by_key.get(str(k)) for k in keys)
+        return [row for row in rows if row is not None]
+
+    def search(self, query, exclude_keys=()):
+        """
+        Yields matching rows, lazily
+
+        Items with a text starting with the query come first, in text order,
+        followed by the other items containing the query.
+        Queries shorter than a trigram only match prefixes
+        """
+        query = normalize_text(query)
+        exclude_rows = set(self.get_rows_for_keys(exclude_keys))
+        seen = set()
+
+        for row in self.search_prefix(query):
+            if row not in seen and row not in exclude_rows:
+                seen.add(row)
+                yield row
+
+        if len(query) < 3:
+            return
+
+        for row in self.search_substring(query):
+            if row not in seen and row not in exclude_rows:
+                seen.add(row)
+                yield row
+
+    def search_prefix(self, query):
+        """
+        Yields the rows of texts starting with query, in text order
+
+        The sorted texts are walked under the lock, a batch at a time,
+        resuming after the last (text, row) rather than at a position
+        that items added or removed meanwhile would shift
+        """
+        after = (query,)
+        while True:
+            with self.lock:
+                position = bisect.bisect_right(self.sorted_texts, after)
+                batch = self.sorted_texts[
+                    position : position + PREFIX_BATCH_SIZE
+                ]
+
+            for entry in batch:
+                text, row = entry
+                if not text.startswith(query):
+                    return
+                if self.alive[row]:
+                    yield row
+                after = entry
+
+            if len(batch) < PREFIX_BATCH_SIZE:
+                return
+
+    def search_substring(self, query):
+        # the rarest trigram has the fewest candidates to check
+        candidates = min(
+            (self.postings.get(t, ()) for t in trigrams(query)), key=len
+        )
+        for row in candidates:
+            if self.alive[row] and any(query in t for t in self.texts[row]):
+                yield row
+
+    def get_item(self, row):
+        return {"key": self.keys[row], "label": self.labels[row]}
+
+
+class IndexSearchResults:
+    """
+    Lazy iterable of search results, mapped to items
+
+    Slicing only runs the search as far as needed, len() runs it entirely
+    """
+
+    def __init__(self, index, query, exclude_keys=()):
+        self.index = index
+        self.query = query
+        self.exclude_keys = exclude_keys
+
+    def __iter__(self):
+        return (
+            self.index.get_item(row)
+            for row in self.index.search(self.query, self.exclude_keys)
+        )
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError("Invalid argument type")
+
+        return list(itertools.islice(self, key.start, key.stop, key.step))
+
+    def __len__(self):
+        return sum(1 for _ in self.index.search(self.query, self.exclude_keys))
+
+
+# On-disk index format, read through mmap by MmapSearchIndex
+#
+# All integers are little-endian unsigned 32 bits, offsets are relative to
+# the start of the file. Strings are UTF-8 in a single blob, referenced by
+# (offset, length). Sections follow the header in this order,
+#
+# - blob
+# - rows: key, label and texts (normalized, joined by NUL) of each row
+# - keys: (key, row) sorted by key, for get_rows_for_keys
+# - texts: (text, row) sorted by text, for prefix search
+# - trigrams: (trigram padded to 12 bytes, postings start, count) sorted
+# - postings: rows
+INDEX_MAGIC = b"ACINDEX1"
+HEADER = struct.Struct("<8s11I")
+ROW = struct.Struct("<6I")
+STRING_ROW = struct.Struct("<3I")
+TRIGRAM = struct.Struct("<12s2I")
+POSTING = struct.Struct("<I")
+
+
+def write_index_file(path, items):
+    """
+    Writes (key, label, texts) items to an index file
+
+    The file is written next to its destination and swapped in atomically,
+    readers see either the old or the new index, never a partial one
+    """
+    blob = bytearray()
+    strings = {}
+
+    def add_string(value):
+        encoded = value.encode("utf-8")
+        if encoded not in strings:
+            strings[encoded] = len(blob)
+            blob.extend(encoded)
+        return strings[encoded], len(encoded)
+
+    rows = bytearray()
+    keys = []
+    texts = []
+    postings = defaultdict(list)
+
+    for row, (key, label, item_texts) in enumerate(items):
+        normalized = sorted(
+            {normalize_text(t) for t in item_texts if t is not None}
+        )
+        key_ref = add_string(str(key))
+        label_ref = add_string(str(label))
+        texts_ref = add_string("\0".join(normalized))
+        rows.extend(ROW.pack(*key_ref, *label_ref, *texts_ref))
+
+        keys.append((str(key).encode("utf-8"), key_ref, row))
+        for text in normalized:
+            texts.append((text.encode("utf-8"), add_string(text), row))
+            for trigram in trigrams(text):
+                postings[trigram.encode("utf-8")].append(row)
+
+    row_count = len(keys)
+    keys.sort()
+    texts.sort()
+
+    key_table = b"".join(STRING_ROW.pack(*ref, row) for _, ref, row in keys)
+    text_table = b"".join(STRING_ROW.pack(*ref, row) for _, ref, row in texts)
+
+    trigram_table = bytearray()
+    posting_table = bytearray()
+    for trigram in sorted(postings):
+        rows_for_trigram = sorted(set(postings[trigram]))
+        trigram_table.extend(
+            TRIGRAM.pack(
+                trigram,
+                len(posting_table) // POSTING.size,
+                len(rows_for_trigram),
+            )
+        )
+        posting_table.extend(
+            array("I", rows_for_trigram).tobytes()
+            if sys.byteorder == "little"
+            else b"".join(POSTING.pack(r) for r in rows_for_trigram)
+        )
+
+    sections = [blob, rows, key_table, text_table, trigram_table]
+    offsets = []
+    position = HEADER.size
+    for section in sections + [posting_table]:
+        offsets.append(position)
+        position += len(section)
+
+    if position >= 2**32:
+        raise ValueError("Index files are limited to 4GB")
+
+    header = HEADER.pack(
+        INDEX_MAGIC,
+        row_count,
+        len(texts),
+        len(trigram_table) // TRIGRAM.size,
+        *offsets,
+        len(blob),
+        0,
+    )
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".acindex-")
+    try:
+        # mkstemp's files are only readable by their owner, the web server
+        # may run as another user
+        os.fchmod(fd, get_file_mode(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            for section in sections + [posting_table]:
+                f.write(section)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    return row_count
+
+
+def get_file_mode(path):
+    """
+    The mode of the file being replaced, or of a new file
+    """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o644 & ~umask
+
+
+class MmapSearchIndex:
+    """
+    Read-only view of an index file, searched in place
+
+    The file is mapped rather than loaded, so all processes on a machine
+    share the same pages through the OS page cache.
+    Same search interface as SearchIndex
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        with open(path, "rb") as f:
+            self.stat = os.fstat(f.fileno())
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic,
+            self.row_count,
+            self.text_count,
+            self.trigram_count,
+            self.blob_offset,
+            self.rows_offset,
+            self.keys_offset,
+            self.texts_offset,
+            self.trigrams_offset,
+            self.postings_offset,
+            _blob_length,
+            _reserved,
+        ) = HEADER.unpack_from(self.data, 0)
+
+        if magic != INDEX_MAGIC:
+            raise ValueError(f"{path} is not an autocomplete index file")
+
+    def __len__(self):
+        return self.row_count
+
+    def is_stale(self):
+        """
+        Whether the file was replaced since it was mapped
+        """
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+
+        return (current.st_ino, current.st_mtime_ns) != (
+            self.stat.st_ino,
+            self.stat.st_mtime_ns,
+        )
+
+    def _string(self, offset, length):
+        start = self.blob_offset + offset
+        return self.data[start : start + length]
+
+    def _string_row(self, table_offset, position):
+        offset, length, row = STRING_ROW.unpack_from(
+            self.data, table_offset + position * STRING_ROW.size
+        )
+        return self._string(offset, length), row
+
+    def _bisect_strings(self, table_offset, count, value):
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if self._string_row(table_offset, middle)[0] < value:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _row(self, row):
+        return ROW.unpack_from(self.data, self.rows_offset + row * ROW.size)
+
+    def get_rows_for_keys(self, keys):
+        rows = []
+        for key in keys:
+            encoded = str(key).encode("utf-8")
+            position = self._bisect_strings(
+                self.keys_offset, self.row_count, encoded
+            )
+            if position < self.row_count:
+                found, row = self._string_row(self.keys_offset, position)
+                if found == encoded:
+                    rows.append(row)
+        return rows
+
+    def search(self, query, exclude_keys=()):
+        query = normalize_text(query).encode("utf-8")
+        exclude_rows = set(self.get_rows_for_keys(exclude_keys))
+        seen = set()
+
+        for row in self.search_prefix(query):
+            if row not in seen and row not in exclude_rows:
+                seen.add(row)
+                yield row
+
+        if len(query.decode("utf-8")) < 3:
+            return
+
+        for row in self.search_substring(query):
+            if row not in seen and row not in exclude_rows:
+                seen.add(row)
+                yield row
+
+    def search_prefix(self, query):
+        position = self._bisect_strings(
+            self.texts_offset, self.text_count, query
+        )
+        while position < self.text_count:
+            text, row = self._string_row(self.texts_offset, position)
+            if not text.startswith(query):
+                return
+            yield row
+            position += 1
+
+    def _postings(self, trigram):
+        padded = trigram.encode("utf-8").ljust(12, b"\0")
+        low, high = 0, self.trigram_count
+        while low < high:
+            middle = (low + high) // 2
+            found, start, count = TRIGRAM.unpack_from(
+                self.data, self.trigrams_offset + middle * TRIGRAM.size
+            )
+            if found < padded:
+                low = middle + 1
+            elif found > padded:
+                high = middle
+            else:
+                return start, count
+        return 0, 0
+
+    def search_substring(self, query):
+        # the rarest trigram has the fewest candidates to check
+        start, count = min(
+            (self._postings(t) for t in trigrams(query.decode("utf-8"))),
+            key=lambda postings: postings[1],
+        )
+        for position in range(start, start + count):
+            (row,) = POSTING.unpack_from(
+                self.data, self.postings_offset + position * POSTING.size
+            )
+            *_, texts_offset, texts_length = self._row(row)
+            if query in self._string(texts_offset, texts_length):
+                yield row
+
+    def get_item(self, row):
+        key_offset, key_length, label_offset, label_length, *_ = self._row(row)
+        return {
+            "key": self._string(key_offset, key_length).decode("utf-8"),
+            "label": self._string(label_offset, label_length).decode("utf-8"),
+        }
@@ -1,14 +1,188 @@
+import json
 import operator
+import threading
+from collections import defaultdict
 from functools import reduce
 
-from django.db.models import Q
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db import connections
+from django.db.models import Count, F, OrderBy, Q, Window
+from django.db.models.functions import Lower
+from django.db.models.lookups import Contains, Exact, StartsWith
+from django.db.models.signals import post_delete, post_save, pre_save
 
-from .core import Autocomplete
+from asgiref.sync import sync_to_async
+
+from .core import (
+    COUNT_CAPPED,
+    COUNT_ESTIMATE,
+    COUNT_EXACT,
+    COUNT_NONE,
+    COUNT_WINDOW,
+    Autocomplete,
+    overrides_sync,
+)
+from .search_index import (
+    IndexSearchResults,
+    MmapSearchIndex,
+    SearchIndex,
+    normalize_text,
+)
+
+SEARCH_ICONTAINS = "icontains"
+# PostgreSQL only, see autocomplete.postgres
+SEARCH_TRIGRAM = "trigram"
+SEARCH_FULLTEXT = "fulltext"
+
+POSTGRES_SEARCH_MODES = {SEARCH_TRIGRAM, SEARCH_FULLTEXT}
+# SQLite only, see autocomplete.sqlite_fts
+SEARCH_FTS5 = "fts5"
+
+SEARCH_MODES = {SEARCH_ICONTAINS, SEARCH_FTS5, *POSTGRES_SEARCH_MODES}
+
+# lookups of ("attr", "lookup") entries in search_attrs,
+# entries that are just an attribute name use icontains
+BASE_LOOKUPS = {
+    "exact",
+    "iexact",
+    "startswith",
+    "istartswith",
+    "contains",
+    "icontains",
+}
+# matches Lower(attr), which an index on that expression supports
+LOWER_PREFIX = "lower_"
+# PostgreSQL's unaccent(attr), plain lookups elsewhere
+UNACCENT_PREFIX = "unaccent_"
+# matches the attr's shadow column from normalized_fields,
+# holding the casefolded and unaccented value
+NORMALIZED_PREFIX = "normalized_"
+
+LOWER_LOOKUPS = {
+    "exact": Exact,
+    "startswith": StartsWith,
+    "contains": Contains,
+}
+NORMALIZED_LOOKUPS = {"exact", "startswith", "contains"}
+
+
+# methods whose overrides change what searches match
+SEARCH_METHODS = (
+    "search_items",
+    "get_query_filtered_queryset",
+    "search_queryset",
+    "get_search_condition",
+    "normalize_search",
+)
+
+
+def overrides_any(cls, base, names):
+    """
+    Whether cls, or a class between it and base, defines any of the methods
+    """
+    for klass in cls.__mro__:
+        if klass is base:
+            return False
+        if any(name in klass.__dict__ for name in names):
+            return True
+    return False
+
+
+def parse_lookup(lookup):
+    """
+    Splits a search_attrs lookup into its prefix and base lookup,
+    e.g. "unaccent_istartswith" -> ("unaccent_", "istartswith")
+    """
+    for prefix, base_lookups in (
+        (LOWER_PREFIX, set(LOWER_LOOKUPS)),
+        (UNACCENT_PREFIX, BASE_LOOKUPS),
+        (NORMALIZED_PREFIX, NORMALIZED_LOOKUPS),
+    ):
+        if lookup.startswith(prefix):
+            base = lookup[len(prefix) :]
+            if base not in base_lookups:
+                raise ValueError(f"Invalid search lookup '{lookup}'.")
+            return prefix, base
+
+    if lookup not in BASE_LOOKUPS:
+        raise ValueError(f"Invalid search lookup '{lookup}'.")
+
+    return "", lookup
 
 
 class ModelAutocomplete(Autocomplete):
     model = None
     search_attrs = []
+    # how search_attrs are matched, modes other than icontains
+    # fall back to it on databases that don't support them
+    search_mode = SEARCH_ICONTAINS
+    # text search configuration of the fulltext mode
+    search_config = "simple"
+    # attr -> name of the field holding its normalized value,
+    # used by the normalized_* lookups
+    normalized_fields = {}
+
+    @classmethod
+    def validate(cls):
+        super().validate()
+
+        if cls.search_mode not in SEARCH_MODES:
+            raise ValueError(f"Invalid search_mode '{cls.search_mode}'.")
+
+        if cls.refine_searches and cls.search_mode != SEARCH_ICONTAINS:
+            # the matches of a longer search are only a subset of the
+            # shorter one's with "contains"
+            raise ValueError(
+                "refine_searches requires the icontains search_mode."
+            )
+
+        # search_attrs may be left empty by subclasses that search otherwise
+        for entry in cls.search_attrs:
+            if isinstance(entry, str):
+                continue
+
+            attr, lookup = entry
+            prefix, _ = parse_lookup(lookup)
+
+            if (
+                prefix == NORMALIZED_PREFIX
+                and attr not in cls.normalized_fields
+            ):
+                raise ValueError(
+                    f"Lookup '{lookup}' requires a normalized_fields "
+                    f"entry for '{attr}'."
+                )
+
+            if cls.refine_searches and lookup != "icontains":
+                # refinement filters cached results with "contains"
+                raise ValueError(
+                    "refine_searches requires icontains search lookups."
+                )
+
+        if cls.local_threshold and not cls.matches_local_searches():
+            raise ValueError(
+                "local_threshold requires icontains searches, "
+                "or an overridden get_local_items."
+            )
+
+    @classmethod
+    def matches_local_searches(cls):
+        """
+        Whether the widget's local searches, a case-insensitive "contains"
+        match on the search_attrs values, find what search_items does.
+        An overridden get_local_items is trusted to match its searches
+        """
+        if overrides_any(cls, ModelAutocomplete, ("get_local_items",)):
+            return True
+
+        if cls.search_mode != SEARCH_ICONTAINS:
+            return False
+
+        for entry in cls.search_attrs:
+            if not isinstance(entry, str) and entry[1] != "icontains":
+                return False
+
+        return not overrides_any(cls, ModelAutocomplete, SEARCH_METHODS)
 
     @classmethod
     def get_search_attrs(cls):
@@ -16,6 +190,20 @@ class ModelAutocomplete(Autocomplete):
             raise ValueError("ModelAutocomplete must have search_attrs")
         return cls.search_attrs
 
+    @classmethod
+    def get_search_lookups(cls):
+        """
+        Returns (attr, lookup) pairs, defaulting to icontains
+        """
+        return [
+            (entry, "icontains") if isinstance(entry, str) else tuple(entry)
+            for entry in cls.get_search_attrs()
+        ]
+
+    @classmethod
+    def get_search_attr_names(cls):
+        return [attr for attr, _ in cls.get_search_lookups()]
+
     @classmethod
     def get_model(cls):
         if not cls.model:
@@ -23,6 +211,44 @@ class ModelAutocomplete(Autocomplete):
 
         return cls.model
 
+    @classmethod
+    def on_register(cls):
+        super().on_register()
+
+        if cls.cache_timeout or cls.etag_responses:
+            # cached results go stale as soon as the model changes
+            for signal in (post_save, post_delete):
+                signal.connect(
+                    cls.handle_model_change,
+                    sender=cls.get_model(),
+                    weak=False,
+                    dispatch_uid=f"autocomplete:{cls.route_name}",
+                )
+
+        if cls.normalized_fields:
+            pre_save.connect(
+                cls.fill_normalized_fields,
+                sender=cls.get_model(),
+                weak=False,
+                dispatch_uid=f"autocomplete:normalize:{cls.route_name}",
+            )
+
+    @classmethod
+    def handle_model_change(cls, sender, **kwargs):
+        cls.invalidate_cache()
+
+    @classmethod
+    def fill_normalized_fields(cls, sender, instance, **kwargs):
+        # fields of related models are left to their own saves
+        for attr, field_name in cls.normalized_fields.items():
+            if "__" not in attr and "__" not in field_name:
+                value = getattr(instance, attr)
+                setattr(
+                    instance,
+                    field_name,
+                    None if value is None else normalize_text(str(value)),
+                )
+
     @classmethod
     def get_queryset(cls):
         return cls.get_model().objects.all()
@@ -34,24 +260,219 @@ class ModelAutocomplete(Autocomplete):
     @classmethod
     def get_query_filtered_queryset(cls, search, context):
         base_qs = cls.get_queryset()
+        queryset = cls.search_queryset(base_qs, search)
+
+        # selected items are shown separately, leave them out of the page
+        selected_keys = getattr(context, "selected_keys", None)
+        if selected_keys:
+            queryset = queryset.exclude(pk__in=selected_keys)
+
+        return queryset
+
+    @classmethod
+    def search_queryset(cls, queryset, search):
+        """
+        Filters the queryset down to the records matching the search,
+        according to search_mode
+        """
+        vendor = connections[queryset.db].vendor
+
+        if cls.search_mode in POSTGRES_SEARCH_MODES and vendor == "postgresql":
+            from . import postgres
+
+            if cls.search_mode == SEARCH_TRIGRAM:
+                return postgres.trigram_search(
+                    queryset, search, cls.get_search_attr_names()
+                )
+
+            return postgres.fulltext_search(
+                queryset,
+                search,
+                cls.get_search_attr_names(),
+                cls.search_config,
+            )
+
+        if cls.search_mode == SEARCH_FTS5 and vendor == "sqlite":
+            from . import sqlite_fts
+
+            if sqlite_fts.supports_search(cls, queryset.db):
+                return sqlite_fts.fts5_search(cls, queryset, search)
+
         conditions = [
-            Q(**{f"{attr}__icontains": search})
-            for attr in cls.get_search_attrs()
+            cls.get_search_condition(attr, lookup, search, vendor)
+            for attr, lookup in cls.get_search_lookups()
         ]
         condition_filter = reduce(operator.or_, conditions)
-        queryset = base_qs.filter(condition_filter)
-        return queryset
+        return queryset.filter(condition_filter)
+
+    @classmethod
+    def get_search_condition(cls, attr, lookup, search, vendor):
+        prefix, base = parse_lookup(lookup)
+
+        if prefix == LOWER_PREFIX:
+            return Q(LOWER_LOOKUPS[base](Lower(attr), search.lower()))
+
+        if prefix == NORMALIZED_PREFIX:
+            field_name = cls.normalized_fields[attr]
+            return Q(**{f"{field_name}__{base}": normalize_text(search)})
+
+        if prefix == UNACCENT_PREFIX and vendor == "postgresql":
+            # requires django.contrib.postgres and the unaccent extension
+            return Q(**{f"{attr}__unaccent__{base}": search})
+
+        return Q(**{f"{attr}__{base}": search})
 
     @classmethod
     def search_items(cls, search, context):
         filtered_queryset = cls.get_query_filtered_queryset(search, context)
 
+        if cls.count_strategy == COUNT_WINDOW:
+            filtered_queryset = filtered_queryset.annotate(
+                _ac_total=Window(Count("pk"))
+            )
+
         items = QuerysetMappedIterable(
             queryset=filtered_queryset,
             label_for_record=cls.get_label_for_record,
+            # ordering by pk as well only pays off with cursors
+            paged=cls.load_more_results,
         )
         return items
 
+    @classmethod
+    async def asearch_items(cls, search, context):
+        if overrides_sync(cls, "search_items", "asearch_items") or (
+            cls.search_mode == SEARCH_FTS5
+        ):
+            # fts5 may have to create its table first
+            return await super().asearch_items(search, context)
+
+        # building the queryset doesn't query,
+        # QuerysetMappedIterable.aslice runs it with the async ORM
+        return cls.search_items(search, context)
+
+    @classmethod
+    def get_total_results(cls, search_results, context):
+        if not isinstance(search_results, QuerysetMappedIterable):
+            return super().get_total_results(search_results, context)
+
+        queryset = search_results.queryset
+        strategy = cls.count_strategy
+
+        if strategy == COUNT_NONE:
+            return None, COUNT_NONE
+
+        if (
+            strategy == COUNT_WINDOW
+            and search_results.window_total is not None
+        ):
+            return search_results.window_total, COUNT_EXACT
+
+        if strategy == COUNT_ESTIMATE:
+            estimate = estimate_count(queryset)
+            if estimate is not None:
+                return estimate, COUNT_ESTIMATE
+            # estimates aren't supported by this database
+            strategy = COUNT_CAPPED
+
+        if strategy == COUNT_CAPPED:
+            total = queryset[: cls.count_cap + 1].count()
+            if total > cls.count_cap:
+                return cls.count_cap, COUNT_CAPPED
+            return total, COUNT_EXACT
+
+        return queryset.count(), COUNT_EXACT
+
+    @classmethod
+    async def aget_total_results(cls, search_results, context):
+        if not isinstance(
+            search_results, QuerysetMappedIterable
+        ) or overrides_sync(cls, "get_total_results", "aget_total_results"):
+            return await super().aget_total_results(search_results, context)
+
+        queryset = search_results.queryset
+        strategy = cls.count_strategy
+
+        if strategy == COUNT_NONE:
+            return None, COUNT_NONE
+
+        if (
+            strategy == COUNT_WINDOW
+            and search_results.window_total is not None
+        ):
+            return search_results.window_total, COUNT_EXACT
+
+        if strategy == COUNT_ESTIMATE:
+            estimate = await sync_to_async(estimate_count)(queryset)
+            if estimate is not None:
+                return estimate, COUNT_ESTIMATE
+            strategy = COUNT_CAPPED
+
+        if strategy == COUNT_CAPPED:
+            total = await queryset[: cls.count_cap + 1].acount()
+            if total > cls.count_cap:
+                return cls.count_cap, COUNT_CAPPED
+            return total, COUNT_EXACT
+
+        return await queryset.acount(), COUNT_EXACT
+
+    @classmethod
+    def get_refinement_texts(cls, items, context):
+        keys = [i["key"] for i in items]
+        if not keys:
+            return []
+
+        texts_by_key = defaultdict(list)
+        rows = (
+            cls.get_queryset()
+            .filter(pk__in=keys)
+            .values_list("pk", *cls.get_search_attr_names())
+        )
+        for pk, *values in rows:
+            texts_by_key[pk].extend(str(v) for v in values if v is not None)
+
+        return [texts_by_key[key] for key in keys]
+
+    @classmethod
+    def get_local_items(cls, context):
+        if not cls.local_threshold:
+            return None
+
+        # one more than the threshold tells whether there are too many
+        records = list(cls.get_queryset()[: cls.local_threshold + 1])
+        if len(records) > cls.local_threshold:
+            return None
+
+        items = [
+            {"key": record.pk, "label": cls.get_label_for_record(record)}
+            for record in records
+        ]
+        texts = [cls.get_search_texts_for_record(record) for record in records]
+        return items, texts
+
+    @classmethod
+    def get_search_texts_for_record(cls, record):
+        texts = []
+        for attr in cls.get_search_attr_names():
+            value = record
+            for part in attr.split("__"):
+                value = getattr(value, part, None)
+            if value is not None:
+                texts.append(str(value))
+        return texts
+
+    @classmethod
+    def get_index_items(cls):
+        """
+        Yields (key, label, search texts) for every record to index
+        """
+        for record in cls.get_queryset().iterator(chunk_size=2000):
+            yield (
+                record.pk,
+                cls.get_label_for_record(record),
+                cls.get_search_texts_for_record(record),
+            )
+
     @classmethod
     def get_items_from_keys(cls, keys, context):
         queryset = cls.get_queryset()
@@ -62,6 +483,167 @@ class ModelAutocomplete(Autocomplete):
             for record in results
         ]
 
+    @classmethod
+    async def aget_items_from_keys(cls, keys, context):
+        if overrides_sync(cls, "get_items_from_keys", "aget_items_from_keys"):
+            return await super().aget_items_from_keys(keys, context)
+
+        queryset = cls.get_queryset()
+        results = queryset.filter(id__in=keys)
+
+        return [
+            {"key": record.id, "label": cls.get_label_for_record(record)}
+            async for record in results.aiterator(chunk_size=2000)
+        ]
+
+
+class IndexedAutocomplete(ModelAutocomplete):
+    """
+    Searches an in-memory index of the model rather than the database
+
+    Suited to reference tables that change rarely. The index is built on
+    first use (call build_index() to build it ahead of time) and kept up to
+    date through model signals. Matching is case and accent-insensitive,
+    on the values of search_attrs.
+    """
+
+    # an exact count walks the whole search
+    count_strategy = COUNT_CAPPED
+
+    @classmethod
+    def on_register(cls):
+        super().on_register()
+
+        post_save.connect(
+            cls.handle_index_save,
+            sender=cls.get_model(),
+            weak=False,
+            dispatch_uid=f"autocomplete:index:{cls.route_name}",
+        )
+        post_delete.connect(
+            cls.handle_index_delete,
+            sender=cls.get_model(),
+            weak=False,
+            dispatch_uid=f"autocomplete:index:{cls.route_name}",
+        )
+
+    @classmethod
+    def normalize_search(cls, search):
+        return normalize_text(search)
+
+    @classmethod
+    def build_index(cls):
+        index = SearchIndex()
+        index.bulk_load(cls.get_index_items())
+        cls._search_index = index
+        return index
+
+    @classmethod
+    def get_index(cls):
+        # each class has its own index, subclasses must not share the parent's
+        index = cls.__dict__.get("_search_index")
+        if index is None:
+            with _index_build_lock:
+                index = cls.__dict__.get("_search_index")
+                if index is None:
+                    index = cls.build_index()
+        return index
+
+    @classmethod
+    def handle_index_save(cls, sender, instance, **kwargs):
+        index = cls.__dict__.get("_search_index")
+        if index is None:
+            # not built yet, it will include the change
+            return
+
+        if cls.get_queryset().filter(pk=instance.pk).exists():
+            index.add(
+                instance.pk,
+                cls.get_label_for_record(instance),
+                cls.get_search_texts_for_record(instance),
+            )
+        else:
+            index.remove(instance.pk)
+
+    @classmethod
+    def handle_index_delete(cls, sender, instance, **kwargs):
+        index = cls.__dict__.get("_search_index")
+        if index is not None:
+            index.remove(instance.pk)
+
+    @classmethod
+    def search_items(cls, search, context):
+        return IndexSearchResults(
+            cls.get_index(),
+            search,
+            exclude_keys=getattr(context, "selected_keys", None) or (),
+        )
+
+    @classmethod
+    def get_items_from_keys(cls, keys, context):
+        index = cls.get_index()
+        return [index.get_item(row) for row in index.get_rows_for_keys(keys)]
+
+
+class MmapIndexedAutocomplete(ModelAutocomplete):
+    """
+    Searches an index file, mapped read-only into memory
+
+    All worker processes on a machine share the file's pages, rather than
+    each holding its own index. The file is written from the model with
+    the build_autocomplete_index management command, and picked up again
+    as soon as it's replaced.
+    """
+
+    index_path = None
+    # an exact count walks the whole search
+    count_strategy = COUNT_CAPPED
+
+    @classmethod
+    def validate(cls):
+        super().validate()
+
+        if not cls.index_path:
+            raise ValueError("MmapIndexedAutocomplete must have an index_path")
+
+    @classmethod
+    def normalize_search(cls, search):
+        return normalize_text(search)
+
+    @classmethod
+    def get_index(cls):
+        index = cls.__dict__.get("_search_index")
+        if index is None or index.is_stale():
+            with _index_build_lock:
+                index = cls.__dict__.get("_search_index")
+                if index is None or index.is_stale():
+                    try:
+                        index = MmapSearchIndex(cls.index_path)
+                    except FileNotFoundError as e:
+                        raise ImproperlyConfigured(
+                            f"{cls.__name__}'s index file {cls.index_path} "
+                            "doesn't exist, write it with the "
+                            "build_autocomplete_index command."
+                        ) from e
+                    cls._search_index = index
+        return index
+
+    @classmethod
+    def search_items(cls, search, context):
+        return IndexSearchResults(
+            cls.get_index(),
+            search,
+            exclude_keys=getattr(context, "selected_keys", None) or (),
+        )
+
+    @classmethod
+    def get_items_from_keys(cls, keys, context):
+        index = cls.get_index()
+        return [index.get_item(row) for row in index.get_rows_for_keys(keys)]
+
+
+_index_build_lock = threading.Lock()
+
 
 class QuerysetMappedIterable:
     """
@@ -71,11 +653,26 @@ class QuerysetMappedIterable:
     But using something like a generator/map doesn't allow for slicing or len()
 
     This class wraps a queryset's slice/len methods
+
+    With paged, results are ordered by the queryset's ordering, then by pk,
+    so that they can be paged through with cursors (keyset pagination):
+    after() filters on the ordering values of the last item rather than
+    using OFFSET. Otherwise the queryset's ordering is left as it is
     """
 
-    def __init__(self, queryset, label_for_record):
+    def __init__(self, queryset, label_for_record, paged=False):
+        self.keyset = get_keyset(queryset) if paged else None
+        if self.keyset is not None:
+            queryset = queryset.order_by(
+                *[f"-{name}" if desc else name for name, desc in self.keyset]
+            )
+
         self.queryset = queryset
         self.label_for_record = label_for_record
+        # filled by slicing when the queryset is annotated with _ac_total
+        self.window_total = None
+        # (item, record) pairs of the last slice, to find cursor positions
+        self.fetched = []
 
     def __iter__(self, *args, **kwargs):
         return (self.map_record(r) for r in self.queryset)
@@ -92,13 +689,157 @@ class QuerysetMappedIterable:
         else:
             raise TypeError("Invalid argument type")
 
-        mapped = [self.map_record(r) for r in records]
+        mapped = self.map_fetched(records)
 
         if isinstance(key, int):
             return mapped[0]
 
         return mapped
 
+    async def aslice(self, start, stop):
+        """
+        Async counterpart of slicing, with the async ORM
+        """
+        records = [
+            r
+            async for r in self.queryset[start:stop].aiterator(chunk_size=2000)
+        ]
+        return self.map_fetched(records)
+
+    def map_fetched(self, records):
+        if records and hasattr(records[0], "_ac_total"):
+            self.window_total = records[0]._ac_total
+
+        mapped = [self.map_record(r) for r in records]
+        self.fetched = list(zip(mapped, records))
+
+        return mapped
+
     def __len__(self):
         # Return the length of the sequence
         return self.queryset.count()
+
+    def get_position(self, item):
+        """
+        Returns the ordering values of a fetched item, as JSON-serializable
+        values, or None if the results can't be paged through
+        """
+        if self.keyset is None:
+            return None
+
+        record = next((r for i, r in self.fetched if i is item), None)
+        if record is None:
+            return None
+
+        opts = self.queryset.model._meta
+        position = []
+        for name, _ in self.keyset:
+            if name == "pk":
+                value = record.pk
+            elif name in self.queryset.query.annotations:
+                value = getattr(record, name)
+            else:
+                value = getattr(record, opts.get_field(name).attname)
+
+            if value is None:
+                # rows can't be compared to NULLs
+                return None
+            if not isinstance(value, (str, int, float, bool)):
+                value = str(value)
+            position.append(value)
+
+        return position
+
+    def after(self, position):
+        """
+        Returns the results that follow the position from get_position
+        """
+        if self.keyset is None or len(position) != len(self.keyset):
+            raise ValueError("Invalid position for these results")
+
+        opts = self.queryset.model._meta
+        values = []
+        for (name, _), value in zip(self.keyset, position):
+            if name == "pk":
+                value = opts.pk.to_python(value)
+            elif name not in self.queryset.query.annotations:
+                value = opts.get_field(name).to_python(value)
+            values.append(value)
+
+        # (a > x) or (a = x and b > y) or ...
+        conditions = []
+        equal = Q()
+        for (name, desc), value in zip(self.keyset, values):
+            lookup = "lt" if desc else "gt"
+            conditions.append(equal & Q(**{f"{name}__{lookup}": value}))
+            equal &= Q(**{name: value})
+        condition = reduce(operator.or_, conditions)
+
+        return QuerysetMappedIterable(
+            queryset=self.queryset.filter(condition),
+            label_for_record=self.label_for_record,
+            paged=True,
+        )
+
+
+def get_keyset(queryset):
+    """
+    Returns the queryset's ordering as (name, descending) pairs ending
+    with pk, so that it's unique; None if that can't be paged through
+    (random or expression ordering, related fields, extra() columns)
+    """
+    query = queryset.query
+    opts = queryset.model._meta
+
+    if query.order_by:
+        ordering = list(query.order_by)
+    elif query.default_ordering:
+        ordering = list(opts.ordering)
+    else:
+        ordering = []
+
+    keyset = []
+    for entry in ordering:
+        if isinstance(entry, str):
+            desc = entry.startswith("-")
+            name = entry.lstrip("-")
+        elif isinstance(entry, OrderBy) and isinstance(entry.expression, F):
+            desc = entry.descending
+            name = entry.expression.name
+        else:
+            return None
+
+        if name in ("pk", opts.pk.name):
+            keyset.append(("pk", desc))
+            return keyset
+
+        if name in query.annotations:
+            keyset.append((name, desc))
+            continue
+
+        if name == "?" or "__" in name or name in query.extra_select:
+            return None
+
+        try:
+            field = opts.get_field(name)
+        except FieldDoesNotExist:
+            return None
+        if not field.concrete or field.is_relation:
+            return None
+
+        keyset.append((name, desc))
+
+    keyset.append(("pk", False))
+    return keyset
+
+
+def estimate_count(queryset):
+    """
+    Returns the query planner's row estimate for the queryset,
+    or None if the database doesn't provide one
+    """
+    if connections[queryset.db].vendor != "postgresql":
+        return None
+
+    plan = json.loads(queryset.explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
@@ -0,0 +1,200 @@
+"""
+SQLite FTS5 search mode for ModelAutocomplete
+
+Searches go through an FTS5 table over search_attrs rather than a LIKE scan
+of the model's table. The FTS5 table is created on first use, filled from
+the model's table and kept in sync with it by triggers, so writes that skip
+the ORM's signals (bulk_create, update(), raw SQL) are picked up too.
+
+The search's words are matched as prefixes of the words in search_attrs
+(so "jo sm" matches "John Smith"), case and accent-insensitively, and
+results are ordered by bm25.
+"""
+
+import hashlib
+import re
+import threading
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import DatabaseError, connections, models, transaction
+from django.db.models.signals import post_migrate
+
+# (database alias, table name) of the tables known to exist
+_ready_tables = set()
+_fts5_support = {}
+_lock = threading.Lock()
+
+INTEGER_PK_TYPES = (models.AutoField, models.BigAutoField, models.IntegerField)
+
+
+def fts5_available(using):
+    if using not in _fts5_support:
+        with connections[using].cursor() as cursor:
+            try:
+                cursor.execute(
+                    "CREATE VIRTUAL TABLE temp._ac_fts5_probe USING fts5(x)"
+                )
+                cursor.execute("DROP TABLE temp._ac_fts5_probe")
+            except DatabaseError:
+                _fts5_support[using] = False
+            else:
+                _fts5_support[using] = True
+
+    return _fts5_support[using]
+
+
+def get_columns(ac_class):
+    """
+    Returns the database columns of search_attrs,
+    or None if some of them aren't columns of the model's own table
+    """
+    opts = ac_class.get_model()._meta
+    columns = []
+    for attr in ac_class.get_search_attr_names():
+        if "__" in attr:
+            return None
+        try:
+            field = opts.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        if not field.concrete or field.model is not opts.model:
+            return None
+        columns.append(field.column)
+    return columns
+
+
+def supports_search(ac_class, using):
+    if connections[using].vendor != "sqlite":
+        return False
+
+    # FTS5 rowids are integers, they must be the model's primary key
+    if not isinstance(ac_class.get_model()._meta.pk, INTEGER_PK_TYPES):
+        return False
+
+    return get_columns(ac_class) is not None and fts5_available(using)
+
+
+def get_table_name(ac_class):
+    # autocompletes searching the same columns share a table
+    db_table = ac_class.get_model()._meta.db_table
+    columns = get_columns(ac_class)
+    digest = hashlib.sha1(":".join([db_table, *columns]).encode()).hexdigest()
+    return f"{db_table}_ac_fts_{digest[:8]}"
+
+
+def get_table_sql(ac_class):
+    """
+    Returns the statements creating the FTS5 table and its triggers, if
+    they don't exist, and filling the table
+    """
+    opts = ac_class.get_model()._meta
+    table = get_table_name(ac_class)
+    source = opts.db_table
+    pk = opts.pk.column
+    columns = get_columns(ac_class)
+
+    column_list = ", ".join(f'"{c}"' for c in columns)
+    new_values = ", ".join(f'new."{c}"' for c in columns)
+    old_values = ", ".join(f'old."{c}"' for c in columns)
+    insert_new = (
+        f'INSERT INTO "{table}"(rowid, {column_list}) '
+        f'VALUES (new."{pk}", {new_values});'
+    )
+    delete_old = (
+        f'INSERT INTO "{table}"("{table}", rowid, {column_list}) '
+        f"VALUES ('delete', old.\"{pk}\", {old_values});"
+    )
+
+    return [
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS "{table}" '
+        f"USING fts5({column_list}, "
+        f"content='{source}', content_rowid='{pk}', "
+        "tokenize='unicode61 remove_diacritics 2')",
+        f'CREATE TRIGGER IF NOT EXISTS "{table}_ai" '
+        f'AFTER INSERT ON "{source}" '
+        f"BEGIN {insert_new} END",
+        f'CREATE TRIGGER IF NOT EXISTS "{table}_ad" '
+        f'AFTER DELETE ON "{source}" '
+        f"BEGIN {delete_old} END",
+        f'CREATE TRIGGER IF NOT EXISTS "{table}_au" '
+        f'AFTER UPDATE ON "{source}" '
+        f"BEGIN {delete_old} {insert_new} END",
+        f'INSERT INTO "{table}"("{table}") VALUES (\'rebuild\')',
+    ]
+
+
+def get_trigger_names(table):
+    return [f"{table}_ai", f"{table}_ad", f"{table}_au"]
+
+
+def ensure_search_table(ac_class, using="default"):
+    """
+    Creates and fills the FTS5 table of ac_class, unless it exists already
+    along with its triggers
+
+    SQLite drops the triggers when migrations rebuild the model's table,
+    they are then created again and the table refilled. Runs on the first
+    search, call it ahead of time (e.g. after migrating) to avoid filling
+    the table during a request
+    """
+    table = get_table_name(ac_class)
+    if (using, table) in _ready_tables:
+        return table
+
+    # other processes may be creating it as well, hence IF NOT EXISTS
+    with _lock, transaction.atomic(using=using):
+        with connections[using].cursor() as cursor:
+            names = [table, *get_trigger_names(table)]
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master "
+                "WHERE name IN (%s, %s, %s, %s)",
+                names,
+            )
+            (found,) = cursor.fetchone()
+            if found < len(names):
+                for statement in get_table_sql(ac_class):
+                    cursor.execute(statement)
+
+    _ready_tables.add((using, table))
+    return table
+
+
+def prefix_match_query(search):
+    """
+    Builds an FTS5 query matching every word of the search as a prefix
+
+    Words are quoted, so the search can't inject FTS5 query syntax
+    """
+    # same word characters as the unicode61 tokenizer
+    words = re.findall(r"[^\W_]+", search)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def fts5_search(ac_class, queryset, search):
+    match_query = prefix_match_query(search)
+    if not match_query:
+        return queryset.none()
+
+    table = ensure_search_table(ac_class, queryset.db)
+    opts = ac_class.get_model()._meta
+
+    # joining the FTS5 table lets SQLite start from its index,
+    # and makes bm25() available for ordering
+    return queryset.extra(
+        select={"_ac_rank": f'bm25("{table}")'},
+        tables=[table],
+        where=[
+            f'"{table}" MATCH %s',
+            f'"{table}".rowid = "{opts.db_table}"."{opts.pk.column}"',
+        ],
+        params=[match_query],
+    ).order_by("_ac_rank", "pk")
+
+
+def forget_tables(**kwargs):
+    # migrations may have rebuilt the models' tables, and their triggers
+    with _lock:
+        _ready_tables.clear()
+
+
+post_migrate.connect(forget_tables, dispatch_uid="autocomplete_fts5_migrate")
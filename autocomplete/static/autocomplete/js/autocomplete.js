@@ -250,7 +250,7 @@ function phac_aspc_autocomplete_keydown_handler(event) {
     const selectFocusedItem = (container) => {
         const item = container.querySelector('.hasFocus');
         if (item) {
-            item.dispatchEvent(new Event('click'));
+            item.dispatchEvent(new Event('click', { bubbles: true }));
         }
         return item;
     }
@@ -435,6 +435,35 @@ class PhacAutocomplete {
         // TODO idk what this does yet
     }
 
+    static searchSequenceById = {
+        /*
+        item requests are numbered per component,
+        so the server can drop the ones a newer search superseded
+        */
+    }
+
+    // tells this page's searches apart from other tabs' on the server
+    static searchClientId = Math.random().toString(36).slice(2);
+
+    static responseCachesById = {
+        /*
+        recent item responses of each component, keyed by their request
+        parameters, to replay repeated searches without a request.
+        Maps keep insertion order, the first entry is the least recently used
+        */
+    }
+
+    // request parameters that don't affect the response
+    static volatileParameters = ['search_seq', 'search_client', 'local'];
+
+    static localItemsById = {
+        /*
+        with local_threshold, every item of the component and the data to
+        search them, loaded with the first response.
+        false when the server didn't send them (too many items)
+        */
+    }
+
     constructor(componentId) {
         this.componentId = componentId;
     }
@@ -501,12 +530,23 @@ class PhacAutocomplete {
     }
 
     static itemClickHandler(event){
-        const instance = this.getInstanceForElement(event.target);
+        // delegated from the listbox, the items only carry their key
+        const item = event.target.closest('a[role="option"][data-key]');
+        if(!item || !event.currentTarget.contains(item)){
+            return true;
+        }
+        event.preventDefault();
+
+        const instance = this.getInstanceForElement(item);
+        if(!instance){
+            return false;
+        }
+        instance.toggleItem(item);
         if(instance.getIsOpen()){
             instance.resetFocus(true);
             instance.hideResults();
         }
-        return true;
+        return false;
     }
 
     static inputFocusHandler(event){
@@ -641,7 +681,8 @@ class PhacAutocomplete {
             // this could be an instance method
             const item = instance.getContainer().querySelector('.hasFocus');
             if(item){
-                item.dispatchEvent(new Event('click'));
+                // bubbles up to the listbox's handler
+                item.dispatchEvent(new Event('click', { bubbles: true }));
             }
             return item;
         }
@@ -882,6 +923,9 @@ class PhacAutocomplete {
     getIsMulti(){
         return this.getContainer().hasAttribute('data-autocomplete-multiselect');
     }
+    getResponseCacheSize(){
+        return parseInt(this.getContainer().getAttribute('data-autocomplete-cachesize')) || 0;
+    }
 
 
     // behavioral methods
@@ -935,6 +979,16 @@ class PhacAutocomplete {
         this.setIsClosed( true );
     }
 
+    toggleItem(item){
+        // the request's parameters are the listbox's (hx-params, hx-include,
+        // hx-vals), the item's key is added in htmx:configRequest
+        htmx.ajax('GET', this.getContainer().getAttribute('data-autocomplete-toggleurl'), {
+            source: item,
+            target: item,
+            swap: 'outerHTML',
+        });
+    }
+
     triggerNewSearch(){
         this.getInput().dispatchEvent(new Event('phac_aspc_autocomplete_trigger'));
     }
@@ -947,6 +1001,185 @@ class PhacAutocomplete {
         return this.getContainer().querySelectorAll(`#${this.getComponentId()}_ac_container li.chip`);
     }
 
+    // client-side response cache
+
+    static getResponseCacheKey(parameters){
+        const entries = Object.entries(parameters)
+            .filter(([name]) => !this.volatileParameters.includes(name))
+            .sort(([a], [b]) => a < b ? -1 : a > b ? 1 : 0);
+        return JSON.stringify(entries);
+    }
+
+    getCachedResponse(key){
+        const cache = this.constructor.responseCachesById[this.getComponentId()];
+        if(!cache || !cache.has(key)){
+            return null;
+        }
+        // move it to the most recently used end
+        const html = cache.get(key);
+        cache.delete(key);
+        cache.set(key, html);
+        return html;
+    }
+
+    cacheResponse(key, html){
+        const size = this.getResponseCacheSize();
+        if(size <= 0){
+            return;
+        }
+        const caches = this.constructor.responseCachesById;
+        const cache = caches[this.getComponentId()] || new Map();
+        caches[this.getComponentId()] = cache;
+
+        cache.delete(key);
+        cache.set(key, html);
+        while(cache.size > size){
+            cache.delete(cache.keys().next().value);
+        }
+    }
+
+    clearResponseCache(){
+        delete this.constructor.responseCachesById[this.getComponentId()];
+    }
+
+    replayResponse(html){
+        // swaps an item response in, as htmx would have
+        const template = document.createElement('template');
+        template.innerHTML = html;
+        const fragment = template.content;
+
+        for(const oob of fragment.querySelectorAll('[hx-swap-oob]')){
+            const target = document.getElementById(oob.getAttribute('id'));
+            if(target){
+                // item lists only swap innerHTML out of band
+                target.innerHTML = oob.innerHTML;
+            }
+            oob.remove();
+        }
+
+        const items = fragment.getElementById(`${this.getComponentId()}__items`);
+        if(!items){
+            return;
+        }
+        this.getResultItems().replaceWith(items);
+        htmx.process(items);
+        this.getInput().setAttribute('aria-expanded', items.classList.contains('show'));
+    }
+
+    // local searches (local_threshold)
+
+    getIsLocal(){
+        return this.getContainer().hasAttribute('data-autocomplete-local');
+    }
+
+    storeLocalItems(){
+        // picks the items sent along with the first response
+        const componentId = this.getComponentId();
+        if(!this.getIsLocal() || this.constructor.localItemsById[componentId] !== undefined){
+            return;
+        }
+        const template = document.getElementById(`${componentId}__local`);
+        if(!template){
+            this.constructor.localItemsById[componentId] = false;
+            return;
+        }
+        this.constructor.localItemsById[componentId] = {
+            ...JSON.parse(template.getAttribute('data-local')),
+            items: Array.from(template.content.querySelectorAll('a[role="option"]')),
+        };
+        template.remove();
+    }
+
+    getSelectedValues(){
+        return new Set(
+            Array.from(this.getInputWrapper().querySelectorAll('input[type="hidden"]'))
+                .map(input => input.value)
+                .filter(value => value !== '')
+        );
+    }
+
+    static highlightItem(item, search){
+        // as the search_highlight filter, labels with HTML are left alone
+        const nodes = Array.from(item.childNodes).filter(
+            node => !(node.classList && node.classList.contains('phac_aspc_form_autocomplete__item__spaceholder'))
+        );
+        if(nodes.some(node => node.nodeType !== Node.TEXT_NODE)){
+            return;
+        }
+        const node = nodes.find(node => node.textContent.trim());
+        if(!node){
+            return;
+        }
+        const pos = node.textContent.toLowerCase().indexOf(search.toLowerCase());
+        if(pos === -1){
+            return;
+        }
+        const match = node.splitText(pos);
+        match.splitText(search.length);
+        const span = document.createElement('span');
+        span.className = 'highlight';
+        match.replaceWith(span);
+        span.appendChild(match);
+    }
+
+    renderLocalItems(search){
+        // renders the item list as ItemsView would, from the local items
+        const local = this.constructor.localItemsById[this.getComponentId()];
+        const strings = local.strings;
+        const selectedValues = this.getSelectedValues();
+        const queryTooShort = search.length < strings.minimum_search_length;
+        // the texts are lowercased by normalize_search, whose overrides
+        // local searches don't support
+        const needle = search.toLowerCase();
+
+        const selectedItems = [];
+        const matchingItems = [];
+        local.items.forEach((template, i) => {
+            const selected = selectedValues.has(local.keys[i]);
+            const matches = !queryTooShort && local.texts[i].some(
+                text => text.toLowerCase().includes(needle)
+            );
+            if(!selected && !matches){
+                return;
+            }
+            const item = template.cloneNode(true);
+            item.classList.toggle('selected', selected);
+            item.setAttribute('aria-selected', selected);
+            if(search){
+                this.constructor.highlightItem(item, search);
+            }
+            (selected ? selectedItems : matchingItems).push(item);
+        });
+        const items = [...selectedItems, ...matchingItems];
+
+        const availableResults = (count) => {
+            const rule = new Intl.PluralRules(strings.language).select(count);
+            const template = rule === 'one' ?
+                strings.available_results.one
+                : strings.available_results.other;
+            return template.replace('%(count)s', count);
+        };
+        const noResults = strings.no_results || availableResults(0);
+
+        const results = this.getResultItems();
+        results.replaceChildren(...items);
+        if(queryTooShort || !items.length){
+            const message = document.createElement('span');
+            message.className = 'item';
+            message.textContent = queryTooShort ? strings.type_at_least_n_characters : noResults;
+            results.appendChild(message);
+        }
+        htmx.process(results);
+        results.classList.add('show');
+        this.getInput().setAttribute('aria-expanded', true);
+
+        if(queryTooShort){
+            this.getInfo().textContent = strings.type_at_least_n_characters;
+        } else {
+            this.getInfo().textContent = items.length ? availableResults(items.length) : noResults;
+        }
+    }
+
     clear(){
         this.getInput().value = '';
         this.getInputWrapper().innerHTML = '';
@@ -1023,6 +1256,7 @@ function initializeGlobalAutocompleteListeners(){
                 const shown = event.detail.elt.classList.contains('show');
                 const el = document.querySelector(`#${componentId}__textinput`);
                 el.setAttribute('aria-expanded', shown);	
+                new PhacAutocomplete(componentId).storeLocalItems();
             } else if (
                 event.detail.elt.getAttribute('id') === componentId &&
                 event.detail.pathInfo.requestPath === toggleurl
@@ -1052,11 +1286,75 @@ function initializeGlobalAutocompleteListeners(){
             }
         }
     );
+    document.body.addEventListener('htmx:beforeSwap', function(event) {
+        const requestConfig = event.detail.requestConfig;
+        if (!requestConfig || !requestConfig.path.endsWith('/items')) {
+            return;
+        }
+        const ac_root = requestConfig.elt.closest('[data-autocomplete-root]');
+        if (!ac_root) {
+            return;
+        }
+        const componentId = ac_root.getAttribute('data-autocomplete-componentId');
+
+        // a newer search (possibly replayed from the cache) has been shown
+        const seq = requestConfig.parameters['search_seq'];
+        if (seq < PhacAutocomplete.searchSequenceById[componentId]) {
+            event.detail.shouldSwap = false;
+            return;
+        }
+
+        const xhr = event.detail.xhr;
+        const cacheControl = xhr.getResponseHeader('Cache-Control') || '';
+        if (xhr.status === 200 && !cacheControl.includes('no-store')) {
+            new PhacAutocomplete(componentId).cacheResponse(
+                PhacAutocomplete.getResponseCacheKey(requestConfig.parameters),
+                xhr.responseText
+            );
+        }
+    });
+
     document.body.addEventListener('htmx:configRequest', function(event) {
         const ac_root = event.detail.elt.closest('[data-autocomplete-root]');
         if(!ac_root){
             return;
         }
+        if (event.detail.path.endsWith('/items')) {
+            const componentId = ac_root.getAttribute('data-autocomplete-componentId');
+            const sequences = PhacAutocomplete.searchSequenceById;
+            sequences[componentId] = (sequences[componentId] || 0) + 1;
+
+            const instance = new PhacAutocomplete(componentId);
+
+            // once every item is loaded, searches don't need the server
+            const local = PhacAutocomplete.localItemsById[componentId];
+            if (local) {
+                event.preventDefault();
+                instance.renderLocalItems(event.detail.parameters['search'] || '');
+                return;
+            }
+            if (local === undefined && instance.getIsLocal()) {
+                event.detail.parameters['local'] = 1;
+            }
+
+            // repeated searches are answered from the cache
+            const html = instance.getCachedResponse(
+                PhacAutocomplete.getResponseCacheKey(event.detail.parameters)
+            );
+            if (html !== null) {
+                event.preventDefault();
+                instance.replayResponse(html);
+                return;
+            }
+
+            event.detail.parameters['search_seq'] = sequences[componentId];
+            event.detail.parameters['search_client'] = PhacAutocomplete.searchClientId;
+        }
+        if (event.detail.path.endsWith('/toggle')) {
+            // selecting changes the rendered items
+            const componentId = ac_root.getAttribute('data-autocomplete-componentId');
+            new PhacAutocomplete(componentId).clearResponseCache();
+        }
         if (
             ac_root.contains(event.detail.elt) &&
             event.detail.path.endsWith('/toggle')
@@ -1068,6 +1366,9 @@ function initializeGlobalAutocompleteListeners(){
                 ...event.detail.parameters,
                 ...htmx.values(event.detail.elt, 'get'),
             }
+            if (event.detail.elt.hasAttribute('data-key')) {
+                event.detail.parameters['item'] = event.detail.elt.getAttribute('data-key');
+            }
         }
     });
 
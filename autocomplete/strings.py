@@ -0,0 +1,155 @@
+"""
+Compiled table of the string templates rendered by the use_string tag
+
+Each autocomplete/strings/{name}.html template is compiled once per
+language. Rendered with markers in place of the variables it reads, it
+becomes a %-format string, so using it is a dict lookup and a
+substitution. Templates whose output depends on their variables other
+than by printing them (plurals, filters, conditions) are only resolved
+once, and rendered on each use.
+
+The table is cleared when an HTML template changes under the autoreloader,
+and when the template or translation settings change.
+"""
+
+import threading
+
+from django.core.signals import setting_changed
+from django.template import Context, loader
+from django.template.base import render_value_in_context
+from django.utils import translation
+from django.utils.autoreload import file_changed
+from django.utils.safestring import mark_safe
+
+# settings the compiled strings depend on
+SETTINGS = {
+    "TEMPLATES",
+    "LANGUAGE_CODE",
+    "LANGUAGES",
+    "LOCALE_PATHS",
+    "USE_I18N",
+}
+
+_table = {}
+_lock = threading.Lock()
+
+
+class _RecordingContext(Context):
+    """
+    Records the names a template reads that it doesn't define itself
+    """
+
+    def __init__(self, dict_=None, autoescape=True):
+        super().__init__(dict_, autoescape=autoescape)
+        self.free_names = set()
+
+    def __getitem__(self, key):
+        try:
+            return super().__getitem__(key)
+        except KeyError:
+            self.free_names.add(key)
+            raise
+
+    def __contains__(self, key):
+        # blocktranslate checks its variables with "in"
+        found = super().__contains__(key)
+        if not found:
+            self.free_names.add(key)
+        return found
+
+    def get(self, key, otherwise=None):
+        if not super().__contains__(key):
+            self.free_names.add(key)
+        return super().get(key, otherwise)
+
+
+class CompiledString:
+    def __init__(self, template):
+        self.template = template
+        self.autoescape = template.engine.autoescape
+        self.names, self.format_str = self.compile()
+
+    def render_markers(self, names, suffix):
+        markers = {name: f"\x1f{name}{suffix}\x1f" for name in names}
+        context = _RecordingContext(markers, autoescape=self.autoescape)
+        output = self.template.render(context)
+        return markers, output, context.free_names
+
+    def compile(self):
+        """
+        Returns the names of the template's variables and its format string,
+        which is None if the template must be rendered
+        """
+        _, _, names = self.render_markers((), "")
+
+        markers, output, missing = self.render_markers(names, "")
+        if missing or not all(m in output for m in markers.values()):
+            return names, None
+
+        format_str = output.replace("%", "%%")
+        for name, marker in markers.items():
+            format_str = format_str.replace(marker, f"%({name})s")
+
+        # the variables must be printed as they are, whatever their value
+        markers, output, missing = self.render_markers(names, "\x1e-")
+        if missing or format_str % markers != output:
+            return names, None
+
+        return names, format_str
+
+    def render(self, context):
+        if self.format_str is None or not all(
+            n in context for n in self.names
+        ):
+            return self.template.render(
+                Context(context.flatten(), autoescape=self.autoescape)
+            )
+
+        values_context = Context(autoescape=self.autoescape)
+        values = {
+            name: render_value_in_context(context[name], values_context)
+            for name in self.names
+        }
+        return mark_safe(self.format_str % values)
+
+
+def get_compiled_string(name):
+    key = (name, translation.get_language())
+
+    compiled = _table.get(key)
+    if compiled is None:
+        template = loader.get_template(
+            f"autocomplete/strings/{name}.html", using="django"
+        ).template
+        compiled = CompiledString(template)
+        with _lock:
+            _table[key] = compiled
+
+    return compiled
+
+
+def render_string(name, context):
+    return get_compiled_string(name).render(context)
+
+
+def clear():
+    with _lock:
+        _table.clear()
+
+
+def clear_on_template_changed(sender, file_path, **kwargs):
+    if file_path.suffix in (".html", ".mo"):
+        clear()
+
+
+def clear_on_setting_changed(sender, setting, **kwargs):
+    if setting in SETTINGS:
+        clear()
+
+
+file_changed.connect(
+    clear_on_template_changed, dispatch_uid="autocomplete_strings_changed"
+)
+setting_changed.connect(
+    clear_on_setting_changed, dispatch_uid="autocomplete_strings_settings"
+)
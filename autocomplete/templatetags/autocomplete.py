@@ -12,6 +12,8 @@ from django.utils.html import escape, format_html
 from django.utils.http import urlencode
 from django.utils.safestring import SafeString, mark_safe
 
+from ..strings import render_string
+
 register = template.Library()
 
 
@@ -57,13 +59,12 @@ def use_string(context, name, strings):
 
     autocomplete/strings/{name}.html
 
+    which is compiled once per language, see autocomplete.strings
     """
     if name in strings:
         return strings[name]
 
-    return loader.get_template(
-        f"autocomplete/strings/{name}.html", using="django"
-    ).render(context.flatten())
+    return render_string(name, context)
 
 
 @register.simple_tag
@@ -272,6 +273,17 @@ def text_input_hx_vals(context):
     return mark_safe(val)
 
 
+@register.simple_tag(takes_context=True)
+def load_more_hx_vals(context, cursor):
+    """
+    the next page is requested with the same values as the text input,
+    the cursor carries the search
+    """
+    val = text_input_hx_vals(context)
+
+    return mark_safe(f"{val[:-1]}, cursor: {json.dumps(str(cursor))}}}")
+
+
 @register.simple_tag(takes_context=True)
 def get_input_value(context, selected_options):
     if not selected_options:
@@ -0,0 +1,97 @@
+"""
+Token bucket throttling of the autocomplete views
+
+Each client (the user when logged in, the IP address otherwise) gets a
+bucket per autocomplete, holding up to N tokens that refill at the rate
+"N/period". A request takes a token, and is answered with a 429 when the
+bucket is empty, before any search runs.
+
+Buckets are kept in the autocomplete's cache (cache_alias), so they are
+shared by all workers using it. Reading and writing a bucket isn't
+atomic: concurrent requests of a client may take the same token.
+"""
+
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+THROTTLED_CONTENT = b"Too many requests."
+
+
+def parse_rate(rate):
+    """
+    Parses "N/period", period is one of s, m, h or d (or a word starting
+    with one of them), returns (N, period in seconds)
+    """
+    try:
+        num, period = rate.split("/")
+        num = int(num)
+        seconds = PERIODS[period[0]]
+    except (ValueError, KeyError, IndexError) as e:
+        raise ValueError(f"Invalid throttle rate '{rate}'.") from e
+
+    if num < 1:
+        raise ValueError(f"Invalid throttle rate '{rate}'.")
+
+    return num, seconds
+
+
+def get_rate(ac_class):
+    """
+    The autocomplete's throttle_rate, or the AUTOCOMPLETE_THROTTLE_RATE
+    setting when it's None; returns None when not throttled
+    """
+    rate = ac_class.throttle_rate
+    if rate is None:
+        rate = getattr(settings, "AUTOCOMPLETE_THROTTLE_RATE", None)
+    if not rate:
+        return None
+    return parse_rate(rate)
+
+
+def get_client_ident(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def take_token(ac_class, request):
+    """
+    Takes a token from the client's bucket, returns None if there was one,
+    or else the number of seconds until there is
+    """
+    rate = get_rate(ac_class)
+    if rate is None:
+        return None
+    capacity, period = rate
+
+    cache = caches[ac_class.cache_alias]
+    key = (
+        f"autocomplete:throttle:{ac_class.route_name}:"
+        f"{get_client_ident(request)}"
+    )
+    now = time.time()
+
+    tokens, updated_at = cache.get(key, (capacity, now))
+    tokens = min(capacity, tokens + (now - updated_at) * capacity / period)
+
+    if tokens < 1:
+        return math.ceil((1 - tokens) * period / capacity)
+
+    # an unused bucket is full again after a period
+    cache.set(key, (tokens - 1, now), timeout=period)
+    return None
+
+
+def get_throttled_response(retry_after):
+    response = HttpResponse(
+        THROTTLED_CONTENT, status=429, content_type="text/plain"
+    )
+    response["Retry-After"] = str(retry_after)
+    return response
@@ -0,0 +1,151 @@
+"""
+Time budget of searches, see Autocomplete.search_timeout_ms
+
+The database enforces the budget where it can: PostgreSQL through a
+transaction-local statement_timeout, set to the remaining budget before
+each query, SQLite through a progress handler
+aborting the query. Searches that don't go through one of these run in a
+watchdog thread instead (see views.run_with_timeout), which the request
+stops waiting for when the budget is spent. When all of the watchdog's
+threads are taken, searches are answered with a 503 rather than queued.
+
+Timed out searches are counted in timed_out_searches, and searches turned
+away in busy_searches, by route name. Both are logged to the
+"autocomplete" logger.
+"""
+
+import logging
+import math
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import DatabaseError, connections, transaction
+from django.http import HttpResponse
+
+from . import cancellation
+
+logger = logging.getLogger("autocomplete")
+
+timed_out_searches = Counter()
+busy_searches = Counter()
+
+BUSY_CONTENT = b"Too many searches running, try again."
+
+# vendors whose queries can be given a time limit
+STATEMENT_TIMEOUT_VENDORS = ("postgresql", "sqlite")
+
+# SQLite virtual machine instructions between deadline checks
+SQLITE_PROGRESS_STEPS = 1000
+
+
+class SearchTimedOut(Exception):
+    pass
+
+
+class SearchBusy(Exception):
+    pass
+
+
+def record_timeout(ac_class, search):
+    timed_out_searches[ac_class.route_name] += 1
+    logger.warning(
+        "Search %r of %s ran over its %sms budget",
+        search,
+        ac_class.route_name,
+        ac_class.search_timeout_ms,
+    )
+
+
+def record_busy(ac_class, search):
+    busy_searches[ac_class.route_name] += 1
+    logger.warning(
+        "Search %r of %s turned away, the watchdog's threads are all taken",
+        search,
+        ac_class.route_name,
+    )
+
+
+def get_busy_response():
+    response = HttpResponse(
+        BUSY_CONTENT, status=503, content_type="text/plain"
+    )
+    response["Retry-After"] = "1"
+    return response
+
+
+def uses_statement_timeout(ac_class, using):
+    """
+    Whether the database limits the search's queries,
+    rather than a watchdog thread
+    """
+    if not cancellation.searches_database(ac_class):
+        return False
+    return connections[using].vendor in STATEMENT_TIMEOUT_VENDORS
+
+
+@contextmanager
+def statement_timeout(using, timeout_ms):
+    """
+    Limits the queries run in the block to timeout_ms in total,
+    raises SearchTimedOut once they run over
+    """
+    connection = connections[using]
+    deadline = time.monotonic() + timeout_ms / 1000
+
+    try:
+        if connection.vendor == "postgresql":
+            with postgresql_timeout(connection, deadline):
+                yield
+        else:
+            with sqlite_timeout(connection, deadline):
+                yield
+    except DatabaseError as e:
+        # cancelled queries raise the same errors for other reasons
+        if time.monotonic() >= deadline:
+            raise SearchTimedOut() from e
+        raise
+
+
+@contextmanager
+def postgresql_timeout(connection, deadline):
+    previous = None
+    if connection.in_atomic_block:
+        # SET LOCAL outlives the savepoint, it's restored afterwards
+        with connection.cursor() as cursor:
+            cursor.execute("SHOW statement_timeout")
+            (previous,) = cursor.fetchone()
+
+    def limit_statement(execute, sql, params, many, context):
+        # statement_timeout applies to each statement, so each one is
+        # given what's left of the budget
+        remaining_ms = math.ceil((deadline - time.monotonic()) * 1000)
+        if remaining_ms <= 0:
+            raise SearchTimedOut()
+        # the raw cursor doesn't go through this wrapper again
+        with connection.connection.cursor() as cursor:
+            cursor.execute(f"SET LOCAL statement_timeout = {remaining_ms}")
+        return execute(sql, params, many, context)
+
+    with transaction.atomic(using=connection.alias):
+        with connection.execute_wrapper(limit_statement):
+            yield
+        if previous is not None:
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL statement_timeout = %s", [previous])
+
+
+@contextmanager
+def sqlite_timeout(connection, deadline):
+    connection.ensure_connection()
+    raw_connection = connection.connection
+
+    def check_deadline():
+        # a true value aborts the running query
+        return time.monotonic() >= deadline
+
+    raw_connection.set_progress_handler(check_deadline, SQLITE_PROGRESS_STEPS)
+    try:
+        yield
+    finally:
+        raw_connection.set_progress_handler(None, 0)
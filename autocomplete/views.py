@@ -1,11 +1,40 @@
-from django.http import HttpResponseBadRequest
+import asyncio
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core import signing
+from django.db import DatabaseError, connections
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import render
 from django.urls import path
+from django.utils import translation
+from django.utils.cache import (
+    add_never_cache_headers,
+    get_conditional_response,
+    patch_cache_control,
+)
 from django.utils.functional import cached_property
+from django.utils.http import quote_etag
 from django.utils.translation import gettext_lazy as _
+from django.utils.translation import ngettext
 from django.views import View
 
-from .core import AC_CLASS_CONFIGURABLE_VALUES, ContextArg, _ac_registry
+from asgiref.sync import sync_to_async
+
+from . import cache as search_cache
+from . import cancellation, rendering, throttle, timeouts
+from .core import (
+    AC_CLASS_CONFIGURABLE_VALUES,
+    ContextArg,
+    SearchPage,
+    _ac_registry,
+)
+
+# request parameters that don't affect the response, left out of ETags
+VOLATILE_PARAMS = {"search_seq", "search_client"}
 
 
 class AutocompleteBaseView(View):
@@ -24,6 +53,10 @@ class AutocompleteBaseView(View):
     def dispatch(self, request, *args, **kwargs):
         self.ac_class.auth_check(request)
 
+        retry_after = throttle.take_token(self.ac_class, request)
+        if retry_after is not None:
+            return throttle.get_throttled_response(retry_after)
+
         return super().dispatch(request, *args, **kwargs)
 
     @cached_property
@@ -79,6 +112,159 @@ class AutocompleteBaseView(View):
         }
 
 
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "AUTOCOMPLETE_MAX_WORKERS", 4),
+                thread_name_prefix="autocomplete",
+            )
+
+    return _executor
+
+
+_watchdog = None
+
+
+class Watchdog:
+    """
+    Thread pool of the searches limited by search_timeout_ms
+
+    It's separate from run_concurrently's pool, so that searches running
+    over their budget only hold the watchdog's threads. Searches are only
+    submitted to an idle thread, never queued behind running ones
+    """
+
+    def __init__(self, max_workers):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="autocomplete-watchdog",
+        )
+        self.slots = threading.BoundedSemaphore(max_workers)
+
+    def submit(self, func):
+        """
+        Returns (future, started), started is set once func begins;
+        raises SearchBusy if every thread is taken
+        """
+        if not self.slots.acquire(blocking=False):
+            raise timeouts.SearchBusy()
+
+        started = threading.Event()
+
+        def run_started():
+            started.set()
+            return func()
+
+        try:
+            future = submit_to_pool(run_started, executor=self.executor)
+        except BaseException:
+            self.slots.release()
+            raise
+
+        # the slot is taken until the thread is done, timed out or not
+        future.add_done_callback(lambda f: self.slots.release())
+        return future, started
+
+
+def get_watchdog():
+    global _watchdog
+
+    with _executor_lock:
+        if _watchdog is None:
+            _watchdog = Watchdog(
+                getattr(settings, "AUTOCOMPLETE_WATCHDOG_WORKERS", 4)
+            )
+
+    return _watchdog
+
+
+def in_atomic_block():
+    return any(
+        conn.in_atomic_block for conn in connections.all(initialized_only=True)
+    )
+
+
+def close_broken_connections():
+    """
+    Pool threads keep their database connections for their lifetime,
+    rather than opening one per task as CONN_MAX_AGE = 0 would; only
+    connections that stopped working are closed
+    """
+    for conn in connections.all(initialized_only=True):
+        if conn.connection is None or not conn.errors_occurred:
+            continue
+        if conn.is_usable():
+            conn.errors_occurred = False
+        else:
+            conn.close()
+
+
+def submit_to_pool(func, executor=None):
+    """
+    Runs func in the thread pool (or executor), in the current language,
+    returns a future
+    """
+    language = translation.get_language()
+
+    def run_in_pool():
+        close_broken_connections()
+        try:
+            with translation.override(language):
+                return func()
+        finally:
+            close_broken_connections()
+
+    return (executor or get_executor()).submit(run_in_pool)
+
+
+def run_concurrently(*funcs):
+    """
+    Runs the functions concurrently and returns their results, the first
+    one in the current thread and the others in a bounded thread pool
+
+    Pool threads have their own database connections, so they can't see
+    the current transaction's changes: inside atomic blocks (including
+    ATOMIC_REQUESTS), the functions run one after the other instead
+    """
+    if in_atomic_block():
+        return [func() for func in funcs]
+
+    futures = [submit_to_pool(func) for func in funcs[1:]]
+
+    return [funcs[0](), *(future.result() for future in futures)]
+
+
+def run_with_timeout(func, timeout_ms):
+    """
+    Runs func in the watchdog's pool, raises SearchTimedOut if it doesn't
+    return within timeout_ms of starting, and SearchBusy if all of the
+    pool's threads are taken
+
+    Threads can't be stopped, func keeps running in the pool until it
+    returns. Inside atomic blocks, func runs in the current thread without
+    a time limit, as in run_concurrently
+    """
+    if in_atomic_block():
+        return func()
+
+    future, started = get_watchdog().submit(func)
+    # a thread was idle, the budget starts once it picks func up
+    if not started.wait(timeout=timeout_ms / 1000) and future.cancel():
+        raise timeouts.SearchBusy()
+    try:
+        return future.result(timeout=timeout_ms / 1000)
+    except TimeoutError as e:
+        future.cancel()
+        raise timeouts.SearchTimedOut() from e
+
+
 def toggle_set(_set, item):
     s = _set.copy()
 
@@ -117,6 +303,21 @@ def replace_or_toggle(_set, item):
 
 class ToggleView(AutocompleteBaseView):
     def get(self, request, *args, **kwargs):
+        toggle = self.get_toggle_args()
+        if toggle is None:
+            return HttpResponseBadRequest()
+
+        all_values = self.ac_class.get_items_from_keys(
+            toggle["keys_to_fetch"], toggle["context_obj"]
+        )
+
+        return self.render_toggle(toggle, all_values)
+
+    def get_toggle_args(self):
+        """
+        Parses the request, None if it isn't a valid toggle
+        """
+        request = self.request
         field_name = self.request_dict["field_name"]
 
         current_items = self.request.GET.getlist(field_name)
@@ -126,7 +327,7 @@ class ToggleView(AutocompleteBaseView):
         key_to_toggle = request.GET.get("item")
 
         if key_to_toggle is None:
-            return HttpResponseBadRequest()
+            return None
 
         is_multi = self.get_configurable_value("multiselect")
 
@@ -138,10 +339,21 @@ class ToggleView(AutocompleteBaseView):
             )
         keys_to_fetch = set(new_selected_keys).union({key_to_toggle})
 
-        context_obj = ContextArg(request=request, client_kwargs=request.GET)
-        all_values = self.ac_class.get_items_from_keys(
-            keys_to_fetch, context_obj
-        )
+        return {
+            "current_items": current_items,
+            "key_to_toggle": key_to_toggle,
+            "new_selected_keys": new_selected_keys,
+            "keys_to_fetch": keys_to_fetch,
+            "context_obj": ContextArg(
+                request=request, client_kwargs=request.GET
+            ),
+        }
+
+    def render_toggle(self, toggle, all_values):
+        request = self.request
+        current_items = toggle["current_items"]
+        key_to_toggle = toggle["key_to_toggle"]
+        new_selected_keys = toggle["new_selected_keys"]
 
         items = self.ac_class.map_search_results(all_values, new_selected_keys)
 
@@ -179,82 +391,646 @@ class ToggleView(AutocompleteBaseView):
                 "toggle": new_items,
                 "swap_oob": swap_oob,
             },
+            using=rendering.get_template_backend(),
         )
 
 
 class ItemsView(AutocompleteBaseView):
+    # set when the search ran over search_timeout_ms
+    search_timed_out = False
+    # every item, sent along when the widget asks for local searches
+    local_items = None
+
     def get(self, request, *args, **kwargs):
-        context_obj = ContextArg(request=request, client_kwargs=request.GET)
+        etag = self.get_etag()
+        if etag is not None:
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                return self.patch_cache_headers(not_modified, etag)
 
-        search_query = request.GET.get("search", "")
-        field_name = self.get_configurable_value("field_name")
-        selected_keys = request.GET.getlist(field_name)
-        if selected_keys == [""]:
-            selected_keys = []
+        return self.patch_cache_headers(self.get_search_response(), etag)
+
+    def get_etag(self):
+        """
+        Returns an ETag identifying the response from the autocomplete's
+        data version and the request, None unless etag_responses is set
+        """
+        if not self.ac_class.etag_responses:
+            return None
+
+        params = sorted(
+            (key, values)
+            for key, values in self.request.GET.lists()
+            if key not in VOLATILE_PARAMS
+        )
+        user = getattr(self.request, "user", None)
+        user_pk = user.pk if user is not None else None
+
+        digest = hashlib.sha1(
+            json.dumps(
+                [
+                    self.request.path,
+                    search_cache.get_generation(self.ac_class),
+                    translation.get_language(),
+                    user_pk,
+                    params,
+                ],
+                default=str,
+            ).encode("utf-8")
+        ).hexdigest()
+
+        return quote_etag(digest)
+
+    def patch_cache_headers(self, response, etag):
+        if self.search_timed_out:
+            # nor replayed by the widget
+            add_never_cache_headers(response)
+            return response
+
+        # superseded or throttled responses aren't cacheable
+        if response.status_code not in (200, 304):
+            return response
+
+        if etag is not None:
+            response["ETag"] = etag
+        if self.ac_class.cache_control:
+            patch_cache_control(response, **self.ac_class.cache_control)
+
+        return response
+
+    def get_search_response(self):
+        try:
+            search = self.start_search()
+            if search is None:
+                return self.get_items()
+
+            try:
+                with cancellation.cancellable_queries(
+                    search, self.get_cancellable_alias()
+                ):
+                    response = self.get_items()
+            finally:
+                cancellation.finish_search(search)
+
+            if cancellation.is_superseded(self.ac_class, search):
+                raise cancellation.SearchSuperseded()
+
+            return response
+
+        except cancellation.SearchSuperseded:
+            return self.get_superseded_response()
+
+        except timeouts.SearchBusy:
+            timeouts.record_busy(self.ac_class, self.request.GET.get("search"))
+            return timeouts.get_busy_response()
 
-        if selected_keys:
-            selected_items = self.ac_class.get_items_from_keys(
-                selected_keys, context_obj
+    def start_search(self):
+        """
+        Returns the InFlightSearch tracking this request, or None if it
+        isn't tracked; raises SearchSuperseded if a newer search started
+        """
+        if not self.ac_class.cancel_superseded_searches:
+            return None
+
+        seq = cancellation.get_sequence(self.request)
+        if seq is None:
+            return None
+
+        key = cancellation.get_search_key(
+            self.ac_class, self.request, self.get_component_id()
+        )
+        search = cancellation.start_search(self.ac_class, key, seq)
+        if search is None:
+            raise cancellation.SearchSuperseded()
+
+        return search
+
+    def get_cancellable_alias(self):
+        """
+        Returns the alias of the database whose queries a newer search
+        interrupts, None if the autocomplete doesn't query one
+        """
+        if not cancellation.searches_database(self.ac_class):
+            return None
+        return cancellation.get_database_alias(self.ac_class)
+
+    def get_superseded_response(self):
+        # htmx doesn't swap 204 responses, the newer search's will be
+        return HttpResponse(status=204)
+
+    def get_items(self):
+        search_query, context_obj = self.get_search_args()
+        self.local_items = self.get_local_items(context_obj)
+
+        def get_selected_items():
+            if not context_obj.selected_keys:
+                return []
+            return self.ac_class.get_items_from_keys(
+                context_obj.selected_keys, context_obj
+            )
+
+        def get_page():
+            if self.is_query_too_short(search_query):
+                return None
+            return self.get_search_page(search_query, context_obj)
+
+        if (
+            self.ac_class.concurrent_queries
+            and context_obj.selected_keys
+            and not self.is_query_too_short(search_query)
+        ):
+            page, selected_items = run_concurrently(
+                get_page, get_selected_items
             )
         else:
-            selected_items = []
+            selected_items, page = get_selected_items(), get_page()
 
-        query_too_short = (
-            len(search_query) < self.ac_class.minimum_search_length
+        return self.render_items(
+            search_query, context_obj, selected_items, page
         )
 
-        if query_too_short:
-            search_results = []
-        else:
-            search_results = self.ac_class.search_items(
+    def get_search_page(self, search_query, context_obj):
+        """
+        Searches within the autocomplete's search_timeout_ms, if set
+        """
+
+        def search():
+            return self.ac_class.get_search_page(
                 search_query,
                 context_obj,
+                self.ac_class.max_results,
             )
 
-        all_items = [*selected_items]
-        for i in search_results:
-            if str(i["key"]) not in selected_keys:
-                all_items.append(i)
+        timeout_ms = self.ac_class.search_timeout_ms
+        if not timeout_ms:
+            return search()
+
+        using = cancellation.get_database_alias(self.ac_class)
+        try:
+            if timeouts.uses_statement_timeout(self.ac_class, using):
+                with timeouts.statement_timeout(using, timeout_ms):
+                    return search()
+            return run_with_timeout(search, timeout_ms)
+        except timeouts.SearchTimedOut:
+            return self.get_timed_out_page(search_query)
+
+    def get_timed_out_page(self, search_query):
+        self.search_timed_out = True
+        timeouts.record_timeout(self.ac_class, search_query)
+        return SearchPage(items=[], has_more=False, total=0, timed_out=True)
+
+    def get_local_items(self, context_obj):
+        """
+        Returns (mapped items, data) for the widget to search locally,
+        None unless it asked for them and local_threshold allows it
+        """
+        if not self.ac_class.local_threshold or not self.request.GET.get(
+            "local"
+        ):
+            return None
+
+        local_items = self.ac_class.get_local_items(context_obj)
+        if local_items is None:
+            return None
+        items, texts = local_items
+
+        mapped_items = self.ac_class.map_search_results(
+            items, context_obj.selected_keys
+        )
+        data = {
+            "keys": [item["key"] for item in mapped_items],
+            "texts": [
+                [self.ac_class.normalize_search(t) for t in item_texts]
+                for item_texts in texts
+            ],
+            "strings": self.get_local_strings(),
+        }
+        return mapped_items, json.dumps(data)
+
+    def get_local_strings(self):
+        strings = self.ac_class.get_custom_strings()
+        n = self.ac_class.minimum_search_length
+        # same message as strings/available_results.html
+        one, other = (
+            ngettext(
+                "%(count)s result available.",
+                "%(count)s results available.",
+                count,
+            )
+            for count in (1, 2)
+        )
+
+        return {
+            "minimum_search_length": n,
+            "type_at_least_n_characters": str(
+                strings["type_at_least_n_characters"]
+            )
+            % {"n": str(n)},
+            "no_results": str(strings["no_results"] or ""),
+            "available_results": {"one": one, "other": other},
+            "language": translation.get_language(),
+        }
+
+    def get_selected_keys(self):
+        field_name = self.get_configurable_value("field_name")
+        selected_keys = self.request.GET.getlist(field_name)
+        if selected_keys == [""]:
+            selected_keys = []
+        return selected_keys
+
+    def get_search_args(self):
+        search_query = self.request.GET.get("search", "")
+
+        context_obj = ContextArg(
+            request=self.request,
+            client_kwargs=self.request.GET,
+            selected_keys=self.get_selected_keys(),
+        )
+
+        return search_query, context_obj
+
+    def is_query_too_short(self, search_query):
+        return len(search_query) < self.ac_class.minimum_search_length
 
-        total_results = len(all_items)
-        cutoff = self.ac_class.max_results + len(selected_keys)
-        if total_results > cutoff:
-            all_items = all_items[:cutoff]
+    def render_items(self, search_query, context_obj, selected_items, page):
+        """
+        page is None when the query is too short to search
+        """
+        query_too_short = page is None
+        if query_too_short:
+            page = SearchPage(items=[], has_more=False, total=0)
+
+        all_items = [*selected_items, *page.items]
+
+        if page.total is None:
+            total_results = None
+        else:
+            total_results = len(selected_items) + page.total
 
         mapped_items = self.ac_class.map_search_results(
-            all_items, selected_keys
+            all_items, context_obj.selected_keys
         )
 
+        context = {
+            # note: name -> field_name
+            **self.get_template_context(),
+            "show": not (query_too_short),
+            "query_too_short": query_too_short,
+            "search_timed_out": page.timed_out,
+            "search": search_query,
+            "items": mapped_items,
+            "has_more": page.has_more,
+            "next_cursor": page.next_cursor,
+            "total_results": total_results,
+            "total_kind": page.total_kind,
+            "minimum_search_length": self.ac_class.minimum_search_length,
+            "local_items": self.local_items,
+        }
+        context["rendered_items"] = self.render_rows(context, " " * 8)
+
         # render items ...
         return render(
-            request,
+            self.request,
             "autocomplete/item_list.html",
+            context,
+            using=rendering.get_template_backend(),
+        )
+
+    def render_rows(self, context, indent):
+        """
+        Renders the item rows without going through item.html, returns None
+        (the template renders them) when item.html is overridden
+        """
+        if not rendering.uses_default_item_template():
+            return None
+        renderer = rendering.ItemRenderer(context)
+        return renderer.render_rows(context["items"], indent)
+
+
+class PageView(ItemsView):
+    """
+    Renders the results following a cursor, to append to the item list
+    """
+
+    def get(self, request, *args, **kwargs):
+        try:
+            search_query, position = self.ac_class.read_cursor(
+                request.GET.get("cursor", "")
+            )
+        except signing.BadSignature:
+            return HttpResponseBadRequest()
+
+        _, context_obj = self.get_search_args()
+
+        # later pages aren't cached, the cursor already skips what was seen
+        page = self.ac_class.fetch_search_page(
+            search_query,
+            context_obj,
+            self.ac_class.max_results,
+            position=position,
+        )
+
+        return self.render_page(search_query, context_obj, page)
+
+    def render_page(self, search_query, context_obj, page):
+        mapped_items = self.ac_class.map_search_results(
+            page.items, context_obj.selected_keys
+        )
+
+        context = {
+            **self.get_template_context(),
+            "search": search_query,
+            "items": mapped_items,
+            "next_cursor": page.next_cursor,
+        }
+        context["rendered_items"] = self.render_rows(context, " " * 4)
+
+        return render(
+            self.request,
+            "autocomplete/item_page.html",
+            context,
+            using=rendering.get_template_backend(),
+        )
+
+
+class JsonResultsMixin:
+    """
+    Renders ItemsView and PageView results as JSON rather than HTML,
+    for clients other than the widget
+    """
+
+    def get_selected_keys(self):
+        if "field_name" not in self.request.GET:
+            return []
+        return super().get_selected_keys()
+
+    def get_component_id(self):
+        if "field_name" not in self.request.GET:
+            # scopes superseded searches, which search_client tells apart
+            return self.get_configurable_value("component_prefix") or ""
+        return super().get_component_id()
+
+    def render_items(self, search_query, context_obj, selected_items, page):
+        query_too_short = page is None
+        if query_too_short:
+            page = SearchPage(items=[], has_more=False, total=0)
+
+        if page.total is None:
+            total_results = None
+        else:
+            total_results = len(selected_items) + page.total
+
+        return JsonResponse(
             {
-                # note: name -> field_name
-                **self.get_template_context(),
-                "show": not (query_too_short),
-                "query_too_short": query_too_short,
                 "search": search_query,
-                "items": mapped_items,
+                "query_too_short": query_too_short,
+                "search_timed_out": page.timed_out,
+                "items": self.ac_class.map_search_results(
+                    [*selected_items, *page.items], context_obj.selected_keys
+                ),
+                "has_more": page.has_more,
+                "next_cursor": page.next_cursor,
                 "total_results": total_results,
-                "minimum_search_length": self.ac_class.minimum_search_length,
-            },
+                "total_kind": page.total_kind,
+            }
         )
 
+    def render_page(self, search_query, context_obj, page):
+        return JsonResponse(
+            {
+                "search": search_query,
+                "items": self.ac_class.map_search_results(
+                    page.items, context_obj.selected_keys
+                ),
+                "next_cursor": page.next_cursor,
+            }
+        )
+
+
+class ItemsJsonView(JsonResultsMixin, ItemsView):
+    pass
+
+
+class PageJsonView(JsonResultsMixin, PageView):
+    pass
+
+
+class AsyncViewMixin:
+    """
+    Makes an autocomplete view async, for ASGI deployments
+
+    Searches go through the autocomplete's async methods (asearch_items,
+    aget_items_from_keys...), which fall back to the sync ones in a thread
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        # auth_check may load request.user from the session,
+        # which AutocompleteBaseView.dispatch would do in the event loop
+        await sync_to_async(self.ac_class.auth_check)(request)
+
+        retry_after = await sync_to_async(throttle.take_token)(
+            self.ac_class, request
+        )
+        if retry_after is not None:
+            return throttle.get_throttled_response(retry_after)
+
+        return await View.dispatch(self, request, *args, **kwargs)
+
+
+class AsyncToggleView(AsyncViewMixin, ToggleView):
+    async def get(self, request, *args, **kwargs):
+        toggle = self.get_toggle_args()
+        if toggle is None:
+            return HttpResponseBadRequest()
+
+        all_values = await self.ac_class.aget_items_from_keys(
+            toggle["keys_to_fetch"], toggle["context_obj"]
+        )
+
+        return self.render_toggle(toggle, all_values)
+
+
+class AsyncItemsView(AsyncViewMixin, ItemsView):
+    async def get(self, request, *args, **kwargs):
+        # reads the cache and maybe the session
+        etag = await sync_to_async(self.get_etag)()
+        if etag is not None:
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                return self.patch_cache_headers(not_modified, etag)
+
+        response = await self.aget_search_response()
+        return self.patch_cache_headers(response, etag)
+
+    async def aget_search_response(self):
+        try:
+            search = await sync_to_async(self.start_search)()
+            if search is None:
+                return await self.aget_items()
+
+            # the sync methods run in the thread-sensitive thread,
+            # whose connection runs the search's queries
+            query_cancel = None
+            using = self.get_cancellable_alias()
+            if using is not None:
+                query_cancel = await sync_to_async(
+                    cancellation.get_query_cancel
+                )(using)
+
+            # a newer search cancels this one's task and its query
+            loop = asyncio.get_running_loop()
+            work = asyncio.ensure_future(self.aget_items())
+
+            def cancel():
+                if query_cancel is not None:
+                    query_cancel()
+                loop.call_soon_threadsafe(work.cancel)
+
+            try:
+                cancellation.set_cancel(search, cancel)
+                response = await work
+            except asyncio.CancelledError:
+                if not (work.cancelled() and search.superseded):
+                    raise
+                raise cancellation.SearchSuperseded()
+            except DatabaseError as e:
+                if not search.superseded:
+                    raise
+                raise cancellation.SearchSuperseded() from e
+            finally:
+                cancellation.finish_search(search)
+                work.cancel()
+
+            if await sync_to_async(cancellation.is_superseded)(
+                self.ac_class, search
+            ):
+                raise cancellation.SearchSuperseded()
+
+            return response
+
+        except cancellation.SearchSuperseded:
+            return self.get_superseded_response()
+
+    async def aget_items(self):
+        search_query, context_obj = self.get_search_args()
+        self.local_items = await sync_to_async(self.get_local_items)(
+            context_obj
+        )
+
+        async def get_selected_items():
+            if not context_obj.selected_keys:
+                return []
+            return await self.ac_class.aget_items_from_keys(
+                context_obj.selected_keys, context_obj
+            )
+
+        async def get_page():
+            if self.is_query_too_short(search_query):
+                return None
+            return await self.aget_search_page(search_query, context_obj)
+
+        selected_items, page = await asyncio.gather(
+            get_selected_items(), get_page()
+        )
+
+        return self.render_items(
+            search_query, context_obj, selected_items, page
+        )
+
+    async def aget_search_page(self, search_query, context_obj):
+        """
+        Async counterpart of get_search_page, the budget is enforced by
+        cancelling the search's task: queries running in a thread finish
+        """
+        search = self.ac_class.aget_search_page(
+            search_query,
+            context_obj,
+            self.ac_class.max_results,
+        )
+
+        timeout_ms = self.ac_class.search_timeout_ms
+        if not timeout_ms:
+            return await search
+
+        try:
+            async with asyncio.timeout(timeout_ms / 1000):
+                return await search
+        except TimeoutError:
+            return self.get_timed_out_page(search_query)
+
+
+class AsyncPageView(AsyncViewMixin, PageView):
+    async def get(self, request, *args, **kwargs):
+        try:
+            search_query, position = self.ac_class.read_cursor(
+                request.GET.get("cursor", "")
+            )
+        except signing.BadSignature:
+            return HttpResponseBadRequest()
+
+        _, context_obj = self.get_search_args()
+
+        page = await self.ac_class.afetch_search_page(
+            search_query,
+            context_obj,
+            self.ac_class.max_results,
+            position=position,
+        )
+
+        return self.render_page(search_query, context_obj, page)
+
+
+class AsyncItemsJsonView(JsonResultsMixin, AsyncItemsView):
+    pass
+
+
+class AsyncPageJsonView(JsonResultsMixin, AsyncPageView):
+    pass
+
+
+def get_urls(
+    items_view, toggle_view, page_view, items_json_view, page_json_view
+):
+    return (
+        [
+            path(
+                "autocomplete/<str:ac_name>/items",
+                items_view.as_view(),
+                name="items",
+            ),
+            path(
+                "autocomplete/<str:ac_name>/toggle",
+                toggle_view.as_view(),
+                name="toggle",
+            ),
+            path(
+                "autocomplete/<str:ac_name>/page",
+                page_view.as_view(),
+                name="page",
+            ),
+            path(
+                "autocomplete/<str:ac_name>/items.json",
+                items_json_view.as_view(),
+                name="items_json",
+            ),
+            path(
+                "autocomplete/<str:ac_name>/page.json",
+                page_json_view.as_view(),
+                name="page_json",
+            ),
+        ],
+        "autocomplete",
+        "autocomplete",
+    )
+
+
+urls = get_urls(ItemsView, ToggleView, PageView, ItemsJsonView, PageJsonView)
 
-urls = (
-    [
-        path(
-            "autocomplete/<str:ac_name>/items",
-            ItemsView.as_view(),
-            name="items",
-        ),
-        path(
-            "autocomplete/<str:ac_name>/toggle",
-            ToggleView.as_view(),
-            name="toggle",
-        ),
-    ],
-    "autocomplete",
-    "autocomplete",
+# include these instead of urls when serving with ASGI
+async_urls = get_urls(
+    AsyncItemsView,
+    AsyncToggleView,
+    AsyncPageView,
+    AsyncItemsJsonView,
+    AsyncPageJsonView,
 )
@@ -3,8 +3,11 @@ This file enables the component to be used like other Django widgets
 """
 
 from django.forms import Widget
+from django.template import loader
+from django.utils.safestring import mark_safe
 
 from .core import AC_CLASS_CONFIGURABLE_VALUES, Autocomplete
+from .rendering import get_template_backend
 
 
 class AutocompleteWidget(Widget):
@@ -77,6 +80,16 @@ class AutocompleteWidget(Widget):
     def is_multi(self):
         return self.get_configurable_value("multiselect")
 
+    def _render(self, template_name, context, renderer=None):
+        using = get_template_backend()
+        if using == "django":
+            # through the form renderer, as other widgets
+            return super()._render(template_name, context, renderer)
+
+        return mark_safe(
+            loader.render_to_string(template_name, context, using=using)
+        )
+
     def get_context(self, name, value, attrs):
         context = super().get_context(name, value, attrs)
 
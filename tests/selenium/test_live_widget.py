@@ -191,3 +191,46 @@ def test_multi_select_live_widget(live_server, driver):
 
     team = Team.objects.get(pk=t1.pk)
     assert list(team.members.all()) == [p1]
+
+
+def test_repeated_search_is_replayed(live_server, driver):
+    from selenium.webdriver.common.keys import Keys
+
+    PersonFactory(name="Sample Leader")
+    PersonFactory(name="Sample Member")
+    t1 = TeamFactory()
+
+    driver.get(live_server.url + reverse("edit_team", args=[t1.pk]))
+
+    def cache_size():
+        return driver.execute_script(
+            "const cache = PhacAutocomplete.responseCachesById['team_lead'];"
+            "return cache ? cache.size : 0;"
+        )
+
+    click_button(driver, "input#team_lead__textinput")
+    input = get_element(driver, "input#team_lead__textinput")
+    input.send_keys("Sample L")
+    wait_until_selector(
+        driver, "div[role='listbox'] a[role='option']", timeout=2
+    )
+    assert len(get_elements(driver, "a[role='option']")) == 1
+    cached = cache_size()
+    assert cached
+
+    # back to a search seen before, then forward again
+    input.send_keys(Keys.BACKSPACE, Keys.BACKSPACE)
+    wait_until_selector(
+        driver, "div[role='listbox'] a[role='option']:nth-child(2)", timeout=2
+    )
+    input.send_keys(" L")
+    wait_until_selector_gone(
+        driver, "div[role='listbox'] a[role='option']:nth-child(2)"
+    )
+
+    # "Sample L" was answered from the cache
+    assert cache_size() == cached + 1
+
+    # selecting clears the cache
+    click_button(driver, "a[role='option']")
+    assert cache_size() == 0
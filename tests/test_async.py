@@ -0,0 +1,169 @@
+from django.http import QueryDict
+from django.test import RequestFactory
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from autocomplete import IndexedAutocomplete, ModelAutocomplete
+from autocomplete.core import ContextArg, overrides_sync, register
+from autocomplete.views import AsyncItemsView, AsyncPageView, AsyncToggleView
+
+from sample_app.models import Person, PersonFactory
+from tests.conftest import PersonAC
+
+from .utils_for_test import get_soup
+
+
+@register
+class AsyncPagedPersonAC(PersonAC):
+    max_results = 2
+    load_more_results = True
+
+
+@register
+class SyncSearchPersonAC(PersonAC):
+    @classmethod
+    def search_items(cls, search, context):
+        # evaluated eagerly, so it must not run in the event loop
+        qs = Person.objects.filter(name__istartswith=search)
+        return [{"key": p.id, "label": p.name} for p in qs]
+
+
+@register
+class AsyncIndexedPersonAC(IndexedAutocomplete):
+    model = Person
+    search_attrs = ["name"]
+
+
+def call_view(view_class, ac_name, **params):
+    qs_dict = QueryDict(mutable=True)
+    for key, value in params.items():
+        if isinstance(value, list):
+            qs_dict.setlist(key, value)
+        else:
+            qs_dict[key] = value
+
+    request = RequestFactory().get(f"/?{qs_dict.urlencode()}")
+    view = view_class.as_view()
+    return async_to_sync(view)(request, ac_name=ac_name)
+
+
+def labels(response):
+    soup = get_soup(response)
+    return [a.get_text().strip() for a in soup.select("a[role='option']")]
+
+
+def test_async_views_are_async():
+    for view_class in (AsyncItemsView, AsyncToggleView, AsyncPageView):
+        assert view_class.view_is_async
+
+
+def test_async_items_view(django_assert_num_queries):
+    p1 = PersonFactory(name="abcd1")
+    PersonFactory(name="abcd2")
+    PersonFactory(name="abcd3")
+    PersonFactory(name="abcd4")
+    PersonFactory(name="zzz")
+
+    # selected items, page, count
+    with django_assert_num_queries(3):
+        response = call_view(
+            AsyncItemsView,
+            "AsyncPagedPersonAC",
+            field_name="myfield",
+            search="abcd",
+            myfield=[str(p1.id)],
+        )
+
+    assert response.status_code == 200
+    assert labels(response) == ["abcd1", "abcd2", "abcd3"]
+
+    soup = get_soup(response)
+    sentinel = soup.select_one("div.load-more")
+    cursor = sentinel.attrs["hx-vals"].split('cursor: "')[1].split('"')[0]
+
+    response = call_view(
+        AsyncPageView,
+        "AsyncPagedPersonAC",
+        field_name="myfield",
+        cursor=cursor,
+        myfield=[str(p1.id)],
+    )
+    assert response.status_code == 200
+    assert labels(response) == ["abcd4"]
+
+
+def test_async_toggle_view():
+    person = PersonFactory(name="abcd1")
+
+    response = call_view(
+        AsyncToggleView,
+        "PersonAC",
+        field_name="myfield",
+        item=str(person.id),
+    )
+    assert response.status_code == 200
+    assert "abcd1" in labels(response)
+
+    response = call_view(AsyncToggleView, "PersonAC", field_name="myfield")
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "ac_name", ["SyncSearchPersonAC", "AsyncIndexedPersonAC"]
+)
+def test_async_views_fall_back_to_sync_methods(ac_name):
+    PersonFactory(name="abcd1")
+    PersonFactory(name="xabcd")
+
+    response = call_view(
+        AsyncItemsView, ac_name, field_name="myfield", search="abcd"
+    )
+    assert response.status_code == 200
+    assert "abcd1" in labels(response)
+
+
+def test_overrides_sync():
+    assert not overrides_sync(PersonAC, "search_items", "asearch_items")
+    assert overrides_sync(SyncSearchPersonAC, "search_items", "asearch_items")
+    assert overrides_sync(
+        AsyncIndexedPersonAC, "get_items_from_keys", "aget_items_from_keys"
+    )
+
+    class BothPersonAC(SyncSearchPersonAC):
+        @classmethod
+        def search_items(cls, search, context):
+            return []
+
+        @classmethod
+        async def asearch_items(cls, search, context):
+            return []
+
+    assert not overrides_sync(BothPersonAC, "search_items", "asearch_items")
+
+
+def test_model_ac_async_methods():
+    p1 = PersonFactory(name="John1")
+    PersonFactory(name="John2")
+    PersonFactory(name="Jane")
+
+    class CountedPersonAC(ModelAutocomplete):
+        model = Person
+        search_attrs = ["name"]
+        route_name = "CountedPersonAC"
+
+    context = ContextArg(None, None)
+
+    async def run():
+        results = await CountedPersonAC.asearch_items("john", context)
+        items = await results.aslice(0, 1)
+        total = await CountedPersonAC.aget_total_results(results, context)
+        from_keys = await CountedPersonAC.aget_items_from_keys(
+            [p1.id], context
+        )
+        return items, total, from_keys
+
+    items, total, from_keys = async_to_sync(run)()
+    assert items == [{"key": p1.id, "label": "John1"}]
+    assert total == (2, "exact")
+    assert from_keys == [{"key": p1.id, "label": "John1"}]
@@ -0,0 +1,178 @@
+from django.core.cache import cache
+from django.http import QueryDict
+from django.urls import reverse
+
+import pytest
+
+from autocomplete import cache as search_cache
+from autocomplete import register
+from autocomplete.core import ContextArg
+
+from sample_app.models import Person, PersonFactory
+from tests.conftest import PersonAC
+
+from .utils_for_test import get_soup
+
+
+@register
+class CachedPersonAC(PersonAC):
+    cache_timeout = 60
+    cache_client_kwargs = ["team"]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+def items_url(search, **extra):
+    base_url = reverse(
+        "autocomplete:items", kwargs={"ac_name": "CachedPersonAC"}
+    )
+    qs_dict = QueryDict(mutable=True)
+    qs_dict.update({"field_name": "myfield", "search": search, **extra})
+    return f"{base_url}?{qs_dict.urlencode()}"
+
+
+def option_labels(response):
+    soup = get_soup(response)
+    return [a.get_text().strip() for a in soup.select("a[role='option']")]
+
+
+def test_repeated_search_is_a_cache_hit(client, django_assert_num_queries):
+    PersonFactory(name="John1")
+    PersonFactory(name="John2")
+
+    response = client.get(items_url("joh"))
+    assert option_labels(response) == ["John1", "John2"]
+
+    # same search, normalised, doesn't touch the database
+    with django_assert_num_queries(0):
+        response = client.get(items_url("JOH"))
+
+    assert option_labels(response) == ["John1", "John2"]
+
+
+def test_relevant_client_kwargs_are_part_of_the_key(
+    client, django_assert_num_queries
+):
+    PersonFactory(name="John1")
+
+    client.get(items_url("joh", team="1"))
+
+    with django_assert_num_queries(0):
+        client.get(items_url("joh", team="1", unrelated="x"))
+
+    with django_assert_num_queries(1):
+        client.get(items_url("joh", team="2"))
+
+
+def test_model_changes_invalidate_cache(client):
+    p1 = PersonFactory(name="John1")
+
+    response = client.get(items_url("joh"))
+    assert option_labels(response) == ["John1"]
+
+    p2 = PersonFactory(name="John2")
+    response = client.get(items_url("joh"))
+    assert option_labels(response) == ["John1", "John2"]
+
+    p1.name = "Jane"
+    p1.save()
+    response = client.get(items_url("joh"))
+    assert option_labels(response) == ["John2"]
+
+    p2.delete()
+    response = client.get(items_url("joh"))
+    assert option_labels(response) == []
+
+
+def test_cache_is_opt_in(django_assert_num_queries):
+    PersonFactory(name="John1")
+    context = ContextArg(None, None)
+
+    PersonAC.get_search_page("joh", context, 10)
+    with django_assert_num_queries(1):
+        PersonAC.get_search_page("joh", context, 10)
+
+
+@register
+class RefinedPersonAC(PersonAC):
+    cache_timeout = 60
+    refine_searches = True
+    max_results = 3
+
+
+def refined_search(search, selected_keys=None):
+    context = ContextArg(None, {}, selected_keys=selected_keys or [])
+    return RefinedPersonAC.get_search_page(search, context, 3)
+
+
+def test_refine_from_complete_results(django_assert_num_queries):
+    PersonFactory(name="Smith")
+    PersonFactory(name="Smitty")
+    PersonFactory(name="Osmium")
+
+    # search, then the texts of the complete results
+    with django_assert_num_queries(2):
+        page = refined_search("smi")
+    assert [i["label"] for i in page.items] == ["Smith", "Smitty", "Osmium"]
+
+    with django_assert_num_queries(0):
+        page = refined_search("smit")
+        assert [i["label"] for i in page.items] == ["Smith", "Smitty"]
+        assert not page.has_more
+
+        page = refined_search("SMITH")
+        assert [i["label"] for i in page.items] == ["Smith"]
+
+        assert refined_search("smitz").items == []
+
+
+def test_refine_reads_the_generation_once(monkeypatch):
+    PersonFactory(name="Smith")
+    refined_search("smi")
+
+    calls = []
+    get_generation = search_cache.get_generation
+
+    def counting_get_generation(ac_class):
+        calls.append(ac_class)
+        return get_generation(ac_class)
+
+    monkeypatch.setattr(
+        search_cache, "get_generation", counting_get_generation
+    )
+
+    page = refined_search("smith jr")
+    assert page.items == []
+    assert len(calls) == 1
+
+
+def test_refine_empty_results(django_assert_num_queries):
+    PersonFactory(name="Smith")
+
+    with django_assert_num_queries(1):
+        assert refined_search("xyz").items == []
+
+    with django_assert_num_queries(0):
+        assert refined_search("xyzw").items == []
+
+
+def test_truncated_results_are_not_refined(django_assert_num_queries):
+    PersonFactory.create_batch(4, name="Smith")
+
+    page = refined_search("smi")
+    assert page.has_more
+
+    with django_assert_num_queries(2):
+        page = refined_search("smit")
+    assert len(page.items) == 3
+
+
+def test_refine_searches_requires_cache():
+    class UncachedRefinedAC(PersonAC):
+        refine_searches = True
+
+    with pytest.raises(ValueError):
+        register(UncachedRefinedAC)
@@ -0,0 +1,262 @@
+import asyncio
+import threading
+
+from django.db import connection
+from django.http import QueryDict
+from django.test import RequestFactory
+from django.urls import reverse
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+
+from autocomplete import cancellation
+from autocomplete.core import Autocomplete, register
+from autocomplete.shortcuts import IndexedAutocomplete
+from autocomplete.views import AsyncItemsView
+
+from sample_app.models import Person, PersonFactory
+from tests.conftest import PersonAC
+
+from .utils_for_test import get_soup
+
+
+@register
+class CancellingPersonAC(PersonAC):
+    cancel_superseded_searches = True
+
+
+@register
+class SlowSearchPersonAC(PersonAC):
+    cancel_superseded_searches = True
+
+    @classmethod
+    async def asearch_items(cls, search, context):
+        await asyncio.sleep(10)
+        return []
+
+
+def get_items(client, seq, client_id="tab1"):
+    base_url = reverse(
+        "autocomplete:items", kwargs={"ac_name": "CancellingPersonAC"}
+    )
+    qs_dict = QueryDict(mutable=True)
+    qs_dict.update(
+        {
+            "field_name": "myfield",
+            "search": "abcd",
+            "search_seq": str(seq),
+            "search_client": client_id,
+        }
+    )
+    return client.get(f"{base_url}?{qs_dict.urlencode()}")
+
+
+def test_stale_search_is_not_run(client, django_assert_num_queries):
+    PersonFactory(name="abcd")
+
+    response = get_items(client, 2)
+    assert response.status_code == 200
+    assert get_soup(response).select("a[role='option']")
+
+    with django_assert_num_queries(0):
+        response = get_items(client, 1)
+    assert response.status_code == 204
+
+    # other clients (tabs) have their own sequence
+    assert get_items(client, 1, client_id="tab2").status_code == 200
+    assert get_items(client, 3).status_code == 200
+
+
+def test_searches_without_sequence_run(client):
+    PersonFactory(name="abcd")
+    get_items(client, 5, client_id="tab3")
+
+    base_url = reverse(
+        "autocomplete:items", kwargs={"ac_name": "CancellingPersonAC"}
+    )
+    response = client.get(f"{base_url}?field_name=myfield&search=abcd")
+    assert response.status_code == 200
+
+
+def test_json_searches_without_field_name(client):
+    PersonFactory(name="abcd")
+    base_url = reverse(
+        "autocomplete:items_json", kwargs={"ac_name": "CancellingPersonAC"}
+    )
+
+    response = client.get(f"{base_url}?search=abcd&search_seq=2")
+    assert response.status_code == 200
+    assert [i["label"] for i in response.json()["items"]] == ["abcd"]
+
+    response = client.get(f"{base_url}?search=abcd&search_seq=1")
+    assert response.status_code == 204
+
+
+def test_start_search_supersedes_previous():
+    key = "autocomplete:seq:CancellingPersonAC:supersede"
+    cancelled = []
+
+    first = cancellation.start_search(CancellingPersonAC, key, 1)
+    cancellation.set_cancel(first, lambda: cancelled.append(1))
+
+    second = cancellation.start_search(CancellingPersonAC, key, 2)
+    assert cancelled == [1]
+    assert first.superseded
+    assert cancellation.is_superseded(CancellingPersonAC, first)
+    assert not cancellation.is_superseded(CancellingPersonAC, second)
+
+    with pytest.raises(cancellation.SearchSuperseded):
+        cancellation.set_cancel(first, lambda: None)
+
+    cancellation.finish_search(first)
+    cancellation.finish_search(second)
+    assert key not in cancellation._in_flight
+
+
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="requires SQLite")
+def test_superseded_query_is_interrupted():
+    key = "autocomplete:seq:CancellingPersonAC:interrupt"
+    search = cancellation.start_search(CancellingPersonAC, key, 1)
+
+    timer = threading.Timer(
+        0.2,
+        lambda: cancellation.start_search(CancellingPersonAC, key, 2),
+    )
+    timer.start()
+    try:
+        with pytest.raises(cancellation.SearchSuperseded):
+            with cancellation.cancellable_queries(search, "default"):
+                with connection.cursor() as cursor:
+                    # runs for far longer than the test
+                    cursor.execute(
+                        "WITH RECURSIVE n(i) AS "
+                        "(SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+                        "SELECT count(*) FROM n"
+                    )
+    finally:
+        timer.cancel()
+        cancellation.finish_search(search)
+
+
+def test_superseded_async_search_is_cancelled():
+    def make_request(seq):
+        qs_dict = QueryDict(mutable=True)
+        qs_dict.update(
+            {"field_name": "myfield", "search": "abcd", "search_seq": seq}
+        )
+        return RequestFactory().get(f"/?{qs_dict.urlencode()}")
+
+    view = AsyncItemsView.as_view()
+
+    async def run():
+        first = asyncio.ensure_future(
+            view(make_request("1"), ac_name="SlowSearchPersonAC")
+        )
+        await asyncio.sleep(0.2)
+
+        key = cancellation.get_search_key(
+            SlowSearchPersonAC, make_request("2"), "myfield"
+        )
+        search = await asyncio.to_thread(
+            cancellation.start_search, SlowSearchPersonAC, key, 2
+        )
+        cancellation.finish_search(search)
+        return await asyncio.wait_for(first, 2)
+
+    response = async_to_sync(run)()
+
+    assert response.status_code == 204
+
+
+@register
+class SlowQueryCancellingAC(PersonAC):
+    cancel_superseded_searches = True
+
+    @classmethod
+    def search_items(cls, search, context):
+        with connection.cursor() as cursor:
+            # runs for far longer than the test
+            cursor.execute(
+                "WITH RECURSIVE n(i) AS "
+                "(SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+                "SELECT count(*) FROM n"
+            )
+        return []
+
+
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="requires SQLite")
+def test_superseded_async_query_is_interrupted():
+    interrupted = []
+    original = cancellation.get_connection_cancel
+
+    def get_connection_cancel(conn):
+        cancel = original(conn)
+
+        def spy():
+            interrupted.append(1)
+            cancel()
+
+        return spy
+
+    def make_request(seq):
+        qs_dict = QueryDict(mutable=True)
+        qs_dict.update(
+            {"field_name": "myfield", "search": "abcd", "search_seq": seq}
+        )
+        return RequestFactory().get(f"/?{qs_dict.urlencode()}")
+
+    view = AsyncItemsView.as_view()
+
+    async def run():
+        first = asyncio.ensure_future(
+            view(make_request("1"), ac_name="SlowQueryCancellingAC")
+        )
+        await asyncio.sleep(0.3)
+
+        key = cancellation.get_search_key(
+            SlowQueryCancellingAC, make_request("2"), "myfield"
+        )
+        search = await asyncio.to_thread(
+            cancellation.start_search, SlowQueryCancellingAC, key, 2
+        )
+        cancellation.finish_search(search)
+        response = await asyncio.wait_for(first, 2)
+        # the thread-sensitive thread is free again
+        await sync_to_async(list)(Person.objects.all())
+        return response
+
+    cancellation.get_connection_cancel = get_connection_cancel
+    try:
+        response = async_to_sync(run)()
+    finally:
+        cancellation.get_connection_cancel = original
+
+    assert response.status_code == 204
+    assert interrupted == [1]
+
+
+def test_searches_without_queries_leave_the_connection_alone():
+    class CancellingIndexedAC(IndexedAutocomplete):
+        model = Person
+        search_attrs = ["name"]
+
+    class CancellingPythonAC(Autocomplete):
+        @classmethod
+        def search_items(cls, search, context):
+            return []
+
+        @classmethod
+        def get_items_from_keys(cls, keys, context):
+            return []
+
+    assert cancellation.searches_database(PersonAC)
+    assert not cancellation.searches_database(CancellingIndexedAC)
+    assert not cancellation.searches_database(CancellingPythonAC)
+
+    key = "autocomplete:seq:CancellingPersonAC:no-queries"
+    search = cancellation.start_search(CancellingPersonAC, key, 1)
+    try:
+        with cancellation.cancellable_queries(search, None):
+            assert search.cancel is None
+    finally:
+        cancellation.finish_search(search)
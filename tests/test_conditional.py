@@ -0,0 +1,108 @@
+from django.test import RequestFactory
+from django.urls import reverse
+
+from asgiref.sync import async_to_sync
+
+from autocomplete.core import register
+from autocomplete.views import AsyncItemsView
+
+from sample_app.models import Person, PersonFactory
+from tests.conftest import PersonAC
+
+from .utils_for_test import get_soup
+
+
+@register
+class EtagPersonAC(PersonAC):
+    etag_responses = True
+    cache_control = {"private": True, "max_age": 30}
+    calls = 0
+
+    @classmethod
+    def search_items(cls, search, context):
+        cls.calls += 1
+        return super().search_items(search, context)
+
+
+def get_items(client, search="abcd", **headers):
+    base_url = reverse(
+        "autocomplete:items", kwargs={"ac_name": "EtagPersonAC"}
+    )
+    return client.get(
+        f"{base_url}?field_name=myfield&search={search}&search_seq=1",
+        headers=headers,
+    )
+
+
+def test_etag_and_not_modified(client, django_assert_num_queries):
+    PersonFactory(name="abcd1")
+    EtagPersonAC.calls = 0
+
+    response = get_items(client)
+    assert response.status_code == 200
+    etag = response["ETag"]
+    assert response["Cache-Control"] == "private, max-age=30"
+    assert EtagPersonAC.calls == 1
+
+    with django_assert_num_queries(0):
+        response = get_items(client, if_none_match=etag)
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+    assert response["Cache-Control"] == "private, max-age=30"
+    assert EtagPersonAC.calls == 1
+
+    # other searches have other tags
+    response = get_items(client, search="abcd1", if_none_match=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+
+def test_etag_changes_with_data(client):
+    person = PersonFactory(name="abcd1")
+    etag = get_items(client)["ETag"]
+
+    # the volatile sequence number doesn't change the tag
+    base_url = reverse(
+        "autocomplete:items", kwargs={"ac_name": "EtagPersonAC"}
+    )
+    response = client.get(
+        f"{base_url}?field_name=myfield&search=abcd&search_seq=2",
+        headers={"if-none-match": etag},
+    )
+    assert response.status_code == 304
+
+    person.name = "abcd2"
+    person.save()
+
+    response = get_items(client, if_none_match=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+    assert "abcd2" in get_soup(response).select_one("a").get_text()
+
+    etag = response["ETag"]
+    Person.objects.all().delete()
+    assert get_items(client, if_none_match=etag).status_code == 200
+
+
+def test_etags_are_opt_in(client):
+    base_url = reverse("autocomplete:items", kwargs={"ac_name": "PersonAC"})
+    response = client.get(f"{base_url}?field_name=myfield&search=abcd")
+    assert "ETag" not in response
+    assert "Cache-Control" not in response
+
+
+def test_async_not_modified():
+    PersonFactory(name="abcd1")
+    view = AsyncItemsView.as_view()
+
+    def call(**headers):
+        request = RequestFactory().get(
+            "/?field_name=myfield&search=abcd", headers=headers
+        )
+        return async_to_sync(view)(request, ac_name="EtagPersonAC")
+
+    response = call()
+    assert response.status_code == 200
+
+    response = call(if_none_match=response["ETag"])
+    assert response.status_code == 304
@@ -0,0 +1,150 @@
+from django.http import QueryDict
+from django.urls import reverse
+
+from autocomplete import IndexedAutocomplete, register, search_index
+from autocomplete.core import ContextArg
+from autocomplete.search_index import SearchIndex, normalize_text
+
+from sample_app.models import Person, PersonFactory
+
+from .utils_for_test import get_soup
+
+
+@register
+class IndexedPersonAC(IndexedAutocomplete):
+    model = Person
+    search_attrs = ["name"]
+    max_results = 2
+
+
+def labels(results):
+    return [i["label"] for i in results]
+
+
+def test_normalize_text():
+    assert normalize_text("Émile Zola") == "emile zola"
+    assert normalize_text("STRASSE") == normalize_text("straße")
+
+
+def test_search_index_prefix_then_substring():
+    index = SearchIndex()
+    index.bulk_load(
+        [
+            (1, "Jonathan Smith", ["Jonathan Smith"]),
+            (2, "Smithers", ["Smithers"]),
+            (3, "Agent Smith", ["Agent Smith"]),
+            (4, "Jones", ["Jones"]),
+        ]
+    )
+
+    rows = index.search("smith")
+    assert [index.keys[r] for r in rows] == [2, 1, 3]
+
+    # too short for trigrams, only prefixes match
+    assert [index.keys[r] for r in index.search("jo")] == [1, 4]
+
+    index.remove(2)
+    index.add(4, "Smithy Jones", ["Smithy Jones"])
+    assert [index.keys[r] for r in index.search("smith")] == [4, 1, 3]
+    assert [index.keys[r] for r in index.search("smith", [1])] == [4, 3]
+
+
+def test_search_index_reuses_replaced_rows():
+    index = SearchIndex()
+    index.bulk_load([(1, "Jonathan", ["Jonathan"]), (2, "Jonas", ["Jonas"])])
+
+    for i in range(50):
+        index.add(1, f"Jonathan {i}", [f"Jonathan {i}"])
+    index.remove(2)
+    index.add(3, "Smith", ["Smith"])
+
+    assert len(index.keys) == 2
+    assert index.posting_count < 2 * len(index.postings)
+    assert [index.keys[r] for r in index.search("jon")] == [1]
+    assert [index.keys[r] for r in index.search("than 49")] == [1]
+    assert list(index.search("than 48")) == []
+    assert [index.keys[r] for r in index.search("mit")] == [3]
+
+
+def test_search_index_prefix_walk_survives_changes(monkeypatch):
+    monkeypatch.setattr(search_index, "PREFIX_BATCH_SIZE", 2)
+    index = SearchIndex()
+    index.bulk_load([(i, f"b{i}", [f"b{i}"]) for i in range(6)])
+
+    rows = index.search_prefix("b")
+    found = [index.keys[next(rows)], index.keys[next(rows)]]
+
+    # shift the rest of the sorted texts both ways while walking
+    index.add("a", "ba", ["ba"])
+    index.add("a2", "b00", ["b00"])
+    index.remove(0)
+    index.remove(3)
+    found += [index.keys[r] for r in rows]
+
+    # items sorted after the last row found are found
+    assert found == [0, 1, 2, 4, 5, "a"]
+
+
+def test_indexed_search_has_no_queries(django_assert_num_queries):
+    p1 = PersonFactory(name="Émile")
+    p2 = PersonFactory(name="Emilia")
+    PersonFactory(name="Zola")
+    IndexedPersonAC.build_index()
+
+    with django_assert_num_queries(0):
+        results = IndexedPersonAC.search_items("EMIL", ContextArg(None, None))
+        assert labels(results) == ["Émile", "Emilia"]
+        assert len(results) == 2
+
+        results = IndexedPersonAC.search_items(
+            "emil", ContextArg(None, None, selected_keys=[str(p1.id)])
+        )
+        assert labels(results) == ["Emilia"]
+
+        assert IndexedPersonAC.get_items_from_keys([str(p2.id)], None) == [
+            {"key": p2.id, "label": "Emilia"}
+        ]
+
+
+def test_index_follows_model_changes():
+    p1 = PersonFactory(name="Jonathan")
+    IndexedPersonAC.build_index()
+
+    p2 = PersonFactory(name="Jonas")
+    results = IndexedPersonAC.search_items("jon", ContextArg(None, None))
+    assert labels(results) == ["Jonas", "Jonathan"]
+
+    p1.name = "Nathan"
+    p1.save()
+    results = IndexedPersonAC.search_items("jon", ContextArg(None, None))
+    assert labels(results) == ["Jonas"]
+
+    p2.delete()
+    results = IndexedPersonAC.search_items("jon", ContextArg(None, None))
+    assert labels(results) == []
+
+
+def test_indexed_items_view(client):
+    PersonFactory.create_batch(3, name="abcd")
+    IndexedPersonAC.build_index()
+
+    base_url = reverse(
+        "autocomplete:items", kwargs={"ac_name": "IndexedPersonAC"}
+    )
+    qs_dict = QueryDict(mutable=True)
+    qs_dict.update({"field_name": "myfield", "search": "abc"})
+    response = client.get(f"{base_url}?{qs_dict.urlencode()}")
+
+    soup = get_soup(response)
+    assert len(soup.select("a[role='option']")) == 2
+    more_results = soup.select_one("div.more-results")
+    assert "Showing 2 of 3 items" in more_results.get_text()
+
+
+def test_indexed_count_is_capped(monkeypatch):
+    PersonFactory.create_batch(5, name="abcd")
+    IndexedPersonAC.build_index()
+    monkeypatch.setattr(IndexedPersonAC, "count_cap", 3)
+
+    results = IndexedPersonAC.search_items("abc", ContextArg(None, None))
+    assert IndexedPersonAC.get_total_results(results, None) == (3, "capped")
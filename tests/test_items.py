@@ -1,8 +1,12 @@
 import json
+import threading
 
+from django.db import connections
 from django.http import HttpRequest, QueryDict
 from django.urls import reverse
 
+import pytest
+
 from autocomplete.core import Autocomplete, register
 from autocomplete.views import replace_or_toggle, toggle_set
 
@@ -44,28 +48,23 @@ def test_items_response_non_multi(client):
     assert "abcdefg" in options[0].get_text()
     assert "abcdxyz" in options[1].get_text()
 
-    assert json.loads(options[0].attrs["hx-vals"]) == {
-        "field_name": "myfield_name",
-        "component_prefix": "component_name",
-        "item": str(searchable_person.id),
-    }
-    assert json.loads(options[1].attrs["hx-vals"]) == {
+    # the toggle requests' parameters are on the listbox, the items have keys
+    assert options[0].attrs["data-key"] == str(searchable_person.id)
+    assert options[1].attrs["data-key"] == str(searchable_person2.id)
+    assert "hx-vals" not in options[0].attrs
+    assert json.loads(listbox.attrs["hx-vals"]) == {
         "field_name": "myfield_name",
         "component_prefix": "component_name",
-        "item": str(searchable_person2.id),
     }
 
     highlight_span = listbox.select_one("span.highlight")
     assert highlight_span.get_text() == "abcd"
 
-    assert options[0].attrs["hx-get"] == reverse(
-        "autocomplete:toggle", kwargs={"ac_name": "PersonAC"}
-    )
     assert (
-        options[0].attrs["hx-params"]
+        listbox.attrs["hx-params"]
         == "myfield_name,field_name,item,component_prefix"
     )
-    assert options[0].attrs["hx-include"] == "#component_namemyfield_name"
+    assert listbox.attrs["hx-include"] == "#component_namemyfield_name"
     assert "component_namemyfield_name__item__" in options[0].attrs["id"]
     assert not options[1].attrs["id"] == options[0].attrs["id"]
 
@@ -120,30 +119,24 @@ def test_items_response_multi(client):
     assert "abcdefg" in options[0].get_text()
     assert "abcdxyz" in options[1].get_text()
 
-    assert json.loads(options[0].attrs["hx-vals"]) == {
+    # the toggle requests' parameters are on the listbox, the items have keys
+    assert options[0].attrs["data-key"] == str(searchable_person.id)
+    assert options[1].attrs["data-key"] == str(searchable_person2.id)
+    assert "hx-vals" not in options[0].attrs
+    assert json.loads(listbox.attrs["hx-vals"]) == {
         "field_name": "myfield_name",
         "component_prefix": "component_name",
-        "item": str(searchable_person.id),
-        "multiselect": True,
-    }
-    assert json.loads(options[1].attrs["hx-vals"]) == {
-        "field_name": "myfield_name",
-        "component_prefix": "component_name",
-        "item": str(searchable_person2.id),
         "multiselect": True,
     }
 
     highlight_span = listbox.select_one("span.highlight")
     assert highlight_span.get_text() == "abcd"
 
-    assert options[0].attrs["hx-get"] == reverse(
-        "autocomplete:toggle", kwargs={"ac_name": "PersonAC2"}
-    )
     assert (
-        options[0].attrs["hx-params"]
+        listbox.attrs["hx-params"]
         == "myfield_name,field_name,item,component_prefix,multiselect"
     )
-    assert options[0].attrs["hx-include"] == "#component_namemyfield_name"
+    assert listbox.attrs["hx-include"] == "#component_namemyfield_name"
     assert "component_namemyfield_name__item__" in options[0].attrs["id"]
     assert not options[1].attrs["id"] == options[0].attrs["id"]
 
@@ -190,7 +183,7 @@ def test_custom_options(client):
 
     soup = get_soup(response)
 
-    result = soup.select_one("div[role='listbox'] a[role='option']")
+    result = soup.select_one("div[role='listbox']")
     hx_params = result.attrs["hx-params"].split(",")
     assert "required" in hx_params
     assert "disabled" in hx_params
@@ -313,3 +306,226 @@ def test_replace_or_toggle():
     assert replace_or_toggle({1}, "1") == set()
     assert replace_or_toggle({"1"}, 1) == set()
     assert replace_or_toggle({1}, 2) == {2}
+
+
+def test_search_results_are_consumed_lazily(client):
+    consumed = []
+
+    @register
+    class GeneratorAC(Autocomplete):
+        max_results = 3
+
+        @classmethod
+        def search_items(cls, search, context):
+            for i in range(1000):
+                consumed.append(i)
+                yield {"key": i, "label": f"{search} {i}"}
+
+        @classmethod
+        def get_items_from_keys(cls, keys, context):
+            return [{"key": k, "label": f"item {k}"} for k in keys]
+
+    base_url = reverse("autocomplete:items", kwargs={"ac_name": "GeneratorAC"})
+    qs_dict = QueryDict(mutable=True)
+    qs_dict.update({"field_name": "myfield", "search": "abcd"})
+    response = client.get(f"{base_url}?{qs_dict.urlencode()}")
+    assert response.status_code == 200
+
+    # only one more than max_results is pulled from the generator
+    assert len(consumed) == 4
+
+    soup = get_soup(response)
+    listbox = soup.select_one("div[role='listbox']")
+    assert len(listbox.select("a")) == 3
+
+    # generators have no len(), so the total is unknown
+    more_results = listbox.select_one("div.more-results")
+    assert "Showing the first 3 items" in more_results.get_text()
+
+
+def test_limit_results_fetches_bounded_page(
+    client, django_assert_max_num_queries
+):
+    PersonFactory.create_batch(10, name="abcd")
+    selected = PersonFactory(name="abcd selected")
+
+    @register
+    class BoundedPersonAC(PersonAC):
+        max_results = 2
+
+    base_url = reverse(
+        "autocomplete:items", kwargs={"ac_name": "BoundedPersonAC"}
+    )
+    qs_dict = QueryDict(mutable=True)
+    qs_dict.update({"field_name": "myfield", "search": "abcd"})
+    qs_dict.setlist("myfield", [selected.id])
+
+    # selected items, the limited page and the count
+    with django_assert_max_num_queries(3) as captured:
+        response = client.get(f"{base_url}?{qs_dict.urlencode()}")
+
+    assert any("LIMIT" in q["sql"] for q in captured.captured_queries)
+
+    soup = get_soup(response)
+    listbox = soup.select_one("div[role='listbox']")
+    assert len(listbox.select("a")) == 3
+
+    more_results = listbox.select_one("div.more-results")
+    assert "Showing 3 of 11 items" in more_results.get_text()
+
+
+def test_capped_count_message(client):
+    PersonFactory.create_batch(5, name="abcd")
+
+    @register
+    class CappedPersonAC(PersonAC):
+        max_results = 2
+        count_strategy = "capped"
+        count_cap = 3
+
+    base_url = reverse(
+        "autocomplete:items", kwargs={"ac_name": "CappedPersonAC"}
+    )
+    qs_dict = QueryDict(mutable=True)
+    qs_dict.update({"field_name": "myfield", "search": "abcd"})
+    response = client.get(f"{base_url}?{qs_dict.urlencode()}")
+
+    soup = get_soup(response)
+    more_results = soup.select_one("div.more-results")
+    assert "Showing 2 of 3+ items" in more_results.get_text()
+
+
+def test_load_more_results(client, django_assert_max_num_queries):
+    people = [PersonFactory(name=f"abcd{i}") for i in range(5)]
+    PersonFactory(name="zzz")
+
+    @register
+    class PagedPersonAC(PersonAC):
+        max_results = 2
+        load_more_results = True
+
+    def get_page(url_name, **params):
+        base_url = reverse(
+            f"autocomplete:{url_name}", kwargs={"ac_name": "PagedPersonAC"}
+        )
+        qs_dict = QueryDict(mutable=True)
+        qs_dict.update({"field_name": "myfield", **params})
+        return client.get(f"{base_url}?{qs_dict.urlencode()}")
+
+    def get_cursor(soup):
+        sentinel = soup.select_one("div.load-more")
+        if sentinel is None:
+            return None
+        assert sentinel.attrs["hx-trigger"] == "intersect once"
+        hx_vals = sentinel.attrs["hx-vals"]
+        return hx_vals.split('cursor: "')[1].split('"')[0]
+
+    response = get_page("items", search="abcd", myfield=str(people[1].id))
+    soup = get_soup(response)
+    listbox = soup.select_one("div[role='listbox']")
+    labels = [a.get_text().strip() for a in listbox.select("a")]
+    # the selected item comes first, and isn't repeated in later pages
+    assert labels == ["abcd1", "abcd0", "abcd2"]
+    cursor = get_cursor(listbox)
+    assert cursor
+
+    seen = []
+    while cursor:
+        # no OFFSET, no count on later pages
+        with django_assert_max_num_queries(1) as captured:
+            response = get_page(
+                "page", cursor=cursor, myfield=str(people[1].id)
+            )
+        assert response.status_code == 200
+        assert "OFFSET" not in captured.captured_queries[0]["sql"]
+
+        soup = get_soup(response)
+        seen.extend(a.get_text().strip() for a in soup.select("a"))
+        cursor = get_cursor(soup)
+
+    assert seen == ["abcd3", "abcd4"]
+
+    response = get_page("page", cursor="tampered")
+    assert response.status_code == 400
+
+
+def test_load_more_results_is_opt_in(client):
+    PersonFactory.create_batch(3, name="abcd")
+
+    @register
+    class UnpagedPersonAC(PersonAC):
+        max_results = 2
+
+    base_url = reverse(
+        "autocomplete:items", kwargs={"ac_name": "UnpagedPersonAC"}
+    )
+    response = client.get(f"{base_url}?field_name=myfield&search=abcd")
+    soup = get_soup(response)
+    assert soup.select_one("div.load-more") is None
+    assert soup.select_one("div.more-results") is not None
+
+
+@register
+class ConcurrentPersonAC(PersonAC):
+    concurrent_queries = True
+    threads = []
+
+    @classmethod
+    def get_items_from_keys(cls, keys, context):
+        cls.threads.append(threading.current_thread())
+        return super().get_items_from_keys(keys, context)
+
+
+def get_concurrent_items(client, selected):
+    base_url = reverse(
+        "autocomplete:items", kwargs={"ac_name": "ConcurrentPersonAC"}
+    )
+    qs_dict = QueryDict(mutable=True)
+    qs_dict.update({"field_name": "myfield", "search": "abcd"})
+    qs_dict.setlist("myfield", [str(selected.id)])
+
+    ConcurrentPersonAC.threads = []
+    response = client.get(f"{base_url}?{qs_dict.urlencode()}")
+    soup = get_soup(response)
+    return [a.get_text().strip() for a in soup.select("a[role='option']")]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_queries(client):
+    selected = PersonFactory(name="zzz")
+    PersonFactory(name="abcd")
+
+    assert get_concurrent_items(client, selected) == ["zzz", "abcd"]
+    # looked up in a pool thread, while the search ran
+    assert ConcurrentPersonAC.threads[0] is not threading.current_thread()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_pool_threads_keep_their_connections(client, monkeypatch):
+    selected = PersonFactory(name="zzz")
+
+    closed = []
+    close = type(connections["default"]).close
+
+    def recording_close(self):
+        closed.append(threading.current_thread())
+        close(self)
+
+    # in-memory SQLite connections are never really closed, record calls
+    monkeypatch.setattr(type(connections["default"]), "close", recording_close)
+
+    get_concurrent_items(client, selected)
+    get_concurrent_items(client, selected)
+
+    # CONN_MAX_AGE = 0 would have closed them after each lookup
+    pool_threads = set(ConcurrentPersonAC.threads)
+    assert pool_threads and not pool_threads & set(closed)
+
+
+def test_concurrent_queries_in_transaction(client):
+    selected = PersonFactory(name="zzz")
+    PersonFactory(name="abcd")
+
+    # pool threads wouldn't see the test's uncommitted rows
+    assert get_concurrent_items(client, selected) == ["zzz", "abcd"]
+    assert ConcurrentPersonAC.threads == [threading.current_thread()]
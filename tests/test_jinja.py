@@ -0,0 +1,232 @@
+from pathlib import Path
+
+from django.template import loader
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+
+import pytest
+
+from autocomplete import AutocompleteWidget, rendering
+from autocomplete.core import Autocomplete, register
+
+from sample_app.models import PersonFactory
+from tests.conftest import PersonAC
+
+from .utils_for_test import soup_from_str
+
+pytest.importorskip("jinja2")
+
+ITEMS = [
+    {"key": "plain", "label": "Abc plain"},
+    {"key": "quo\"te's", "label": "Abc <b>escaped</b> & co"},
+    {"key": "html", "label": mark_safe("Abc <b>bold</b>")},
+    {"key": 4200, "label": 4200},
+    {"key": "other", "label": "Something else"},
+]
+
+
+@register
+class JinjaAC(Autocomplete):
+    max_results = 2
+    minimum_search_length = 1
+
+    @classmethod
+    def search_items(cls, search, context):
+        return [
+            item
+            for item in ITEMS
+            if search.lower() in str(item["label"]).lower()
+        ]
+
+    @classmethod
+    def get_items_from_keys(cls, keys, context):
+        return [item for item in ITEMS if str(item["key"]) in keys]
+
+
+@register
+class JinjaPagedPersonAC(PersonAC):
+    max_results = 1
+    load_more_results = True
+
+
+@register
+class JinjaLocalAC(JinjaAC):
+    local_threshold = 10
+
+    @classmethod
+    def get_local_items(cls, context):
+        return ITEMS, [[str(item["label"])] for item in ITEMS]
+
+
+@pytest.fixture
+def jinja_settings(settings):
+    settings.TEMPLATES = [
+        *settings.TEMPLATES,
+        {
+            "BACKEND": "django.template.backends.jinja2.Jinja2",
+            "NAME": "jinja2",
+            "APP_DIRS": True,
+            "OPTIONS": {
+                "extensions": ["autocomplete.jinja.AutocompleteExtension"],
+            },
+        },
+    ]
+    return settings
+
+
+def normalize(html):
+    """
+    The markup, without the whitespace the template languages place
+    differently
+    """
+    soup = soup_from_str(html)
+
+    def walk(node):
+        if node.name is None:
+            text = " ".join(str(node).split())
+            return [text] if text else []
+
+        attrs = {
+            key: " ".join(value) if isinstance(value, list) else value
+            for key, value in node.attrs.items()
+        }
+        attrs = {key: " ".join(value.split()) for key, value in attrs.items()}
+        children = [part for child in node.children for part in walk(child)]
+        return [(node.name, sorted(attrs.items()), children)]
+
+    return [part for child in soup.children for part in walk(child)]
+
+
+def get_both(jinja_settings, render):
+    jinja_settings.AUTOCOMPLETE_TEMPLATE_BACKEND = "django"
+    django_output = render()
+
+    jinja_settings.AUTOCOMPLETE_TEMPLATE_BACKEND = "jinja2"
+    jinja_output = render()
+
+    assert normalize(jinja_output) == normalize(django_output)
+    return jinja_output
+
+
+def get_view(client, view, ac_name, **params):
+    url = reverse(f"autocomplete:{view}", kwargs={"ac_name": ac_name})
+    response = client.get(url, {"field_name": "myfield", **params})
+    assert response.status_code == 200
+    return response.content.decode()
+
+
+@pytest.mark.parametrize("fast_path", [True, False])
+@pytest.mark.parametrize(
+    "ac_name,params",
+    [
+        ("JinjaAC", {"search": "abc"}),
+        ("JinjaAC", {"search": "abc", "myfield": ["html", "quo\"te's"]}),
+        ("JinjaAC", {"search": ""}),
+        ("JinjaAC", {"search": "nothing"}),
+        ("JinjaLocalAC", {"search": "", "local": "1"}),
+        (
+            "JinjaAC",
+            {
+                "search": "e",
+                "myfield": ["plain", "4200"],
+                "multiselect": "true",
+                "required": "true",
+                "placeholder": "Pick <one>",
+                "component_prefix": "pre'fix",
+            },
+        ),
+    ],
+)
+def test_items_match(
+    client, jinja_settings, monkeypatch, ac_name, params, fast_path
+):
+    if not fast_path:
+        monkeypatch.setattr(
+            rendering, "uses_default_item_template", lambda: False
+        )
+
+    output = get_both(
+        jinja_settings, lambda: get_view(client, "items", ac_name, **params)
+    )
+    assert "<a" in output or "result" in output
+
+
+def test_page_matches(client, jinja_settings):
+    for name in ["abc1", "abc <2>", "abc3"]:
+        PersonFactory(name=name)
+
+    output = get_both(
+        jinja_settings,
+        lambda: get_view(client, "items", "JinjaPagedPersonAC", search="abc"),
+    )
+    sentinel = soup_from_str(output).select_one("div.load-more")
+    cursor = sentinel.attrs["hx-vals"].split('cursor: "')[1].split('"')[0]
+
+    output = get_both(
+        jinja_settings,
+        lambda: get_view(
+            client, "page", "JinjaPagedPersonAC", search="abc", cursor=cursor
+        ),
+    )
+    assert "load-more" in output
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"item": "plain"},
+        {"item": "plain", "myfield": ["plain"]},
+        {"item": "plain", "myfield": ["html"]},
+        {"item": "plain", "myfield": ["html"], "multiselect": "true"},
+        {
+            "item": "html",
+            "myfield": ["html", "plain"],
+            "multiselect": "true",
+            "remove": "true",
+        },
+    ],
+)
+def test_toggle_matches(client, jinja_settings, params):
+    get_both(
+        jinja_settings, lambda: get_view(client, "toggle", "JinjaAC", **params)
+    )
+
+
+@pytest.mark.parametrize(
+    "value,options,attrs",
+    [
+        (None, {}, {}),
+        ("plain", {"label": "Pick", "placeholder": "one"}, {"required": True}),
+        (["plain", "html"], {"multiselect": True, "indicator": True}, {}),
+        (["plain"], {"multiselect": True}, {"disabled": True}),
+    ],
+)
+def test_widget_matches(jinja_settings, value, options, attrs):
+    widget = AutocompleteWidget(ac_class=JinjaAC, options=options)
+
+    output = get_both(
+        jinja_settings, lambda: widget.render("myfield", value, attrs=attrs)
+    )
+    assert 'id="myfield__container"' in output
+
+
+def test_model_autocomplete_matches(client, jinja_settings):
+    person = PersonFactory(name="abc <1>")
+    PersonFactory(name="abc 2")
+
+    get_both(
+        jinja_settings,
+        lambda: get_view(
+            client, "items", "PersonAC", search="abc", myfield=[person.id]
+        ),
+    )
+
+
+def test_jinja_templates_are_used(jinja_settings):
+    jinja_settings.AUTOCOMPLETE_TEMPLATE_BACKEND = "jinja2"
+
+    template = loader.get_template(
+        "autocomplete/item_list.html", using=rendering.get_template_backend()
+    )
+    assert "jinja2" in Path(template.origin.name).parts
+    assert rendering.uses_default_item_template()
@@ -0,0 +1,122 @@
+from django.http import QueryDict
+from django.test import RequestFactory
+from django.test.signals import template_rendered
+from django.urls import reverse
+
+from asgiref.sync import async_to_sync
+
+from autocomplete.core import register
+from autocomplete.views import AsyncItemsJsonView
+
+from sample_app.models import PersonFactory
+from tests.conftest import PersonAC
+
+
+@register
+class JsonPagedPersonAC(PersonAC):
+    max_results = 2
+    load_more_results = True
+
+
+def get_json(client, route, ac_name, **params):
+    base_url = reverse(f"autocomplete:{route}", kwargs={"ac_name": ac_name})
+    qs_dict = QueryDict(mutable=True)
+    for key, value in params.items():
+        if isinstance(value, list):
+            qs_dict.setlist(key, value)
+        else:
+            qs_dict[key] = value
+
+    response = client.get(f"{base_url}?{qs_dict.urlencode()}")
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/json"
+    return response.json()
+
+
+def test_items_json(client):
+    p1 = PersonFactory(name="abcd1")
+    p2 = PersonFactory(name="abcd2")
+    PersonFactory(name="zzz")
+
+    data = get_json(client, "items_json", "PersonAC", search="abcd")
+    assert data == {
+        "search": "abcd",
+        "query_too_short": False,
+        "search_timed_out": False,
+        "items": [
+            {"key": str(p1.id), "label": "abcd1", "selected": False},
+            {"key": str(p2.id), "label": "abcd2", "selected": False},
+        ],
+        "has_more": False,
+        "next_cursor": None,
+        "total_results": 2,
+        "total_kind": "exact",
+    }
+
+    # selected items come first, as in the widget
+    data = get_json(
+        client,
+        "items_json",
+        "PersonAC",
+        search="abcd2",
+        field_name="myfield",
+        myfield=[str(p1.id)],
+    )
+    assert data["items"] == [
+        {"key": str(p1.id), "label": "abcd1", "selected": True},
+        {"key": str(p2.id), "label": "abcd2", "selected": False},
+    ]
+    assert data["total_results"] == 2
+
+
+def test_items_json_query_too_short(client):
+    data = get_json(client, "items_json", "PersonAC", search="ab")
+    assert data["query_too_short"]
+    assert data["items"] == []
+
+
+def test_items_json_renders_no_templates(client):
+    PersonFactory(name="abcd1")
+    rendered = []
+
+    def on_render(sender, template, **kwargs):
+        rendered.append(template.name)
+
+    template_rendered.connect(on_render)
+    try:
+        get_json(client, "items_json", "PersonAC", search="abcd")
+    finally:
+        template_rendered.disconnect(on_render)
+
+    assert rendered == []
+
+
+def test_page_json(client):
+    for i in range(5):
+        PersonFactory(name=f"abcd{i}")
+
+    data = get_json(client, "items_json", "JsonPagedPersonAC", search="abcd")
+    assert [i["label"] for i in data["items"]] == ["abcd0", "abcd1"]
+    assert data["next_cursor"]
+
+    labels = []
+    cursor = data["next_cursor"]
+    while cursor:
+        data = get_json(
+            client, "page_json", "JsonPagedPersonAC", cursor=cursor
+        )
+        labels += [i["label"] for i in data["items"]]
+        cursor = data["next_cursor"]
+
+    assert labels == ["abcd2", "abcd3", "abcd4"]
+
+
+def test_async_items_json():
+    PersonFactory(name="abcd1")
+
+    request = RequestFactory().get("/?search=abcd")
+    view = AsyncItemsJsonView.as_view()
+    response = async_to_sync(view)(request, ac_name="PersonAC")
+
+    assert response.status_code == 200
+    assert b'"label": "abcd1"' in response.content
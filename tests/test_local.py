@@ -0,0 +1,162 @@
+import json
+
+from django.urls import reverse
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from autocomplete import AutocompleteWidget, IndexedAutocomplete
+from autocomplete.core import ContextArg, register
+from autocomplete.views import AsyncItemsView
+
+from sample_app.models import Person, PersonFactory
+from tests.conftest import PersonAC
+from tests.test_async import call_view
+
+from .utils_for_test import get_soup, soup_from_str
+
+
+@register
+class LocalPersonAC(PersonAC):
+    local_threshold = 3
+
+
+@register
+class OwnItemsLocalAC(PersonAC):
+    search_attrs = [("name", "istartswith")]
+    local_threshold = 3
+
+    @classmethod
+    def get_local_items(cls, context):
+        return None
+
+
+def get_items(client, ac_name, **params):
+    base_url = reverse("autocomplete:items", kwargs={"ac_name": ac_name})
+    return client.get(
+        base_url, {"field_name": "myfield", "search": "", **params}
+    )
+
+
+def get_local(response):
+    template = get_soup(response).select_one("template#myfield__local")
+    if template is None:
+        return None
+    return template, json.loads(template.attrs["data-local"])
+
+
+def test_get_local_items():
+    p1 = PersonFactory(name="Anne")
+    p2 = PersonFactory(name="Bob")
+    context = ContextArg(None, None)
+
+    items, texts = LocalPersonAC.get_local_items(context)
+    assert items == [
+        {"key": p1.id, "label": "Anne"},
+        {"key": p2.id, "label": "Bob"},
+    ]
+    assert texts == [["Anne"], ["Bob"]]
+
+    PersonFactory.create_batch(2)
+    assert LocalPersonAC.get_local_items(context) is None
+
+    # not enabled
+    assert PersonAC.get_local_items(context) is None
+
+
+def test_local_items_are_sent_when_asked(client):
+    p1 = PersonFactory(name="Anne")
+    p2 = PersonFactory(name="Bob")
+
+    response = get_items(client, "LocalPersonAC", local="1", myfield=p2.id)
+    template, data = get_local(response)
+
+    options = template.select("a[role='option']")
+    # rendered with item.html (strings in templates aren't in get_text)
+    assert len(options) == 2
+    assert "Anne" in str(options[0]) and "Bob" in str(options[1])
+    assert options[1].attrs["aria-selected"] == "true"
+
+    assert data["keys"] == [str(p1.id), str(p2.id)]
+    # normalized for searching
+    assert data["texts"] == [["anne"], ["bob"]]
+    assert data["strings"] == {
+        "minimum_search_length": 3,
+        "type_at_least_n_characters": "Type at least 3 characters",
+        "no_results": "No results found.",
+        "available_results": {
+            "one": "%(count)s result available.",
+            "other": "%(count)s results available.",
+        },
+        "language": "en-us",
+    }
+
+    # the response is otherwise unchanged
+    assert "Type at least 3 characters" in (
+        get_soup(response).select_one("#myfield__info").get_text()
+    )
+
+    assert get_local(get_items(client, "LocalPersonAC")) is None
+    assert get_local(get_items(client, "PersonAC", local="1")) is None
+
+
+def test_local_items_over_threshold(client):
+    PersonFactory.create_batch(4)
+    assert get_local(get_items(client, "LocalPersonAC", local="1")) is None
+
+
+def test_async_local_items():
+    PersonFactory(name="Anne")
+
+    response = call_view(
+        AsyncItemsView,
+        "LocalPersonAC",
+        field_name="myfield",
+        search="",
+        local="1",
+    )
+    assert get_local(response) is not None
+
+
+def test_widget_marks_local_components():
+    widget = AutocompleteWidget(ac_class=LocalPersonAC)
+    soup = soup_from_str(widget.render("myfield", None, attrs={}))
+    assert soup.select_one("[data-autocomplete-local]")
+
+    widget = AutocompleteWidget(ac_class=PersonAC)
+    soup = soup_from_str(widget.render("myfield", None, attrs={}))
+    assert not soup.select_one("[data-autocomplete-local]")
+
+
+def test_local_searches_require_icontains_searches():
+    class LookupLocalAC(PersonAC):
+        search_attrs = [("name", "istartswith")]
+        local_threshold = 3
+
+    class ModeLocalAC(PersonAC):
+        search_mode = "fts5"
+        local_threshold = 3
+
+    class OverriddenLocalAC(PersonAC):
+        local_threshold = 3
+
+        @classmethod
+        def search_queryset(cls, queryset, search):
+            return queryset.filter(name__iexact=search)
+
+    class IndexedLocalAC(IndexedAutocomplete):
+        model = Person
+        search_attrs = ["name"]
+        local_threshold = 3
+
+    for ac_class in [LookupLocalAC, ModeLocalAC, OverriddenLocalAC]:
+        with pytest.raises(ValueError):
+            register(ac_class)
+
+    # prefix matches for short searches, and a different order
+    with pytest.raises(ValueError):
+        register(IndexedLocalAC)
+
+
+def test_local_searches_with_their_own_items():
+    assert OwnItemsLocalAC.matches_local_searches()
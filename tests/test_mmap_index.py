@@ -0,0 +1,133 @@
+import os
+import stat
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+import pytest
+
+from autocomplete import MmapIndexedAutocomplete, register
+from autocomplete.core import ContextArg
+from autocomplete.search_index import MmapSearchIndex, write_index_file
+
+from sample_app.models import Person, PersonFactory
+
+
+def labels(results):
+    return [i["label"] for i in results]
+
+
+def test_index_file_search(tmp_path):
+    path = tmp_path / "people.idx"
+    write_index_file(
+        path,
+        [
+            (1, "Jonathan Smith", ["Jonathan Smith"]),
+            (2, "Smithers", ["Smithers"]),
+            (3, "Agent Smith", ["Agent Smith", "007"]),
+            (4, "Jones", ["Jones"]),
+            (10, "Émile", ["Émile"]),
+        ],
+    )
+
+    index = MmapSearchIndex(path)
+    assert len(index) == 5
+
+    def keys(rows):
+        return [index.get_item(r)["key"] for r in rows]
+
+    assert keys(index.search("smith")) == ["2", "1", "3"]
+    assert keys(index.search("smith", exclude_keys=[1])) == ["2", "3"]
+    assert keys(index.search("jo")) == ["1", "4"]
+    assert keys(index.search("007")) == ["3"]
+    assert keys(index.search("EMILE")) == ["10"]
+    assert keys(index.search("xyz")) == []
+
+    rows = index.get_rows_for_keys(["10", 4, "99"])
+    assert [index.get_item(r) for r in rows] == [
+        {"key": "10", "label": "Émile"},
+        {"key": "4", "label": "Jones"},
+    ]
+
+
+def test_index_file_is_reloaded_when_replaced(tmp_path):
+    path = tmp_path / "people.idx"
+    write_index_file(path, [(1, "Jonathan", ["Jonathan"])])
+
+    class MmapPersonAC(MmapIndexedAutocomplete):
+        model = Person
+        search_attrs = ["name"]
+        index_path = path
+
+    context = ContextArg(None, None)
+    assert labels(MmapPersonAC.search_items("jon", context)) == ["Jonathan"]
+
+    write_index_file(path, [(2, "Jonas", ["Jonas"])])
+    # make sure the replacement is seen even on coarse mtime filesystems
+    os.utime(path, ns=(0, 0))
+
+    assert labels(MmapPersonAC.search_items("jon", context)) == ["Jonas"]
+    assert MmapPersonAC.get_items_from_keys(["2"], context) == [
+        {"key": "2", "label": "Jonas"}
+    ]
+
+
+def test_build_index_command(tmp_path, django_assert_num_queries):
+    PersonFactory(name="John1")
+    PersonFactory(name="John2")
+    PersonFactory(name="Jane")
+    path = tmp_path / "people.idx"
+
+    call_command("build_autocomplete_index", "PersonAC", output=str(path))
+
+    class MmapPersonAC(MmapIndexedAutocomplete):
+        model = Person
+        search_attrs = ["name"]
+        index_path = path
+
+    with django_assert_num_queries(0):
+        results = MmapPersonAC.search_items("joh", ContextArg(None, None))
+        assert labels(results) == ["John1", "John2"]
+
+
+def test_build_index_command_errors():
+    with pytest.raises(CommandError):
+        call_command("build_autocomplete_index", "NotRegistered")
+
+    with pytest.raises(CommandError):
+        call_command("build_autocomplete_index", "PersonAC")
+
+
+def test_index_path_is_required():
+    class NoPathAC(MmapIndexedAutocomplete):
+        model = Person
+        search_attrs = ["name"]
+
+    with pytest.raises(ValueError):
+        register(NoPathAC)
+
+
+def test_index_file_is_readable_by_others(tmp_path):
+    path = tmp_path / "people.idx"
+    umask = os.umask(0o022)
+    try:
+        write_index_file(path, [(1, "Jonathan", ["Jonathan"])])
+    finally:
+        os.umask(umask)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+
+    # replacements keep the file's mode
+    os.chmod(path, 0o640)
+    write_index_file(path, [(2, "Jonas", ["Jonas"])])
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+
+
+def test_missing_index_file(tmp_path):
+    class MissingFileAC(MmapIndexedAutocomplete):
+        model = Person
+        search_attrs = ["name"]
+        index_path = tmp_path / "missing.idx"
+
+    with pytest.raises(ImproperlyConfigured, match="build_autocomplete_index"):
+        MissingFileAC.search_items("jon", ContextArg(None, None))
@@ -1,4 +1,8 @@
 from django import forms
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db import models
+from django.db.models.functions import Lower, Upper
+from django.db.models.signals import pre_save
 from django.template import Context, Template, loader
 from django.urls import reverse
 
@@ -10,7 +14,9 @@ from autocomplete import (
     ModelAutocomplete,
     register,
 )
+from autocomplete.checks import check_ac_class
 from autocomplete.core import ContextArg
+from autocomplete.shortcuts import QuerysetMappedIterable
 
 from sample_app.models import Person, PersonFactory, Team, TeamFactory
 
@@ -73,3 +79,301 @@ def test_num_queries(django_assert_max_num_queries):
     with django_assert_max_num_queries(1):
         results = PersonModelAC.search_items("Joh", ContextArg(None, None))
         mapped_results = PersonModelAC.map_search_results(results, [])
+
+
+@pytest.mark.parametrize(
+    "count_strategy,expected",
+    [
+        ("exact", (4, "exact")),
+        ("capped", (2, "capped")),
+        # sqlite has no planner estimates, falls back to the capped count
+        ("estimate", (2, "capped")),
+        ("window", (4, "exact")),
+        ("none", (None, "none")),
+    ],
+)
+def test_count_strategies(
+    count_strategy, expected, django_assert_max_num_queries
+):
+    class CountedPersonAC(ModelAutocomplete):
+        model = Person
+        search_attrs = ["name"]
+        count_cap = 2
+
+    CountedPersonAC.count_strategy = count_strategy
+
+    for i in range(4):
+        PersonFactory(name=f"John{i}")
+    PersonFactory(name="Jones")
+
+    results = CountedPersonAC.search_items("Joh", ContextArg(None, None))
+    page = results[:2]
+    assert len(page) == 2
+
+    num_queries = 0 if count_strategy in ("window", "none") else 1
+    with django_assert_max_num_queries(num_queries):
+        total = CountedPersonAC.get_total_results(
+            results, ContextArg(None, None)
+        )
+
+    assert total == expected
+
+
+def test_invalid_count_strategy():
+    class BadCountAC(PersonModelAC):
+        count_strategy = "guess"
+
+    with pytest.raises(ValueError):
+        register(BadCountAC)
+
+
+def test_model_ac_search_excludes_selected_keys():
+    p1 = PersonFactory(name="John1")
+    p2 = PersonFactory(name="John2")
+    p3 = PersonFactory(name="John3")
+
+    context = ContextArg(None, None, selected_keys=[str(p1.id), str(p3.id)])
+    queryset = PersonModelAC.get_query_filtered_queryset("Joh", context)
+    assert "NOT" in str(queryset.query)
+
+    results = PersonModelAC.search_items("Joh", context)
+    assert list(results) == [{"label": "John2", "key": p2.id}]
+
+
+def test_postgres_search_modes_fall_back_to_icontains():
+    class TrigramPersonAC(ModelAutocomplete):
+        model = Person
+        search_attrs = ["name"]
+        search_mode = "trigram"
+
+    p1 = PersonFactory(name="Jonathan Smith")
+    PersonFactory(name="Jane")
+
+    # sqlite
+    results = TrigramPersonAC.search_items("smi", ContextArg(None, None))
+    assert list(results) == [{"label": "Jonathan Smith", "key": p1.id}]
+
+
+def test_invalid_search_mode():
+    class BadSearchModeAC(PersonModelAC):
+        search_mode = "regex"
+
+    with pytest.raises(ValueError):
+        register(BadSearchModeAC)
+
+
+class CodedPerson(models.Model):
+    """
+    Not migrated, only its indexes are inspected
+    """
+
+    code = models.CharField(max_length=10, db_index=True)
+    name = models.CharField(max_length=60)
+    name_normalized = models.CharField(max_length=60)
+
+    class Meta:
+        app_label = "sample_app"
+        managed = False
+        indexes = [
+            models.Index(
+                OpClass(Lower("name"), name="text_pattern_ops"),
+                name="codedperson_lower_name",
+            ),
+            models.Index(
+                fields=["name_normalized"],
+                opclasses=["varchar_pattern_ops"],
+                name="codedperson_norm",
+            ),
+            models.Index(Upper("code"), name="codedperson_upper_code"),
+            GinIndex(fields=["name"], name="codedperson_name_gin"),
+        ]
+
+
+def test_search_lookups():
+    class LookupPersonAC(ModelAutocomplete):
+        model = Person
+        search_attrs = [("name", "iexact"), ("name", "lower_startswith")]
+
+    p1 = PersonFactory(name="Joh")
+    p2 = PersonFactory(name="John")
+    PersonFactory(name="Big John")
+
+    assert LookupPersonAC.get_search_attr_names() == ["name", "name"]
+
+    results = LookupPersonAC.search_items("JOH", ContextArg(None, None))
+    assert list(results) == [
+        {"label": "Joh", "key": p1.id},
+        {"label": "John", "key": p2.id},
+    ]
+
+    sql = str(LookupPersonAC.get_query_filtered_queryset("x", None).query)
+    assert "LOWER" in sql
+
+
+def test_normalized_search_lookup():
+    class NormalizedTeamAC(ModelAutocomplete):
+        model = Team
+        # stands in for a shadow column, Team.name holds normalized values
+        search_attrs = [("team_lead__name", "normalized_startswith")]
+        normalized_fields = {"team_lead__name": "name"}
+
+    t1 = TeamFactory(name="jose")
+    TeamFactory(name="joanne")
+
+    results = NormalizedTeamAC.search_items("JOSÉ", ContextArg(None, None))
+    assert [i["key"] for i in results] == [t1.id]
+
+
+def test_normalized_fields_filled_on_save():
+    @register
+    class NormalizingTeamAC(ModelAutocomplete):
+        model = Team
+        # Team.name stands in for a shadow column of itself
+        search_attrs = [("name", "normalized_startswith")]
+        normalized_fields = {"name": "name"}
+
+    try:
+        team = TeamFactory(name="Équipe Forte")
+        assert team.name == "equipe forte"
+    finally:
+        pre_save.disconnect(
+            sender=Team,
+            dispatch_uid="autocomplete:normalize:NormalizingTeamAC",
+        )
+
+
+def test_invalid_search_lookups():
+    class BadLookupAC(PersonModelAC):
+        search_attrs = [("name", "regex")]
+
+    with pytest.raises(ValueError):
+        register(BadLookupAC)
+
+    class MissingShadowAC(PersonModelAC):
+        search_attrs = [("name", "normalized_exact")]
+
+    with pytest.raises(ValueError):
+        register(MissingShadowAC)
+
+    class RefinedPrefixAC(PersonModelAC):
+        search_attrs = [("name", "istartswith")]
+        cache_timeout = 60
+        refine_searches = True
+
+    with pytest.raises(ValueError):
+        register(RefinedPrefixAC)
+
+
+@pytest.mark.parametrize("mode", ["trigram", "fulltext", "fts5"])
+def test_refine_searches_requires_icontains_mode(mode):
+    class RefinedModeAC(PersonModelAC):
+        search_mode = mode
+        cache_timeout = 60
+        refine_searches = True
+
+    with pytest.raises(ValueError):
+        register(RefinedModeAC)
+
+
+def test_search_lookup_index_check():
+    class CodedPersonAC(ModelAutocomplete):
+        model = CodedPerson
+        search_attrs = [
+            ("code", "exact"),
+            ("name", "lower_startswith"),
+            ("name", "normalized_startswith"),
+            "name",
+        ]
+        normalized_fields = {"name": "name_normalized"}
+
+    assert check_ac_class(CodedPersonAC) == []
+
+    class UnindexedCodedPersonAC(CodedPersonAC):
+        search_attrs = [
+            ("code", "istartswith"),
+            ("name", "exact"),
+            ("name", "unaccent_icontains"),
+        ]
+
+    warnings = check_ac_class(UnindexedCodedPersonAC)
+    assert [w.id for w in warnings] == ["autocomplete.W001"] * 3
+    assert (
+        'OpClass(Upper("code"), name="text_pattern_ops")' in warnings[0].hint
+    )
+    assert "db_index" in warnings[1].hint
+
+
+def test_search_lookup_index_check_needs_pattern_indexes():
+    # a plain B-tree on Upper("code") only supports iexact
+    class PrefixCodedPersonAC(ModelAutocomplete):
+        model = CodedPerson
+        search_attrs = [("code", "iexact"), ("code", "istartswith")]
+
+    warnings = check_ac_class(PrefixCodedPersonAC)
+    assert len(warnings) == 1
+    assert "'istartswith'" in warnings[0].msg
+
+    # db_index text fields get a pattern index along with the plain one
+    class ExactPrefixCodedPersonAC(ModelAutocomplete):
+        model = CodedPerson
+        search_attrs = [("code", "startswith"), ("name_normalized", "exact")]
+
+    assert check_ac_class(ExactPrefixCodedPersonAC) == []
+
+
+def test_search_lookup_index_check_icontains_needs_upper_trigram():
+    # icontains compares UPPER(name), the GIN index on name doesn't help it
+    class ContainsCodedPersonAC(ModelAutocomplete):
+        model = CodedPerson
+        search_attrs = [("name", "contains"), ("name", "icontains")]
+
+    warnings = check_ac_class(ContainsCodedPersonAC)
+    assert len(warnings) == 1
+    assert "'icontains'" in warnings[0].msg
+    assert 'OpClass(Upper("name"), name="gin_trgm_ops")' in warnings[0].hint
+
+
+def test_queryset_mapped_iterable_keyset():
+    class OrderedPersonAC(PersonModelAC):
+        load_more_results = True
+
+        @classmethod
+        def get_queryset(cls):
+            return Person.objects.order_by("-name")
+
+    p1 = PersonFactory(name="John")
+    p2 = PersonFactory(name="John")
+    p3 = PersonFactory(name="Johnny")
+
+    results = OrderedPersonAC.search_items("joh", ContextArg(None, None))
+    assert results.keyset == [("name", True), ("pk", False)]
+
+    first = results[:2]
+    assert [i["label"] for i in first] == ["Johnny", "John"]
+    position = results.get_position(first[-1])
+    assert position == ["John", p1.id]
+
+    rest = results.after(position)
+    assert [i["key"] for i in rest] == [p2.id]
+
+    # the position of items that weren't fetched is unknown
+    assert results.get_position({"key": p3.id, "label": "Johnny"}) is None
+
+
+def test_queryset_mapped_iterable_keyset_unsupported():
+    queryset = Person.objects.order_by("?")
+    assert QuerysetMappedIterable(queryset, str, paged=True).keyset is None
+
+    queryset = Team.objects.order_by("team_lead__name")
+    assert QuerysetMappedIterable(queryset, str, paged=True).keyset is None
+
+
+def test_queryset_mapped_iterable_ordering_without_cursors():
+    results = PersonModelAC.search_items("joh", ContextArg(None, None))
+    assert results.keyset is None
+    assert not results.queryset.query.order_by
+
+    queryset = Person.objects.order_by("name")
+    results = QuerysetMappedIterable(queryset, str)
+    assert results.keyset is None
+    assert results.queryset.query.order_by == ("name",)
@@ -0,0 +1,92 @@
+"""
+These tests need PostgreSQL with the pg_trgm extension available,
+point the default database at it to run them
+"""
+
+from django.db import connection
+
+import pytest
+
+from autocomplete import ModelAutocomplete
+from autocomplete.core import ContextArg
+
+from sample_app.models import Person, PersonFactory
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="requires PostgreSQL"
+)
+
+
+class TrigramPersonAC(ModelAutocomplete):
+    model = Person
+    search_attrs = ["name"]
+    search_mode = "trigram"
+
+
+class FulltextPersonAC(ModelAutocomplete):
+    model = Person
+    search_attrs = ["name"]
+    search_mode = "fulltext"
+
+
+@pytest.fixture
+def pg_trgm():
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+
+def labels(results):
+    return [i["label"] for i in results]
+
+
+def test_prefix_tsquery():
+    from autocomplete.postgres import prefix_tsquery
+
+    assert prefix_tsquery("jo sm") == "jo:* & sm:*"
+    assert prefix_tsquery("o'brien & | !") == "o:* & brien:*"
+    assert prefix_tsquery("  ") == ""
+
+
+def test_trigram_search_orders_by_similarity(pg_trgm):
+    PersonFactory(name="Jonathan Smithson")
+    PersonFactory(name="Smith")
+    PersonFactory(name="Jones")
+
+    results = TrigramPersonAC.search_items("smith", ContextArg(None, None))
+    assert labels(results) == ["Smith", "Jonathan Smithson"]
+
+    # short searches still match as substrings
+    results = TrigramPersonAC.search_items("mit", ContextArg(None, None))
+    assert set(labels(results)) == {"Smith", "Jonathan Smithson"}
+
+
+def test_fulltext_search_matches_word_prefixes():
+    PersonFactory(name="Jonathan Smith")
+    PersonFactory(name="Smithers")
+    PersonFactory(name="Blacksmith")
+
+    results = FulltextPersonAC.search_items("smi jon", ContextArg(None, None))
+    assert labels(results) == ["Jonathan Smith"]
+
+    results = FulltextPersonAC.search_items("smith", ContextArg(None, None))
+    assert set(labels(results)) == {"Jonathan Smith", "Smithers"}
+
+    assert (
+        list(FulltextPersonAC.search_items("!!", ContextArg(None, None))) == []
+    )
+
+
+def test_search_index_operations():
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.operations import TrigramExtension
+
+    from autocomplete.postgres import search_index_operations
+
+    operations = search_index_operations(TrigramPersonAC)
+    assert isinstance(operations[0], TrigramExtension)
+    assert len(operations) == 3
+    assert all(isinstance(op.index, GinIndex) for op in operations[1:])
+    assert all(len(op.index.name) <= 30 for op in operations[1:])
+
+    operations = search_index_operations(FulltextPersonAC)
+    assert len(operations) == 1
@@ -0,0 +1,219 @@
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+
+import pytest
+
+from autocomplete import rendering
+from autocomplete.core import Autocomplete, register
+
+from sample_app.models import PersonFactory
+
+from .utils_for_test import get_soup
+
+ITEMS = [
+    {"key": "plain", "label": "Abc plain"},
+    {"key": "quo\"te's", "label": "Abc <b>escaped</b> & co"},
+    {"key": "html", "label": mark_safe("Abc <b>bold</b>")},
+    {"key": 4200, "label": 4200},
+    {"key": "ünï", "label": "ÀBC ünïcode"},
+]
+
+
+@register
+class RenderedAC(Autocomplete):
+    max_results = 3
+    minimum_search_length = 0
+    load_more_results = True
+
+    @classmethod
+    def search_items(cls, search, context):
+        return [
+            item
+            for item in ITEMS
+            if search.lower() in str(item["label"]).lower()
+        ]
+
+    @classmethod
+    def get_items_from_keys(cls, keys, context):
+        return [item for item in ITEMS if str(item["key"]) in keys]
+
+
+def get_both(client, monkeypatch, url, params):
+    fast = client.get(url, params)
+
+    with monkeypatch.context() as m:
+        m.setattr(rendering, "uses_default_item_template", lambda: False)
+        templated = client.get(url, params)
+
+    assert fast.status_code == templated.status_code == 200
+    return fast, templated
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"search": "abc"},
+        {"search": ""},
+        {"search": "abc", "myfield": ["html", "quo\"te's"]},
+        {
+            "search": "bc",
+            "myfield": ["plain", "4200"],
+            "multiselect": "true",
+            "required": "true",
+            "disabled": "true",
+            "placeholder": "Pick <one>",
+            "component_prefix": "pre'fix",
+        },
+    ],
+)
+def test_fast_path_matches_template(client, monkeypatch, params):
+    url = reverse("autocomplete:items", kwargs={"ac_name": "RenderedAC"})
+    params = {"field_name": "myfield", **params}
+
+    fast, templated = get_both(client, monkeypatch, url, params)
+    assert fast.content == templated.content
+
+    options = get_soup(fast).select("a[role='option']")
+    assert options
+
+    # the next page goes through the fast path as well
+    cursor = get_soup(fast).select_one("div.load-more")
+    if cursor is not None:
+        cursor = cursor.attrs["hx-vals"].split('cursor: "')[1].split('"')[0]
+        url = reverse("autocomplete:page", kwargs={"ac_name": "RenderedAC"})
+        fast, templated = get_both(
+            client, monkeypatch, url, {**params, "cursor": cursor}
+        )
+        assert fast.content == templated.content
+        assert get_soup(fast).select("a[role='option']")
+
+
+def test_localized_keys_match_template(client, monkeypatch, settings):
+    settings.USE_THOUSAND_SEPARATOR = True
+
+    url = reverse("autocomplete:items", kwargs={"ac_name": "RenderedAC"})
+    fast, templated = get_both(
+        client, monkeypatch, url, {"field_name": "myfield", "search": "4200"}
+    )
+    assert fast.content == templated.content
+    option = get_soup(fast).select_one("a[role='option']")
+    assert option.attrs["data-key"] == "4200"
+
+
+def test_model_items_match_template(client, monkeypatch):
+    for name in ["abc1", "abc <2>", "xabc"]:
+        PersonFactory(name=name)
+
+    url = reverse("autocomplete:items", kwargs={"ac_name": "PersonAC"})
+    fast, templated = get_both(
+        client, monkeypatch, url, {"field_name": "myfield", "search": "abc"}
+    )
+    assert fast.content == templated.content
+
+
+def test_overridden_item_template_is_used(client, settings, tmp_path):
+    assert rendering.uses_default_item_template()
+
+    override = tmp_path / "autocomplete" / "item.html"
+    override.parent.mkdir()
+    override.write_text('<a role="option" class="mine">{{ item.label }}</a>')
+
+    settings.TEMPLATES = [
+        {**settings.TEMPLATES[0], "DIRS": [str(tmp_path)]},
+        *settings.TEMPLATES[1:],
+    ]
+    assert not rendering.uses_default_item_template()
+
+    url = reverse("autocomplete:items", kwargs={"ac_name": "RenderedAC"})
+    response = client.get(url, {"field_name": "myfield", "search": "abc"})
+    options = get_soup(response).select("a[role='option']")
+    assert options
+    assert all(option.attrs["class"] == ["mine"] for option in options)
+
+
+@register
+class CachedRowsAC(RenderedAC):
+    fragment_cache_size = 2
+
+
+@register
+class SharedRowsAC(RenderedAC):
+    fragment_cache_size = 10
+    fragment_cache_alias = "default"
+
+
+@pytest.fixture
+def count_renders(monkeypatch):
+    rendering._row_caches.clear()
+    cache.clear()
+    calls = []
+    render = rendering.ItemRenderer.render
+
+    def counting_render(self, item):
+        calls.append(str(item["key"]))
+        return render(self, item)
+
+    monkeypatch.setattr(rendering.ItemRenderer, "render", counting_render)
+    yield calls
+    rendering._row_caches.clear()
+
+
+def get_items(client, ac_name, **params):
+    url = reverse("autocomplete:items", kwargs={"ac_name": ac_name})
+    response = client.get(url, {"field_name": "myfield", **params})
+    assert response.status_code == 200
+    return response.content
+
+
+def test_cached_rows_match_rendered_rows(client, count_renders):
+    for params in [
+        {"search": "abc"},
+        {"search": "abc", "myfield": ["html"]},
+        {"search": "bc", "component_prefix": "pre'fix"},
+    ]:
+        uncached = get_items(client, "RenderedAC", **params)
+        first = get_items(client, "SharedRowsAC", **params)
+        second = get_items(client, "SharedRowsAC", **params)
+        assert first == second
+        assert first == uncached.replace(b"RenderedAC", b"SharedRowsAC")
+
+
+def test_cached_rows_are_reused(client, count_renders):
+    get_items(client, "CachedRowsAC", search="plain")
+    assert count_renders == ["plain"]
+
+    get_items(client, "CachedRowsAC", search="plain")
+    assert count_renders == ["plain"]
+
+    # the row depends on the search, the selection and the component
+    get_items(client, "CachedRowsAC", search="pla")
+    get_items(client, "CachedRowsAC", search="plain", myfield=["plain"])
+    get_items(client, "CachedRowsAC", search="plain", component_prefix="x")
+    assert count_renders == ["plain"] * 4
+
+
+def test_least_recently_used_rows_are_dropped(client, count_renders):
+    get_items(client, "CachedRowsAC", search="plain")
+    get_items(client, "CachedRowsAC", search="ünï")
+    get_items(client, "CachedRowsAC", search="plain")
+    get_items(client, "CachedRowsAC", search="4200")
+    assert count_renders == ["plain", "ünï", "4200"]
+
+    row_cache = rendering._row_caches["CachedRowsAC"]
+    assert len(row_cache.rows) == 2
+
+    get_items(client, "CachedRowsAC", search="plain")
+    get_items(client, "CachedRowsAC", search="ünï")
+    assert count_renders == ["plain", "ünï", "4200", "ünï"]
+
+
+def test_shared_cache_rows_are_reused(client, count_renders):
+    content = get_items(client, "SharedRowsAC", search="abc")
+    assert len(count_renders) == 3
+
+    # as in another process
+    rendering._row_caches.clear()
+    assert get_items(client, "SharedRowsAC", search="abc") == content
+    assert len(count_renders) == 3
+    assert len(rendering._row_caches["SharedRowsAC"].rows) == 3
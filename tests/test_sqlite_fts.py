@@ -0,0 +1,135 @@
+from django.db import connection
+
+import pytest
+
+from autocomplete import ModelAutocomplete, sqlite_fts
+from autocomplete.core import ContextArg
+
+from sample_app.models import Person, PersonFactory, Team
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != "sqlite", reason="requires SQLite"
+)
+
+
+class FtsPersonAC(ModelAutocomplete):
+    model = Person
+    search_attrs = ["name"]
+    search_mode = "fts5"
+
+
+@pytest.fixture(autouse=True)
+def forget_fts_tables():
+    # tables created during a test are rolled back with it
+    sqlite_fts._ready_tables.clear()
+    yield
+    sqlite_fts._ready_tables.clear()
+
+
+def labels(results):
+    return [i["label"] for i in results]
+
+
+def test_prefix_match_query():
+    assert sqlite_fts.prefix_match_query("jo sm") == '"jo"* "sm"*'
+    assert sqlite_fts.prefix_match_query('o"brien OR x*') == (
+        '"o"* "brien"* "OR"* "x"*'
+    )
+    assert sqlite_fts.prefix_match_query(" _-") == ""
+
+
+def test_fts5_search_matches_word_prefixes():
+    PersonFactory(name="John Smith")
+    PersonFactory(name="Joan Smithers")
+    PersonFactory(name="Jane Blacksmith")
+
+    results = FtsPersonAC.search_items("jo smi", ContextArg(None, None))
+    assert sorted(labels(results)) == ["Joan Smithers", "John Smith"]
+
+    # accent and case-insensitive
+    results = FtsPersonAC.search_items("JÔHN", ContextArg(None, None))
+    assert labels(results) == ["John Smith"]
+
+    results = FtsPersonAC.search_items("!!", ContextArg(None, None))
+    assert labels(results) == []
+
+
+def test_fts5_search_orders_by_rank():
+    PersonFactory(name="Smith Smithson Smithers")
+    PersonFactory(name="Anna Smith Lee Wong Carter")
+
+    results = FtsPersonAC.search_items("smith", ContextArg(None, None))
+    assert labels(results) == [
+        "Smith Smithson Smithers",
+        "Anna Smith Lee Wong Carter",
+    ]
+
+
+def test_fts5_table_follows_writes():
+    p1 = PersonFactory(name="John")
+    assert labels(FtsPersonAC.search_items("john", ContextArg(None, None)))
+
+    # none of these send signals
+    Person.objects.filter(pk=p1.pk).update(name="Joan")
+    Person.objects.bulk_create([Person(name="Johnny")])
+
+    results = FtsPersonAC.search_items("jo", ContextArg(None, None))
+    assert sorted(labels(results)) == ["Joan", "Johnny"]
+
+    Person.objects.filter(name="Johnny").delete()
+    results = FtsPersonAC.search_items("jo", ContextArg(None, None))
+    assert labels(results) == ["Joan"]
+
+
+def test_fts5_triggers_are_recreated():
+    PersonFactory(name="John Smith")
+    table = sqlite_fts.ensure_search_table(FtsPersonAC)
+
+    # as when a migration rebuilds the model's table
+    with connection.cursor() as cursor:
+        for trigger in sqlite_fts.get_trigger_names(table):
+            cursor.execute(f'DROP TRIGGER "{trigger}"')
+    PersonFactory(name="Jane Smithers")
+    sqlite_fts._ready_tables.clear()
+
+    results = FtsPersonAC.search_items("smi", ContextArg(None, None))
+    assert sorted(labels(results)) == ["Jane Smithers", "John Smith"]
+
+    PersonFactory(name="Joe Smithson")
+    results = FtsPersonAC.search_items("smiths", ContextArg(None, None))
+    assert labels(results) == ["Joe Smithson"]
+
+
+def test_fts5_table_creation_is_idempotent():
+    table = sqlite_fts.ensure_search_table(FtsPersonAC)
+
+    # as another process would, after this one checked
+    with connection.cursor() as cursor:
+        for statement in sqlite_fts.get_table_sql(FtsPersonAC):
+            cursor.execute(statement)
+
+    sqlite_fts._ready_tables.clear()
+    assert sqlite_fts.ensure_search_table(FtsPersonAC) == table
+
+
+def test_fts5_search_excludes_selected_and_counts():
+    p1 = PersonFactory(name="John1")
+    p2 = PersonFactory(name="John2")
+    PersonFactory(name="Jane")
+
+    context = ContextArg(None, None, selected_keys=[p1.id])
+    results = FtsPersonAC.search_items("john", context)
+    assert list(results) == [{"label": "John2", "key": p2.id}]
+    assert len(results) == 1
+
+
+def test_fts5_falls_back_to_icontains_for_related_attrs():
+    class FtsTeamAC(ModelAutocomplete):
+        model = Team
+        search_attrs = ["team_lead__name"]
+        search_mode = "fts5"
+
+    assert not sqlite_fts.supports_search(FtsTeamAC, "default")
+
+    queryset = FtsTeamAC.search_queryset(Team.objects.all(), "mit")
+    assert "LIKE" in str(queryset.query)
@@ -0,0 +1,111 @@
+from pathlib import Path
+
+from django.template import Context, loader
+from django.utils import translation
+from django.utils.autoreload import file_changed
+from django.utils.safestring import mark_safe
+
+import pytest
+
+from autocomplete import strings
+
+
+@pytest.fixture(autouse=True)
+def clear_strings():
+    strings.clear()
+    yield
+    strings.clear()
+
+
+def render_template(name, values):
+    return loader.get_template(
+        f"autocomplete/strings/{name}.html", using="django"
+    ).render(values)
+
+
+@pytest.mark.parametrize(
+    "item",
+    ["Bob", "<b>Bob</b> & co", mark_safe("<b>Bob</b>"), 42, "100%"],
+)
+def test_compiled_string_matches_template(item):
+    compiled = strings.get_compiled_string("item_selected")
+    assert compiled.format_str == "\n%(item)s selected,\n"
+
+    rendered = strings.render_string("item_selected", Context({"item": item}))
+    assert rendered == render_template("item_selected", {"item": item})
+
+
+def test_strings_without_variables_are_constant():
+    compiled = strings.get_compiled_string("nothing_selected")
+    assert compiled.names == set()
+    assert compiled.format_str == "\nNothing selected."
+
+
+def test_plurals_are_rendered():
+    compiled = strings.get_compiled_string("available_results")
+    assert compiled.names == {"items"}
+    assert compiled.format_str is None
+
+    for items in [[1], [1, 2]]:
+        rendered = strings.render_string(
+            "available_results", Context({"items": items})
+        )
+        assert rendered == render_template(
+            "available_results", {"items": items}
+        )
+
+    rendered = strings.render_string(
+        "available_results", Context({"items": [1]})
+    )
+    assert rendered.strip() == "1 result available."
+
+
+def test_missing_variables_are_rendered():
+    rendered = strings.render_string("item_selected", Context({}))
+    assert rendered == render_template("item_selected", {})
+
+
+def test_templates_are_compiled_once_per_language(monkeypatch):
+    calls = []
+    get_template = loader.get_template
+
+    def counting_get_template(*args, **kwargs):
+        calls.append(args[0])
+        return get_template(*args, **kwargs)
+
+    monkeypatch.setattr(strings.loader, "get_template", counting_get_template)
+
+    for item in ["a", "b", "c"]:
+        strings.render_string("item_selected", Context({"item": item}))
+    assert len(calls) == 1
+
+    with translation.override("fr"):
+        strings.render_string("item_selected", Context({"item": "a"}))
+    assert len(calls) == 2
+
+
+def test_overridden_templates_clear_the_table(settings, tmp_path):
+    assert strings.render_string("multiselect", Context()) == "multiselect"
+
+    override = tmp_path / "autocomplete" / "strings" / "multiselect.html"
+    override.parent.mkdir(parents=True)
+    override.write_text("several")
+
+    settings.TEMPLATES = [
+        {**settings.TEMPLATES[0], "DIRS": [str(tmp_path)]},
+        *settings.TEMPLATES[1:],
+    ]
+    assert strings.render_string("multiselect", Context()) == "several"
+
+
+def test_changed_templates_clear_the_table():
+    strings.get_compiled_string("multiselect")
+    assert strings._table
+
+    file_changed.send(sender=None, file_path=Path("views.py"))
+    assert strings._table
+
+    file_changed.send(
+        sender=None, file_path=Path("autocomplete/strings/multiselect.html")
+    )
+    assert not strings._table
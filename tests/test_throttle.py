@@ -0,0 +1,136 @@
+from django.test import RequestFactory
+from django.urls import reverse
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from autocomplete import throttle
+from autocomplete.core import register
+from autocomplete.views import AsyncItemsView
+
+from sample_app.models import PersonFactory
+from tests.conftest import PersonAC
+
+
+@register
+class ThrottledPersonAC(PersonAC):
+    throttle_rate = "2/m"
+    calls = 0
+
+    @classmethod
+    def search_items(cls, search, context):
+        cls.calls += 1
+        return super().search_items(search, context)
+
+
+@register
+class UnthrottledPersonAC(PersonAC):
+    throttle_rate = False
+
+
+def get_items(client, ac_name, ip="10.0.0.1"):
+    base_url = reverse("autocomplete:items", kwargs={"ac_name": ac_name})
+    return client.get(
+        f"{base_url}?field_name=myfield&search=abcd", REMOTE_ADDR=ip
+    )
+
+
+def test_parse_rate():
+    assert throttle.parse_rate("10/s") == (10, 1)
+    assert throttle.parse_rate("5/min") == (5, 60)
+    assert throttle.parse_rate("100/hour") == (100, 3600)
+
+    for rate in ["10", "x/s", "10/w", "0/s", "10/"]:
+        with pytest.raises(ValueError):
+            throttle.parse_rate(rate)
+
+
+def test_throttle(client):
+    PersonFactory(name="abcd")
+    ThrottledPersonAC.calls = 0
+
+    assert get_items(client, "ThrottledPersonAC").status_code == 200
+    assert get_items(client, "ThrottledPersonAC").status_code == 200
+
+    response = get_items(client, "ThrottledPersonAC")
+    assert response.status_code == 429
+    # a token comes back every 30 seconds
+    assert 0 < int(response["Retry-After"]) <= 30
+    assert ThrottledPersonAC.calls == 2
+
+    # buckets are per client
+    assert (
+        get_items(client, "ThrottledPersonAC", "10.0.0.2").status_code == 200
+    )
+
+
+def test_throttle_refills(client, monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(throttle.time, "time", lambda: now)
+
+    for _ in range(2):
+        assert (
+            get_items(client, "ThrottledPersonAC", "10.0.1.1").status_code
+            == 200
+        )
+    assert (
+        get_items(client, "ThrottledPersonAC", "10.0.1.1").status_code == 429
+    )
+
+    now += 30
+    assert (
+        get_items(client, "ThrottledPersonAC", "10.0.1.1").status_code == 200
+    )
+    assert (
+        get_items(client, "ThrottledPersonAC", "10.0.1.1").status_code == 429
+    )
+
+
+def test_throttle_setting(client, settings):
+    settings.AUTOCOMPLETE_THROTTLE_RATE = "1/h"
+
+    assert get_items(client, "PersonAC", "10.0.2.1").status_code == 200
+    assert get_items(client, "PersonAC", "10.0.2.1").status_code == 429
+
+    # opted out
+    for _ in range(3):
+        response = get_items(client, "UnthrottledPersonAC", "10.0.2.1")
+        assert response.status_code == 200
+
+
+def test_throttle_by_user(client, django_user_model):
+    user = django_user_model.objects.create_user("someone")
+    client.force_login(user)
+
+    assert (
+        get_items(client, "ThrottledPersonAC", "10.0.3.1").status_code == 200
+    )
+    assert (
+        get_items(client, "ThrottledPersonAC", "10.0.3.2").status_code == 200
+    )
+    # same user, from another address
+    assert (
+        get_items(client, "ThrottledPersonAC", "10.0.3.3").status_code == 429
+    )
+
+
+def test_async_throttle():
+    view = AsyncItemsView.as_view()
+
+    def call():
+        request = RequestFactory().get(
+            "/?field_name=myfield&search=abcd", REMOTE_ADDR="10.0.4.1"
+        )
+        return async_to_sync(view)(request, ac_name="ThrottledPersonAC")
+
+    assert call().status_code == 200
+    assert call().status_code == 200
+    assert call().status_code == 429
+
+
+def test_invalid_rate_is_rejected_on_register():
+    class BadRateAC(PersonAC):
+        throttle_rate = "lots"
+
+    with pytest.raises(ValueError):
+        register(BadRateAC)
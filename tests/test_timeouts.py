@@ -0,0 +1,206 @@
+import asyncio
+import time
+
+from django.db import connection
+from django.http import QueryDict
+from django.test import RequestFactory
+from django.urls import reverse
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from autocomplete import (
+    IndexedAutocomplete,
+    MmapIndexedAutocomplete,
+    timeouts,
+    views,
+)
+from autocomplete.core import Autocomplete, register
+from autocomplete.views import AsyncItemsView
+
+from sample_app.models import Person, PersonFactory
+from tests.conftest import PersonAC
+
+from .utils_for_test import get_soup
+
+TOO_BROAD = "Too many possible results. Keep typing to narrow your search."
+
+
+@register
+class SlowQueryPersonAC(PersonAC):
+    search_timeout_ms = 50
+
+    @classmethod
+    def search_items(cls, search, context):
+        if search == "slow":
+            with connection.cursor() as cursor:
+                # runs for far longer than the budget
+                cursor.execute(
+                    "WITH RECURSIVE n(i) AS "
+                    "(SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+                    "SELECT count(*) FROM n"
+                )
+        return super().search_items(search, context)
+
+
+@register
+class SlowPythonAC(Autocomplete):
+    search_timeout_ms = 50
+
+    @classmethod
+    def search_items(cls, search, context):
+        time.sleep(0.5)
+        return [{"key": 1, "label": search}]
+
+    @classmethod
+    async def asearch_items(cls, search, context):
+        await asyncio.sleep(0.5)
+        return [{"key": 1, "label": search}]
+
+    @classmethod
+    def get_items_from_keys(cls, keys, context):
+        return [{"key": k, "label": f"item {k}"} for k in keys]
+
+
+@register
+class FastPythonAC(Autocomplete):
+    search_timeout_ms = 100
+
+    @classmethod
+    def search_items(cls, search, context):
+        return [{"key": 1, "label": search}]
+
+    @classmethod
+    def get_items_from_keys(cls, keys, context):
+        return []
+
+
+def get_items(client, ac_name, search):
+    base_url = reverse("autocomplete:items", kwargs={"ac_name": ac_name})
+    qs_dict = QueryDict(mutable=True)
+    qs_dict.update({"field_name": "myfield", "search": search})
+    return client.get(f"{base_url}?{qs_dict.urlencode()}")
+
+
+def labels(response):
+    soup = get_soup(response)
+    return [a.get_text().strip() for a in soup.select("a[role='option']")]
+
+
+def is_too_broad(response):
+    soup = get_soup(response)
+    listbox = soup.select_one("div[role='listbox']")
+    info = soup.select_one("#myfield__info")
+    return TOO_BROAD in listbox.get_text() and TOO_BROAD in info.get_text()
+
+
+def test_searches_within_budget(client):
+    PersonFactory(name="abcd")
+
+    response = get_items(client, "SlowQueryPersonAC", "abcd")
+    assert labels(response) == ["abcd"]
+    assert not is_too_broad(response)
+
+
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="requires SQLite")
+def test_statement_timeout(client):
+    before = timeouts.timed_out_searches["SlowQueryPersonAC"]
+
+    started = time.monotonic()
+    response = get_items(client, "SlowQueryPersonAC", "slow")
+    assert time.monotonic() - started < 5
+
+    assert response.status_code == 200
+    assert is_too_broad(response)
+    assert timeouts.timed_out_searches["SlowQueryPersonAC"] == before + 1
+    # the widget doesn't replay it from its cache
+    assert "no-store" in response["Cache-Control"]
+
+    # the connection is usable afterwards
+    PersonFactory(name="abcd")
+    assert labels(get_items(client, "SlowQueryPersonAC", "abcd")) == ["abcd"]
+
+
+@pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="requires PostgreSQL"
+)
+def test_statement_timeout_covers_every_statement():
+    # each statement is within the budget, both together aren't
+    with pytest.raises(timeouts.SearchTimedOut):
+        with timeouts.statement_timeout("default", 300):
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_sleep(0.2)")
+                cursor.execute("SELECT pg_sleep(0.2)")
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_watchdog_timeout(client):
+    before = timeouts.timed_out_searches["SlowPythonAC"]
+
+    started = time.monotonic()
+    response = get_items(client, "SlowPythonAC", "abcd")
+    assert time.monotonic() - started < 0.5
+
+    assert is_too_broad(response)
+    assert timeouts.timed_out_searches["SlowPythonAC"] == before + 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_saturated_watchdog_turns_searches_away(client, monkeypatch):
+    monkeypatch.setattr(views, "_watchdog", views.Watchdog(2))
+    timed_out = timeouts.timed_out_searches["FastPythonAC"]
+    busy = timeouts.busy_searches["FastPythonAC"]
+
+    # the slow searches keep running in the watchdog's threads
+    for _ in range(2):
+        assert is_too_broad(get_items(client, "SlowPythonAC", "abcd"))
+
+    started = time.monotonic()
+    response = get_items(client, "FastPythonAC", "abcd")
+    assert time.monotonic() - started < 0.2
+    assert response.status_code == 503
+    assert response["Retry-After"] == "1"
+    assert timeouts.busy_searches["FastPythonAC"] == busy + 1
+
+    # once they're done, searches run again
+    time.sleep(0.6)
+    assert labels(get_items(client, "FastPythonAC", "abcd")) == ["abcd"]
+    assert timeouts.timed_out_searches["FastPythonAC"] == timed_out
+
+    # run_concurrently has its own pool
+    assert views.get_executor() is not views._watchdog.executor
+
+
+def test_watchdog_in_transaction(client):
+    # pool threads can't see the transaction, the search runs in full
+    response = get_items(client, "SlowPythonAC", "abcd")
+    assert labels(response) == ["abcd"]
+
+
+def test_async_timeout():
+    before = timeouts.timed_out_searches["SlowPythonAC"]
+
+    request = RequestFactory().get("/?field_name=myfield&search=abcd")
+    view = AsyncItemsView.as_view()
+    response = async_to_sync(view)(request, ac_name="SlowPythonAC")
+
+    assert is_too_broad(response)
+    assert timeouts.timed_out_searches["SlowPythonAC"] == before + 1
+
+
+def test_index_searches_use_the_watchdog():
+    class TimedIndexedAC(IndexedAutocomplete):
+        model = Person
+        search_attrs = ["name"]
+
+    class TimedMmapAC(MmapIndexedAutocomplete):
+        model = Person
+        search_attrs = ["name"]
+        index_path = "people.idx"
+
+    assert timeouts.uses_statement_timeout(PersonAC, "default")
+    assert not timeouts.uses_statement_timeout(TimedIndexedAC, "default")
+    assert not timeouts.uses_statement_timeout(TimedMmapAC, "default")
@@ -57,6 +57,9 @@ def test_toggle_response_select_from_empty_non_multi(client):
     # 1. The element we are toggling (not sure why this is even included)
     toggled_option = soup.select("a[role='option']")
     assert len(toggled_option) == 1
+    # it can be toggled again through the listbox
+    assert toggled_option[0].attrs["data-key"] == str(to_add.id)
+    assert "hx-get" not in toggled_option[0].attrs
 
     # 2. The hidden inputs that actually hold the form values
     hidden_inputs_container = soup.select_one("div#component_namemyfield_name")
@@ -66,6 +66,7 @@ def test_render_widget_in_form_empty():
         "div.phac_aspc_form_autocomplete#team_lead__container"
     )
     assert component_container
+    assert component_container.attrs["data-autocomplete-cachesize"] == "0"
 
     # 1. hidden input are in #<component_id>
     # it starts out empty without even a name